@@ -0,0 +1,70 @@
+# Benchmark memori dan waktu membaca seluruh transaksi pengguna:
+#   row     : fetchall() dengan sqlite3.Row (cara lama)
+#   slot    : list objek Transaksi (__slots__) dari iter_baris
+#   stream  : iter_transaksi tanpa menyimpan hasil (fetchmany per UKURAN_BATCH)
+# Setiap mode dijalankan di proses terpisah agar puncak RSS (ru_maxrss) tidak saling memengaruhi.
+# Pemakaian: python benchmarks/bench_transaksi.py [jumlah_transaksi]
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+JUMLAH_BAWAAN = 200000
+
+
+def rss_mb():
+    # ru_maxrss dalam KB di Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def siapkan(path, jumlah):
+    main.DB_PATH = path
+    main.init_db()
+    main.register_user("bench", "bench")
+    _, user_id, _ = main.login_user("bench", "bench")
+    with main.get_db_connection() as conn:
+        main.tulis_transaksi_massal(conn, [
+            (user_id, i % 28 + 1, i % 12 + 1, 2024, "Kas", "Aktiva", 1000.0, f"Pendapatan {i % 20}", "Pendapatan", 1000.0)
+            for i in range(jumlah)
+        ])
+    return user_id
+
+
+def jalankan(path, mode, user_id):
+    main.DB_PATH = path
+    conn = main.get_db_connection()
+    awal = rss_mb()
+    mulai = time.perf_counter()
+    total = 0.0
+    if mode == "row":
+        rows = conn.execute(main.SQL_LAPORAN["transaksi_pengguna"], (user_id,)).fetchall()
+        for t in rows:
+            total += t["nominal_debit"]
+    elif mode == "slot":
+        rows = list(main.iter_baris(conn, main.SQL_LAPORAN["transaksi_pengguna"], (user_id,), kelas=main.Transaksi))
+        for t in rows:
+            total += t.nominal_debit
+    else:
+        for t in main.iter_transaksi(conn, user_id):
+            total += t.nominal_debit
+    durasi = time.perf_counter() - mulai
+    conn.close()
+    print(f"{mode:<7} tambahan RSS {rss_mb() - awal:7.1f} MB  waktu {durasi:6.2f} s  (total {total:,.0f})")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4:
+        jalankan(sys.argv[1], sys.argv[2], int(sys.argv[3]))
+        sys.exit(0)
+    jumlah = int(sys.argv[1]) if len(sys.argv) > 1 else JUMLAH_BAWAAN
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    user_id = siapkan(path, jumlah)
+    print(f"{jumlah} transaksi di {path}")
+    for mode in ("row", "slot", "stream"):
+        subprocess.run([sys.executable, os.path.abspath(__file__), path, mode, str(user_id)], check=True)
@@ -1,7 +1,22 @@
 import streamlit as st
 import sqlite3
 import hashlib
-from datetime import datetime
+import calendar
+import re
+import os
+import io
+import sys
+import json
+import asyncio
+import base64
+import queue
+import itertools
+import math
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, parse_qs
+from datetime import datetime, date, timedelta
 
 def format_rupiah(angka): #tambah 5 baris
     try:
@@ -11,15 +26,455 @@ def format_rupiah(angka): #tambah 5 baris
 
 DB_PATH = "accounting_system.db"
 
+# Lebar tampilan gambar tim/logo di halaman Informasi dan ukuran ikon halaman (piksel)
+LEBAR_GAMBAR = 150
+LEBAR_IKON = 64
+
+# Jenis akun yang boleh dipakai transaksi dan jurnal (form input maupun API)
+JENIS_AKUN = ["Aktiva", "Utang", "Modal", "Pendapatan", "Beban", "Prive"]
+
+# Jenis akun nominal yang ditutup ke Modal pada akhir periode
+JENIS_NOMINAL = ["Pendapatan", "Beban", "Prive"]
+AKUN_MODAL_PENUTUP = "Modal"
+
+# Akun kas yang ditampilkan pada grafik dashboard
+AKUN_KAS = "Kas"
+
+# Kolom transaksi yang disalin ke file arsip tahunan
+KOLOM_ARSIP = [
+    "id", "user_id", "tanggal", "bulan", "tahun",
+    "akun_debit", "jenis_debit", "nominal_debit",
+    "akun_kredit", "jenis_kredit", "nominal_kredit",
+    "sumber", "created_at",
+]
+
+# Kolom transaksi yang ikut dihitung dalam hash isi periode (checksum integritas)
+KOLOM_HASH = [
+    "id", "user_id", "tanggal", "bulan", "tahun",
+    "akun_debit", "jenis_debit", "nominal_debit",
+    "akun_kredit", "jenis_kredit", "nominal_kredit", "sumber",
+]
+# Kolom baris jurnal majemuk (l: journal_lines, e: journal_entries) yang ikut dihitung dalam hash isi periode.
+# Posisi user_id, tanggal, bulan dan tahun sama dengan KOLOM_HASH.
+KOLOM_HASH_JURNAL = [
+    "l.id", "e.user_id", "e.tanggal", "e.bulan", "e.tahun",
+    "l.entry_id", "l.akun", "l.jenis", "l.posisi", "l.nominal",
+]
+MODULUS_HASH = 2 ** 61 - 1
+
+# Jumlah transaksi per halaman pada Riwayat Transaksi
+PER_HALAMAN = 50
+
+# Pemeliharaan database di thread latar: jeda antar siklus, jadwal vacuum, dan ambang freelist (halaman)
+INTERVAL_PEMELIHARAAN = 10 * 60
+JADWAL_VACUUM = 24 * 60 * 60
+AMBANG_FREELIST = 1000
+HALAMAN_PER_VACUUM = 2000
+# Jumlah baris log_pemeliharaan terbaru yang disimpan (sekitar 3 baris per siklus)
+MAKS_LOG_PEMELIHARAAN = 1000
+
+# Prahitung laporan di latar setelah setiap penulisan: jumlah pekerja dan batas antrean pengguna
+PEKERJA_PRAHITUNG = 2
+MAKS_ANTREAN_PRAHITUNG = 64
+
+# API JSON lokal: jumlah koneksi database yang dipakai ulang antar permintaan dan port bawaan
+UKURAN_POOL_API = 4
+PORT_API = 8502
+
+# Cache laporan bersama antar proses Streamlit: umur entri (detik) dan jumlah entri maksimum (LRU)
+TTL_CACHE = 24 * 60 * 60
+MAKS_ENTRI_CACHE = 2000
+# Jeda (detik) penulisan hit/miss yang dikumpulkan di memori dan pembaruan waktu pakai entri (LRU)
+INTERVAL_STATISTIK_CACHE = 60
+INTERVAL_DIPAKAI_CACHE = 60
+
+# Transaksi berulang: frekuensi jadwal dan jeda antar pemeriksaan jatuh tempo di latar (detik)
+FREKUENSI_BERULANG = ["Harian", "Mingguan", "Bulanan"]
+INTERVAL_BERULANG = 60 * 60
+
+# Laporan komparatif: batas jumlah kolom periode dan ekspresi kunci periode pada rekap_bulanan
+MAKS_PERIODE_KOMPARATIF = 24
+EKSPRESI_PERIODE = {"bulan": "tahun * 100 + bulan", "tahun": "tahun"}
+
+# Fungsi untuk membuat thumbnail JPEG selebar ukuran tampilan dari file gambar. Hasilnya disimpan
+# di cache memori dengan kunci (path, mtime, lebar) sehingga file hanya dibaca dan diubah ukurannya sekali.
+# Format JPEG dan lebar yang sama persis dengan tampilan membuat st.image mengirim byte apa adanya
+# tanpa decode/resize ulang di setiap rerun (format lain seperti WebP selalu dikonversi ulang oleh st.image).
+@st.cache_data(max_entries=32, show_spinner=False)
+def buat_thumbnail(path, mtime, lebar):
+    from PIL import Image
+    with Image.open(path) as img:
+        img = img.convert("RGB")
+        tinggi = round(img.height * lebar / img.width)
+        img = img.resize((lebar, tinggi), Image.LANCZOS)
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG", quality=85, optimize=True)
+    return buffer.getvalue()
+
+# Fungsi untuk memuat gambar berukuran tampilan dari cache
+def muat_gambar(path, lebar=LEBAR_GAMBAR):
+    return buat_thumbnail(path, os.path.getmtime(path), lebar)
+
+# Jumlah baris yang diambil per fetchmany saat membaca hasil query secara bertahap
+UKURAN_BATCH = 1000
+
+# Representasi ringkas satu baris transaksi untuk laporan: __slots__ tanpa __dict__
+# dan akses atribut langsung, menggantikan sqlite3.Row yang diakses dengan kunci string.
+class Transaksi:
+    __slots__ = ("id", "tanggal", "bulan", "tahun",
+                 "akun_debit", "jenis_debit", "nominal_debit",
+                 "akun_kredit", "jenis_kredit", "nominal_kredit")
+
+    def __init__(self, id, tanggal, bulan, tahun,
+                 akun_debit, jenis_debit, nominal_debit,
+                 akun_kredit, jenis_kredit, nominal_kredit):
+        self.id = id
+        self.tanggal = tanggal
+        self.bulan = bulan
+        self.tahun = tahun
+        self.akun_debit = akun_debit
+        self.jenis_debit = jenis_debit
+        self.nominal_debit = nominal_debit
+        self.akun_kredit = akun_kredit
+        self.jenis_kredit = jenis_kredit
+        self.nominal_kredit = nominal_kredit
+
+# Representasi ringkas satu posting buku besar beserta saldo berjalannya
+class Posting:
+    __slots__ = ("id", "tanggal", "bulan", "tahun", "posisi", "nominal", "lawan", "saldo")
+
+    def __init__(self, id, tanggal, bulan, tahun, posisi, nominal, lawan, saldo):
+        self.id = id
+        self.tanggal = tanggal
+        self.bulan = bulan
+        self.tahun = tahun
+        self.posisi = posisi
+        self.nominal = nominal
+        self.lawan = lawan
+        self.saldo = saldo
+
+# Fungsi untuk membaca hasil query secara bertahap (fetchmany) tanpa sqlite3.Row.
+# Baris dikembalikan sebagai tuple, atau sebagai objek `kelas` jika diberikan.
+def iter_baris(conn, query, params=(), kelas=None, ukuran=UKURAN_BATCH):
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute(query, params)
+    while True:
+        rows = cursor.fetchmany(ukuran)
+        if not rows:
+            break
+        if kelas is None:
+            yield from rows
+        else:
+            for row in rows:
+                yield kelas(*row)
+
+# Registri SQL baca/laporan: setiap query diberi nama agar rencana eksekusinya bisa diperiksa
+# (python main.py cek-query) dan perubahan yang membuat pencarian indeks menjadi full scan ketahuan.
+# Query yang disusun dinamis memakai placeholder {nama}, variannya didaftarkan di VARIAN_SQL.
+SQL_LAPORAN = {
+    "daftar_akun": """
+        SELECT akun_debit AS akun FROM transactions WHERE user_id = ?
+        UNION
+        SELECT akun_kredit AS akun FROM transactions WHERE user_id = ?
+        ORDER BY akun
+    """,
+    "daftar_akun_jenis": "SELECT DISTINCT akun, jenis FROM posting WHERE user_id = ?",
+    "transaksi_pengguna": f"""
+        SELECT {', '.join(Transaksi.__slots__)}
+        FROM transactions
+        WHERE user_id = ?
+        ORDER BY tahun DESC, bulan DESC, tanggal DESC, id DESC
+    """,
+    "cari_transaksi": f"""
+        SELECT {', '.join('t.' + k for k in Transaksi.__slots__)}
+        FROM {{tabel}} t
+        WHERE {{kondisi}}
+        ORDER BY t.tahun DESC, t.bulan DESC, t.tanggal DESC, t.id DESC
+        LIMIT ?
+    """,
+    "hash_transaksi": f"SELECT {', '.join(KOLOM_HASH)} FROM transactions WHERE id = ?",
+    "hash_transaksi_sejak": f"SELECT {', '.join(KOLOM_HASH)} FROM transactions WHERE id > ?",
+    "transaksi_milik_pengguna": f"SELECT {', '.join(KOLOM_HASH)} FROM transactions WHERE id = ? AND user_id = ?",
+    "saldo_kotor": """
+        SELECT akun, tahun, bulan, tanggal, posting_id FROM saldo_berjalan_kotor WHERE user_id = ?
+    """,
+    "saldo_posting_sebelum": """
+        SELECT saldo FROM posting
+        WHERE user_id = ? AND akun = ? AND (tahun, bulan, tanggal, id) < (?, ?, ?, ?)
+        ORDER BY tahun DESC, bulan DESC, tanggal DESC, id DESC
+        LIMIT 1
+    """,
+    "hitung_saldo_berjalan": """
+        UPDATE posting SET saldo = ? + hitung.kumulatif
+        FROM (
+            SELECT id, SUM(CASE posisi WHEN 'Debit' THEN nominal ELSE -nominal END)
+                   OVER (ORDER BY tahun, bulan, tanggal, id) AS kumulatif
+            FROM posting
+            WHERE user_id = ? AND akun = ? AND (tahun, bulan, tanggal, id) >= (?, ?, ?, ?)
+        ) AS hitung
+        WHERE posting.id = hitung.id
+    """,
+    "saldo_akun_per_tanggal": """
+        SELECT saldo FROM posting
+        WHERE user_id = ? AND akun = ? AND (tahun, bulan, tanggal) <= (?, ?, ?)
+        ORDER BY tahun DESC, bulan DESC, tanggal DESC, id DESC
+        LIMIT 1
+    """,
+    "posting_akun": f"""
+        SELECT {', '.join(Posting.__slots__)}
+        FROM posting
+        WHERE user_id = ? AND akun = ?
+        ORDER BY tahun, bulan, tanggal, id
+    """,
+    "halaman_posting_akun": f"""
+        SELECT {', '.join(Posting.__slots__)}
+        FROM posting
+        WHERE user_id = ? AND akun = ?{{kursor}}
+        ORDER BY tahun DESC, bulan DESC, tanggal DESC, id DESC
+        LIMIT ?
+    """,
+    "daftar_arsip": """
+        SELECT tahun, path, jumlah_transaksi, created_at FROM arsip_tahun
+        WHERE user_id = ?
+        ORDER BY tahun DESC
+    """,
+    "arsip_sejak": """
+        SELECT tahun, path FROM arsip_tahun
+        WHERE user_id = ? AND tahun >= ?
+        ORDER BY tahun
+    """,
+    "isi_periode": f"SELECT {', '.join(KOLOM_HASH)} FROM transactions {{where}}",
+    "isi_periode_jurnal": f"""
+        SELECT {', '.join(KOLOM_HASH_JURNAL)}
+        FROM journal_entries e JOIN journal_lines l ON l.entry_id = e.id {{where}}
+    """,
+    "hash_jurnal": f"""
+        SELECT {', '.join(KOLOM_HASH_JURNAL)}
+        FROM journal_lines l JOIN journal_entries e ON e.id = l.entry_id
+        WHERE l.entry_id = ?
+    """,
+    "checksum_periode": """
+        SELECT user_id, tahun, bulan, total_debit, total_kredit, jumlah_baris, hash_isi, versi
+        FROM checksum_periode {where}
+    """,
+    "periode_bermasalah": """
+        SELECT tahun, bulan, status FROM checksum_periode
+        WHERE user_id = ? AND status != 'OK'
+        ORDER BY tahun, bulan
+    """,
+    "riwayat_perubahan": """
+        SELECT transaksi_id, aksi, data_lama, data_baru, alasan, created_at FROM riwayat_perubahan
+        WHERE user_id = ?
+        ORDER BY id DESC LIMIT ?
+    """,
+    "mutasi_transaksi": """
+        SELECT i.nama, i.jumlah AS stok, m.jumlah FROM mutasi_persediaan m
+        JOIN inventory i ON i.id = m.inventory_id
+        WHERE m.transaksi_id = ?
+    """,
+    "tren_bulanan": """
+        SELECT tahun, bulan,
+               SUM(CASE WHEN jenis = 'Pendapatan' THEN kredit - debit ELSE 0 END) AS pendapatan,
+               SUM(CASE WHEN jenis = 'Beban' THEN debit - kredit ELSE 0 END) AS beban,
+               SUM(SUM(CASE WHEN akun = ? THEN debit - kredit ELSE 0 END))
+                   OVER (ORDER BY tahun, bulan) AS kas
+        FROM rekap_bulanan
+        WHERE user_id = ?
+        GROUP BY tahun, bulan
+        ORDER BY tahun, bulan
+    """,
+    "rentang_rekap": """
+        SELECT MIN(tahun * 100 + bulan), MAX(tahun * 100 + bulan) FROM rekap_bulanan WHERE user_id = ?
+    """,
+    "laba_rugi_periode": """
+        SELECT {periode} AS periode, akun, jenis,
+               SUM(CASE jenis WHEN 'Pendapatan' THEN kredit - debit ELSE debit - kredit END) AS nilai
+        FROM rekap_bulanan
+        WHERE user_id = ? AND (tahun, bulan) >= (?, ?) AND (tahun, bulan) <= (?, ?)
+          AND jenis IN ('Pendapatan', 'Beban')
+        GROUP BY periode, akun, jenis
+    """,
+    "neraca_periode": """
+        SELECT {periode} AS periode, akun, jenis,
+               SUM(SUM(debit - kredit)) OVER (PARTITION BY akun, jenis ORDER BY {periode}) AS saldo
+        FROM rekap_bulanan
+        WHERE user_id = ? AND (tahun, bulan) <= (?, ?)
+        GROUP BY periode, akun, jenis
+        ORDER BY akun, jenis, periode
+    """,
+    "anggaran_vs_realisasi": """
+        SELECT akun, jenis, SUM(anggaran) AS anggaran, SUM(realisasi) AS realisasi
+        FROM (
+            SELECT akun, jenis, nominal AS anggaran, 0 AS realisasi
+            FROM budgets
+            WHERE user_id = ? AND (tahun, bulan) >= (?, ?) AND (tahun, bulan) <= (?, ?)
+            UNION ALL
+            SELECT akun, jenis, 0,
+                   CASE jenis WHEN 'Pendapatan' THEN kredit - debit ELSE debit - kredit END
+            FROM rekap_bulanan
+            WHERE user_id = ? AND (tahun, bulan) >= (?, ?) AND (tahun, bulan) <= (?, ?)
+              AND jenis IN ('Pendapatan', 'Beban')
+        )
+        GROUP BY akun, jenis
+        ORDER BY jenis DESC, akun
+    """,
+    "barang_per_nama": """
+        SELECT id, nama, jumlah, harga_satuan, stok_minimum
+        FROM inventory
+        WHERE user_id = ? AND nama = ?
+        LIMIT 2
+    """,
+    "inventory_pengguna": """
+        SELECT id, nama, jumlah, harga_satuan, stok_minimum
+        FROM inventory
+        WHERE user_id = ?
+        ORDER BY nama ASC
+    """,
+    "ringkasan_persediaan": """
+        SELECT jumlah_barang, total_unit, total_nilai FROM ringkasan_persediaan WHERE user_id = ?
+    """,
+    "halaman_persediaan": """
+        SELECT id, nama, jumlah, harga_satuan, jumlah * harga_satuan AS nilai, stok_minimum
+        FROM inventory
+        WHERE user_id = ?
+        ORDER BY nama ASC
+        LIMIT ? OFFSET ?
+    """,
+    "cari_persediaan": """
+        SELECT id, nama, jumlah, harga_satuan, stok_minimum
+        FROM inventory
+        WHERE user_id = ? AND nama >= ? AND nama < ?
+        ORDER BY nama ASC
+        LIMIT ?
+    """,
+    "stok_menipis": """
+        SELECT id, nama, jumlah, stok_minimum
+        FROM inventory INDEXED BY idx_inventory_stok_menipis
+        WHERE user_id = ? AND stok_minimum > 0 AND jumlah <= stok_minimum
+        ORDER BY nama ASC
+        LIMIT ?
+    """,
+    "tutup_terakhir": """
+        SELECT tahun, bulan FROM tutup_buku
+        WHERE user_id = ?
+        ORDER BY tahun DESC, bulan DESC LIMIT 1
+    """,
+    "tutup_terakhir_sampai": """
+        SELECT tahun, bulan FROM tutup_buku
+        WHERE user_id = ? AND (tahun, bulan) <= (?, ?)
+        ORDER BY tahun DESC, bulan DESC LIMIT 1
+    """,
+    "versi_laporan": "SELECT versi FROM versi_laporan WHERE user_id = ?",
+    "daftar_tutup_buku": """
+        SELECT tahun, bulan, created_at FROM tutup_buku
+        WHERE user_id = ?
+        ORDER BY tahun DESC, bulan DESC
+    """,
+    "saldo_snapshot": """
+        SELECT akun, jenis, debit, kredit FROM saldo_snapshot
+        WHERE user_id = ? AND tahun = ? AND bulan = ?
+    """,
+    "saldo_delta": """
+        SELECT akun, jenis,
+               SUM(CASE posisi WHEN 'Debit' THEN nominal ELSE 0 END) AS debit,
+               SUM(CASE posisi WHEN 'Kredit' THEN nominal ELSE 0 END) AS kredit
+        FROM posting
+        WHERE user_id = ? AND (tahun, bulan) > (?, ?) AND (tahun, bulan) <= (?, ?) AND posisi != 'Saldo'
+        GROUP BY akun, jenis
+    """,
+    "jurnal_majemuk": """
+        SELECT id, tanggal, bulan, tahun, keterangan FROM journal_entries
+        WHERE user_id = ?
+        ORDER BY tahun DESC, bulan DESC, tanggal DESC, id DESC
+        LIMIT ?
+    """,
+    "baris_jurnal": """
+        SELECT akun, jenis, posisi, nominal FROM journal_lines
+        WHERE entry_id = ?
+        ORDER BY posisi DESC, id
+    """,
+    "transaksi_berulang_pengguna": """
+        SELECT id, nama, akun_debit, jenis_debit, akun_kredit, jenis_kredit, nominal,
+               frekuensi, hari, berikutnya, selesai, aktif
+        FROM transaksi_berulang
+        WHERE user_id = ?
+        ORDER BY aktif DESC, berikutnya, id
+    """,
+    "berulang_jatuh_tempo": """
+        SELECT id, user_id, akun_debit, jenis_debit, akun_kredit, jenis_kredit, nominal,
+               frekuensi, hari, berikutnya, selesai
+        FROM transaksi_berulang
+        WHERE aktif = 1 AND berikutnya <= ?
+    """,
+    "jurnal_milik_pengguna": """
+        SELECT id, tanggal, bulan, tahun, keterangan FROM journal_entries WHERE id = ? AND user_id = ?
+    """,
+}
+
+# Syarat kursor halaman buku besar: posting sebelum (tahun, bulan, tanggal, id) tertentu
+KURSOR_POSTING = " AND (tahun, bulan, tanggal, id) < (?, ?, ?, ?)"
+
+# Varian query dinamis yang diperiksa rencana eksekusinya (isi placeholder untuk setiap varian)
+VARIAN_SQL = {
+    "cari_transaksi": [
+        {"tabel": "transactions", "kondisi": kondisi}
+        for kondisi in [
+            "t.user_id = ?",
+            "t.user_id = ? AND (t.tahun, t.bulan, t.tanggal, t.id) < (?, ?, ?, ?)",
+            "t.user_id = ? AND t.id IN (SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH ?)",
+            "t.user_id = ? AND (t.akun_debit = ? OR t.akun_kredit = ?)",
+            "t.user_id = ? AND t.nominal_debit >= ? AND t.nominal_debit <= ?",
+            "t.user_id = ? AND (t.tahun, t.bulan, t.tanggal) >= (?, ?, ?) AND (t.tahun, t.bulan, t.tanggal) <= (?, ?, ?)",
+        ]
+    ],
+    "halaman_posting_akun": [{"kursor": ""}, {"kursor": KURSOR_POSTING}],
+    "isi_periode": [{"where": ""}, {"where": "WHERE user_id = ? AND tahun = ? AND bulan = ?"}],
+    "isi_periode_jurnal": [{"where": ""}, {"where": "WHERE e.user_id = ? AND e.tahun = ? AND e.bulan = ?"}],
+    "checksum_periode": [{"where": ""}, {"where": "WHERE user_id = ? AND versi != versi_terverifikasi"}],
+    "laba_rugi_periode": [{"periode": ekspresi} for ekspresi in EKSPRESI_PERIODE.values()],
+    "neraca_periode": [{"periode": ekspresi} for ekspresi in EKSPRESI_PERIODE.values()],
+}
+
+# Tabel yang tumbuh bersama jumlah transaksi: full scan pada tabel ini dianggap regresi
+TABEL_BESAR = ("transactions", "posting", "riwayat_perubahan", "mutasi_persediaan", "journal_entries", "journal_lines",
+               "inventory", "budgets", "rekap_bulanan")
+
+# Query yang memang sengaja membaca seluruh tabel (audit semua periode)
+SCAN_DIIZINKAN = {
+    ("isi_periode", "transactions"),
+    ("isi_periode_jurnal", "journal_entries"),
+    ("isi_periode_jurnal", "journal_lines"),
+}
+
 # Fungsi untuk membuat koneksi ke database dengan timeout dan row factory
 def get_db_connection():
     conn = sqlite3.connect(DB_PATH, timeout=10)
     conn.row_factory = sqlite3.Row
     return conn
 
+# Fungsi untuk membuat koneksi baca-saja bagi halaman laporan.
+# Semua query laporan berjalan dalam satu transaksi baca di atas snapshot WAL,
+# sehingga laporan melihat satu kondisi data yang konsisten dan penulis tidak pernah menunggu pembaca.
+# Transaksi baca selesai saat conn.close() dipanggil.
+def get_report_connection():
+    conn = sqlite3.connect(f"file:{quote(os.path.abspath(DB_PATH))}?mode=ro", uri=True,
+                           timeout=10, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute('BEGIN')
+    # Snapshot WAL dimulai pada pembacaan pertama, bukan pada BEGIN
+    conn.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+    return conn
+
 # Fungsi inisialisasi database dan membuat tabel jika belum ada
 def init_db():
     with get_db_connection() as conn:
+        # Database baru memakai incremental vacuum (database lama dikonversi oleh pemeliharaan latar).
+        # Harus diset sebelum mode WAL dan sebelum tabel pertama dibuat, kalau tidak pragma ini diabaikan.
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        # Mode WAL agar laporan (pembaca) dan input transaksi (penulis) tidak saling mengunci
+        conn.execute('PRAGMA journal_mode=WAL')
+
         # Tabel users untuk menyimpan data pengguna
         conn.execute('''
             CREATE TABLE IF NOT EXISTS users (
@@ -49,102 +504,2527 @@ def init_db():
             )
         ''')
 
-        # Tabel inventory untuk menyimpan data persediaan barang
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS inventory (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                nama TEXT NOT NULL,
-                jumlah INTEGER NOT NULL,
-                harga_satuan REAL NOT NULL DEFAULT 0.0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
+        # Tabel inventory untuk menyimpan data persediaan barang
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS inventory (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                nama TEXT NOT NULL,
+                jumlah INTEGER NOT NULL,
+                harga_satuan REAL NOT NULL DEFAULT 0.0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+
+        # Stok minimum per barang; barang dengan stok <= stok_minimum muncul di peringatan stok menipis.
+        # Indeks parsial hanya berisi barang yang menipis, sehingga peringatan tidak membaca seluruh katalog
+        # (query stok_menipis memakai INDEXED BY karena tanpa statistik planner memilih idx_inventory_pengguna).
+        tambah_kolom_jika_belum_ada(conn, 'inventory', 'stok_minimum', "INTEGER NOT NULL DEFAULT 0")
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_inventory_pengguna ON inventory (user_id, nama)')
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_inventory_stok_menipis ON inventory (user_id, nama)
+            WHERE stok_minimum > 0 AND jumlah <= stok_minimum
+        ''')
+
+        # Tabel ringkasan_persediaan: jumlah barang, total unit dan total nilai per pengguna, dijaga trigger
+        # pada inventory agar ringkasan halaman Persediaan tidak perlu menjumlahkan seluruh katalog
+        ringkasan_baru = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ringkasan_persediaan'"
+        ).fetchone() is None
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS ringkasan_persediaan (
+                user_id INTEGER PRIMARY KEY,
+                jumlah_barang INTEGER NOT NULL DEFAULT 0,
+                total_unit INTEGER NOT NULL DEFAULT 0,
+                total_nilai REAL NOT NULL DEFAULT 0
+            )
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS inventory_ringkasan_insert AFTER INSERT ON inventory BEGIN
+                INSERT INTO ringkasan_persediaan (user_id, jumlah_barang, total_unit, total_nilai)
+                VALUES (new.user_id, 1, new.jumlah, new.jumlah * new.harga_satuan)
+                ON CONFLICT (user_id) DO UPDATE SET
+                    jumlah_barang = jumlah_barang + 1,
+                    total_unit = total_unit + excluded.total_unit,
+                    total_nilai = total_nilai + excluded.total_nilai;
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS inventory_ringkasan_update AFTER UPDATE OF jumlah, harga_satuan ON inventory BEGIN
+                UPDATE ringkasan_persediaan SET
+                    total_unit = total_unit + new.jumlah - old.jumlah,
+                    total_nilai = total_nilai + new.jumlah * new.harga_satuan - old.jumlah * old.harga_satuan
+                WHERE user_id = new.user_id;
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS inventory_ringkasan_delete AFTER DELETE ON inventory BEGIN
+                UPDATE ringkasan_persediaan SET
+                    jumlah_barang = jumlah_barang - 1,
+                    total_unit = total_unit - old.jumlah,
+                    total_nilai = total_nilai - old.jumlah * old.harga_satuan
+                WHERE user_id = old.user_id;
+            END
+        ''')
+        if ringkasan_baru:
+            # Database lama: isi ringkasan dari persediaan yang sudah ada
+            conn.execute('''
+                INSERT INTO ringkasan_persediaan (user_id, jumlah_barang, total_unit, total_nilai)
+                SELECT user_id, COUNT(*), SUM(jumlah), SUM(jumlah * harga_satuan) FROM inventory GROUP BY user_id
+            ''')
+
+        # Kolom sumber membedakan jurnal umum dan jurnal penutup
+        tambah_kolom_jika_belum_ada(conn, 'transactions', 'sumber', "TEXT NOT NULL DEFAULT 'umum'")
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_transactions_periode ON transactions (user_id, tahun, bulan, tanggal)')
+
+        # Tabel tutup_buku untuk mencatat periode yang sudah ditutup
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS tutup_buku (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                tahun INTEGER NOT NULL,
+                bulan INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (user_id, tahun, bulan),
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+
+        # Tabel saldo_snapshot untuk menyimpan saldo setiap akun saat periode ditutup
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS saldo_snapshot (
+                user_id INTEGER NOT NULL,
+                tahun INTEGER NOT NULL,
+                bulan INTEGER NOT NULL,
+                akun TEXT NOT NULL,
+                jenis TEXT NOT NULL,
+                debit REAL NOT NULL,
+                kredit REAL NOT NULL,
+                PRIMARY KEY (user_id, tahun, bulan, akun, jenis),
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+
+        # Indeks untuk filter nama akun pada pencarian dan buku besar
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_transactions_akun_debit ON transactions (user_id, akun_debit)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_transactions_akun_kredit ON transactions (user_id, akun_kredit)')
+
+        # Indeks FTS5 untuk pencarian teks nama akun, disinkronkan dengan tabel transactions lewat trigger
+        fts_baru = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'transactions_fts'"
+        ).fetchone() is None
+        conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+                akun_debit, akun_kredit,
+                content='transactions', content_rowid='id', prefix='2 3'
+            )
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS transactions_fts_insert AFTER INSERT ON transactions BEGIN
+                INSERT INTO transactions_fts (rowid, akun_debit, akun_kredit)
+                VALUES (new.id, new.akun_debit, new.akun_kredit);
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS transactions_fts_delete AFTER DELETE ON transactions BEGIN
+                INSERT INTO transactions_fts (transactions_fts, rowid, akun_debit, akun_kredit)
+                VALUES ('delete', old.id, old.akun_debit, old.akun_kredit);
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS transactions_fts_update AFTER UPDATE OF akun_debit, akun_kredit ON transactions BEGIN
+                INSERT INTO transactions_fts (transactions_fts, rowid, akun_debit, akun_kredit)
+                VALUES ('delete', old.id, old.akun_debit, old.akun_kredit);
+                INSERT INTO transactions_fts (rowid, akun_debit, akun_kredit)
+                VALUES (new.id, new.akun_debit, new.akun_kredit);
+            END
+        ''')
+        if fts_baru:
+            # Database lama: isi indeks dari transaksi yang sudah ada
+            conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+
+        # Tabel posting: satu baris per sisi debit/kredit transaksi, lengkap dengan saldo kumulatif
+        # (debit - kredit) akun tersebut sampai posting ini, diurutkan per (tahun, bulan, tanggal, id)
+        posting_baru = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'posting'"
+        ).fetchone() is None
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS posting (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                transaksi_id INTEGER NOT NULL,
+                tanggal INTEGER NOT NULL,
+                bulan INTEGER NOT NULL,
+                tahun INTEGER NOT NULL,
+                akun TEXT NOT NULL,
+                jenis TEXT NOT NULL,
+                posisi TEXT NOT NULL,
+                nominal REAL NOT NULL,
+                lawan TEXT NOT NULL,
+                saldo REAL NOT NULL DEFAULT 0,
+                direkap INTEGER NOT NULL DEFAULT 1,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+        # direkap = 0: posting tidak ikut rekap_bulanan (jurnal penutup, saldo awal arsip, posting tahun
+        # yang sedang diarsipkan). Trigger rekap membaca kolom ini dari baris posting itu sendiri, karena
+        # saat posting dihapus lewat cascade transaksinya sudah tidak ada.
+        if tambah_kolom_jika_belum_ada(conn, 'posting', 'direkap', "INTEGER NOT NULL DEFAULT 1"):
+            conn.execute('''
+                UPDATE posting SET direkap = 0
+                WHERE transaksi_id = 0 OR transaksi_id IN (SELECT id FROM transactions WHERE sumber = 'penutup')
+            ''')
+            for trigger in ("transactions_posting_insert", "transactions_posting_update",
+                            "posting_rekap_insert", "posting_rekap_delete"):
+                conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_posting_akun ON posting (user_id, akun, tahun, bulan, tanggal, id)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_posting_transaksi ON posting (transaksi_id)')
+
+        # Tabel saldo_berjalan_kotor menandai posting paling awal yang saldo setelahnya perlu dihitung ulang
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS saldo_berjalan_kotor (
+                user_id INTEGER NOT NULL,
+                akun TEXT NOT NULL,
+                tahun INTEGER NOT NULL,
+                bulan INTEGER NOT NULL,
+                tanggal INTEGER NOT NULL,
+                posting_id INTEGER NOT NULL,
+                PRIMARY KEY (user_id, akun)
+            )
+        ''')
+
+        # Trigger: setiap transaksi menghasilkan posting debit dan kredit
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS transactions_posting_insert AFTER INSERT ON transactions BEGIN
+                INSERT INTO posting (user_id, transaksi_id, tanggal, bulan, tahun, akun, jenis, posisi, nominal, lawan, direkap)
+                VALUES (new.user_id, new.id, new.tanggal, new.bulan, new.tahun,
+                        new.akun_debit, new.jenis_debit, 'Debit', new.nominal_debit, new.akun_kredit,
+                        new.sumber != 'penutup');
+                INSERT INTO posting (user_id, transaksi_id, tanggal, bulan, tahun, akun, jenis, posisi, nominal, lawan, direkap)
+                VALUES (new.user_id, new.id, new.tanggal, new.bulan, new.tahun,
+                        new.akun_kredit, new.jenis_kredit, 'Kredit', new.nominal_kredit, new.akun_debit,
+                        new.sumber != 'penutup');
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS transactions_posting_delete AFTER DELETE ON transactions BEGIN
+                DELETE FROM posting WHERE transaksi_id = old.id;
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS transactions_posting_update AFTER UPDATE OF
+                user_id, tanggal, bulan, tahun, akun_debit, jenis_debit, nominal_debit,
+                akun_kredit, jenis_kredit, nominal_kredit ON transactions BEGIN
+                DELETE FROM posting WHERE transaksi_id = old.id;
+                INSERT INTO posting (user_id, transaksi_id, tanggal, bulan, tahun, akun, jenis, posisi, nominal, lawan, direkap)
+                VALUES (new.user_id, new.id, new.tanggal, new.bulan, new.tahun,
+                        new.akun_debit, new.jenis_debit, 'Debit', new.nominal_debit, new.akun_kredit,
+                        new.sumber != 'penutup');
+                INSERT INTO posting (user_id, transaksi_id, tanggal, bulan, tahun, akun, jenis, posisi, nominal, lawan, direkap)
+                VALUES (new.user_id, new.id, new.tanggal, new.bulan, new.tahun,
+                        new.akun_kredit, new.jenis_kredit, 'Kredit', new.nominal_kredit, new.akun_debit,
+                        new.sumber != 'penutup');
+            END
+        ''')
+
+        # Trigger: saldo posting baru = saldo posting sebelumnya + mutasi (satu pencarian indeks).
+        # Jika sudah ada posting yang lebih baru (transaksi mundur tanggal), akun ditandai kotor.
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS posting_saldo_insert AFTER INSERT ON posting BEGIN
+                UPDATE posting SET saldo = COALESCE((
+                    SELECT p.saldo FROM posting p
+                    WHERE p.user_id = new.user_id AND p.akun = new.akun
+                      AND (p.tahun, p.bulan, p.tanggal, p.id) < (new.tahun, new.bulan, new.tanggal, new.id)
+                    ORDER BY p.tahun DESC, p.bulan DESC, p.tanggal DESC, p.id DESC
+                    LIMIT 1
+                ), 0) + CASE new.posisi WHEN 'Debit' THEN new.nominal ELSE -new.nominal END
+                WHERE id = new.id;
+                INSERT INTO saldo_berjalan_kotor (user_id, akun, tahun, bulan, tanggal, posting_id)
+                SELECT new.user_id, new.akun, new.tahun, new.bulan, new.tanggal, new.id
+                WHERE EXISTS (
+                    SELECT 1 FROM posting p
+                    WHERE p.user_id = new.user_id AND p.akun = new.akun
+                      AND (p.tahun, p.bulan, p.tanggal, p.id) > (new.tahun, new.bulan, new.tanggal, new.id)
+                )
+                ON CONFLICT (user_id, akun) DO UPDATE SET
+                    tahun = excluded.tahun, bulan = excluded.bulan,
+                    tanggal = excluded.tanggal, posting_id = excluded.posting_id
+                WHERE (excluded.tahun, excluded.bulan, excluded.tanggal, excluded.posting_id)
+                    < (saldo_berjalan_kotor.tahun, saldo_berjalan_kotor.bulan,
+                       saldo_berjalan_kotor.tanggal, saldo_berjalan_kotor.posting_id);
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS posting_saldo_delete AFTER DELETE ON posting BEGIN
+                INSERT INTO saldo_berjalan_kotor (user_id, akun, tahun, bulan, tanggal, posting_id)
+                SELECT old.user_id, old.akun, old.tahun, old.bulan, old.tanggal, old.id
+                WHERE EXISTS (
+                    SELECT 1 FROM posting p
+                    WHERE p.user_id = old.user_id AND p.akun = old.akun
+                      AND (p.tahun, p.bulan, p.tanggal, p.id) > (old.tahun, old.bulan, old.tanggal, old.id)
+                )
+                ON CONFLICT (user_id, akun) DO UPDATE SET
+                    tahun = excluded.tahun, bulan = excluded.bulan,
+                    tanggal = excluded.tanggal, posting_id = excluded.posting_id
+                WHERE (excluded.tahun, excluded.bulan, excluded.tanggal, excluded.posting_id)
+                    < (saldo_berjalan_kotor.tahun, saldo_berjalan_kotor.bulan,
+                       saldo_berjalan_kotor.tanggal, saldo_berjalan_kotor.posting_id);
+            END
+        ''')
+        if posting_baru:
+            # Database lama: buat posting dari transaksi yang sudah ada, urut tanggal agar saldo langsung benar
+            conn.execute('''
+                INSERT INTO posting (user_id, transaksi_id, tanggal, bulan, tahun, akun, jenis, posisi, nominal, lawan, direkap)
+                SELECT user_id, transaksi_id, tanggal, bulan, tahun, akun, jenis, posisi, nominal, lawan, direkap FROM (
+                    SELECT user_id, id AS transaksi_id, tanggal, bulan, tahun, akun_debit AS akun,
+                           jenis_debit AS jenis, 'Debit' AS posisi, nominal_debit AS nominal, akun_kredit AS lawan,
+                           sumber != 'penutup' AS direkap
+                    FROM transactions
+                    UNION ALL
+                    SELECT user_id, id, tanggal, bulan, tahun, akun_kredit,
+                           jenis_kredit, 'Kredit', nominal_kredit, akun_debit, sumber != 'penutup'
+                    FROM transactions
+                )
+                ORDER BY tahun, bulan, tanggal, transaksi_id, posisi DESC
+            ''')
+
+        # Tabel rekap_bulanan: total debit/kredit per (bulan, akun, jenis), dijaga trigger pada posting.
+        # Jurnal penutup tidak direkap agar grafik pendapatan dan beban tetap menunjukkan aktivitas bulan itu.
+        rekap_baru = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'rekap_bulanan'"
+        ).fetchone() is None
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS rekap_bulanan (
+                user_id INTEGER NOT NULL,
+                tahun INTEGER NOT NULL,
+                bulan INTEGER NOT NULL,
+                akun TEXT NOT NULL,
+                jenis TEXT NOT NULL,
+                debit REAL NOT NULL DEFAULT 0,
+                kredit REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, tahun, bulan, akun, jenis)
+            )
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS posting_rekap_insert AFTER INSERT ON posting WHEN new.direkap
+            BEGIN
+                INSERT INTO rekap_bulanan (user_id, tahun, bulan, akun, jenis, debit, kredit)
+                VALUES (new.user_id, new.tahun, new.bulan, new.akun, new.jenis,
+                        CASE new.posisi WHEN 'Debit' THEN new.nominal ELSE 0 END,
+                        CASE new.posisi WHEN 'Kredit' THEN new.nominal ELSE 0 END)
+                ON CONFLICT (user_id, tahun, bulan, akun, jenis) DO UPDATE SET
+                    debit = debit + excluded.debit,
+                    kredit = kredit + excluded.kredit;
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS posting_rekap_delete AFTER DELETE ON posting WHEN old.direkap
+            BEGIN
+                UPDATE rekap_bulanan SET
+                    debit = debit - CASE old.posisi WHEN 'Debit' THEN old.nominal ELSE 0 END,
+                    kredit = kredit - CASE old.posisi WHEN 'Kredit' THEN old.nominal ELSE 0 END
+                WHERE user_id = old.user_id AND tahun = old.tahun AND bulan = old.bulan
+                  AND akun = old.akun AND jenis = old.jenis;
+            END
+        ''')
+        if rekap_baru:
+            # Database lama: isi rekap dari posting yang sudah ada dengan satu GROUP BY
+            conn.execute('''
+                INSERT INTO rekap_bulanan (user_id, tahun, bulan, akun, jenis, debit, kredit)
+                SELECT user_id, tahun, bulan, akun, jenis,
+                       SUM(CASE posisi WHEN 'Debit' THEN nominal ELSE 0 END),
+                       SUM(CASE posisi WHEN 'Kredit' THEN nominal ELSE 0 END)
+                FROM posting
+                WHERE direkap
+                GROUP BY user_id, tahun, bulan, akun, jenis
+            ''')
+
+        # Tabel arsip_tahun mencatat tahun buku yang sudah dipindah ke file arsip
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS arsip_tahun (
+                user_id INTEGER NOT NULL,
+                tahun INTEGER NOT NULL,
+                path TEXT NOT NULL,
+                jumlah_transaksi INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (user_id, tahun),
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+
+        # Tabel checksum_periode: total debit, total kredit dan jumlah baris per periode dijaga trigger
+        # (berlaku untuk semua jalur penulisan), sedangkan hash_isi hanya diperbarui oleh aplikasi.
+        # Baris yang ditulis di luar aplikasi membuat hash_isi tidak cocok saat diverifikasi.
+        checksum_baru = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'checksum_periode'"
+        ).fetchone() is None
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS checksum_periode (
+                user_id INTEGER NOT NULL,
+                tahun INTEGER NOT NULL,
+                bulan INTEGER NOT NULL,
+                total_debit REAL NOT NULL DEFAULT 0,
+                total_kredit REAL NOT NULL DEFAULT 0,
+                jumlah_baris INTEGER NOT NULL DEFAULT 0,
+                hash_isi INTEGER NOT NULL DEFAULT 0,
+                versi INTEGER NOT NULL DEFAULT 0,
+                versi_terverifikasi INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'OK',
+                diverifikasi_at TIMESTAMP,
+                PRIMARY KEY (user_id, tahun, bulan)
+            )
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS transactions_checksum_insert AFTER INSERT ON transactions BEGIN
+                INSERT INTO checksum_periode (user_id, tahun, bulan, total_debit, total_kredit, jumlah_baris, versi)
+                VALUES (new.user_id, new.tahun, new.bulan, new.nominal_debit, new.nominal_kredit, 1, 1)
+                ON CONFLICT (user_id, tahun, bulan) DO UPDATE SET
+                    total_debit = total_debit + excluded.total_debit,
+                    total_kredit = total_kredit + excluded.total_kredit,
+                    jumlah_baris = jumlah_baris + 1,
+                    versi = versi + 1;
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS transactions_checksum_delete AFTER DELETE ON transactions BEGIN
+                UPDATE checksum_periode SET
+                    total_debit = total_debit - old.nominal_debit,
+                    total_kredit = total_kredit - old.nominal_kredit,
+                    jumlah_baris = jumlah_baris - 1,
+                    versi = versi + 1
+                WHERE user_id = old.user_id AND tahun = old.tahun AND bulan = old.bulan;
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS transactions_checksum_update AFTER UPDATE ON transactions BEGIN
+                UPDATE checksum_periode SET
+                    total_debit = total_debit - old.nominal_debit,
+                    total_kredit = total_kredit - old.nominal_kredit,
+                    jumlah_baris = jumlah_baris - 1,
+                    versi = versi + 1
+                WHERE user_id = old.user_id AND tahun = old.tahun AND bulan = old.bulan;
+                INSERT INTO checksum_periode (user_id, tahun, bulan, total_debit, total_kredit, jumlah_baris, versi)
+                VALUES (new.user_id, new.tahun, new.bulan, new.nominal_debit, new.nominal_kredit, 1, 1)
+                ON CONFLICT (user_id, tahun, bulan) DO UPDATE SET
+                    total_debit = total_debit + excluded.total_debit,
+                    total_kredit = total_kredit + excluded.total_kredit,
+                    jumlah_baris = jumlah_baris + 1,
+                    versi = versi + 1;
+            END
+        ''')
+        # Tabel riwayat_perubahan: jejak audit setiap transaksi yang diubah atau dibatalkan.
+        # Isi transaksi sebelum dan sesudah perubahan disimpan sebagai JSON (kolom KOLOM_HASH).
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS riwayat_perubahan (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                transaksi_id INTEGER NOT NULL,
+                aksi TEXT NOT NULL,
+                data_lama TEXT NOT NULL,
+                data_baru TEXT,
+                alasan TEXT NOT NULL DEFAULT '',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_riwayat_perubahan_user ON riwayat_perubahan (user_id, id)')
+
+        # Jurnal majemuk: satu header (tanggal, keterangan) dengan banyak baris (akun, posisi, nominal).
+        # Setiap baris menjadi satu posting dengan transaksi_id = -id baris, sehingga buku besar,
+        # saldo berjalan, rekap bulanan dan laporan ikut membacanya lewat tabel posting.
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS journal_entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                tanggal INTEGER NOT NULL,
+                bulan INTEGER NOT NULL,
+                tahun INTEGER NOT NULL,
+                keterangan TEXT NOT NULL DEFAULT '',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_journal_entries_periode ON journal_entries (user_id, tahun, bulan, tanggal)')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS journal_lines (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                entry_id INTEGER NOT NULL,
+                akun TEXT NOT NULL,
+                jenis TEXT NOT NULL,
+                posisi TEXT NOT NULL CHECK (posisi IN ('Debit', 'Kredit')),
+                nominal REAL NOT NULL CHECK (nominal > 0),
+                FOREIGN KEY (entry_id) REFERENCES journal_entries (id)
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_journal_lines_entry ON journal_lines (entry_id)')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS journal_lines_posting_insert AFTER INSERT ON journal_lines BEGIN
+                INSERT INTO posting (user_id, transaksi_id, tanggal, bulan, tahun, akun, jenis, posisi, nominal, lawan)
+                SELECT e.user_id, -new.id, e.tanggal, e.bulan, e.tahun, new.akun, new.jenis, new.posisi, new.nominal,
+                       CASE WHEN e.keterangan != '' THEN e.keterangan ELSE 'Jurnal #' || e.id END
+                FROM journal_entries e WHERE e.id = new.entry_id;
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS journal_lines_posting_delete AFTER DELETE ON journal_lines BEGIN
+                DELETE FROM posting WHERE transaksi_id = -old.id;
+            END
+        ''')
+        # Baris jurnal dihapus sebelum headernya, agar trigger pada journal_lines masih bisa membaca
+        # periode jurnal dari journal_entries (trigger AFTER DELETE versi lama diganti)
+        conn.execute('DROP TRIGGER IF EXISTS journal_entries_delete')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS journal_entries_hapus_baris BEFORE DELETE ON journal_entries BEGIN
+                DELETE FROM journal_lines WHERE entry_id = old.id;
+            END
+        ''')
+
+        # Checksum periode juga mencakup baris jurnal majemuk (jalur tulis API): total per posisi dan
+        # jumlah baris dijaga trigger, hash_isi diperbarui aplikasi lewat catat_hash_jurnal.
+        checksum_jurnal_baru = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'journal_lines_checksum_insert'"
+        ).fetchone() is None
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS journal_lines_checksum_insert AFTER INSERT ON journal_lines BEGIN
+                INSERT INTO checksum_periode (user_id, tahun, bulan, total_debit, total_kredit, jumlah_baris, versi)
+                SELECT e.user_id, e.tahun, e.bulan,
+                       CASE new.posisi WHEN 'Debit' THEN new.nominal ELSE 0 END,
+                       CASE new.posisi WHEN 'Kredit' THEN new.nominal ELSE 0 END, 1, 1
+                FROM journal_entries e WHERE e.id = new.entry_id
+                ON CONFLICT (user_id, tahun, bulan) DO UPDATE SET
+                    total_debit = total_debit + excluded.total_debit,
+                    total_kredit = total_kredit + excluded.total_kredit,
+                    jumlah_baris = jumlah_baris + 1,
+                    versi = versi + 1;
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS journal_lines_checksum_delete AFTER DELETE ON journal_lines BEGIN
+                UPDATE checksum_periode SET
+                    total_debit = total_debit - CASE old.posisi WHEN 'Debit' THEN old.nominal ELSE 0 END,
+                    total_kredit = total_kredit - CASE old.posisi WHEN 'Kredit' THEN old.nominal ELSE 0 END,
+                    jumlah_baris = jumlah_baris - 1,
+                    versi = versi + 1
+                WHERE (user_id, tahun, bulan) = (SELECT user_id, tahun, bulan FROM journal_entries WHERE id = old.entry_id);
+            END
+        ''')
+        if checksum_baru or checksum_jurnal_baru:
+            # Database lama: hitung checksum awal semua periode dari transaksi dan jurnal yang sudah ada
+            hitung_ulang_checksum(conn)
+        # Indeks periode pada posting untuk agregasi saldo laporan dengan satu GROUP BY
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_posting_periode ON posting (user_id, tahun, bulan)')
+
+        # Tabel versi_laporan: nomor versi data laporan per pengguna, dinaikkan trigger pada setiap
+        # perubahan transaksi atau tutup buku. Cache laporan hanya dipakai jika versinya sama.
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS versi_laporan (
+                user_id INTEGER PRIMARY KEY,
+                versi INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        for nama, tabel, kejadian, baris in [
+            ("transactions_versi_insert", "transactions", "INSERT", "new"),
+            ("transactions_versi_update", "transactions", "UPDATE", "new"),
+            ("transactions_versi_delete", "transactions", "DELETE", "old"),
+            ("tutup_buku_versi_insert", "tutup_buku", "INSERT", "new"),
+            ("journal_entries_versi_insert", "journal_entries", "INSERT", "new"),
+            ("journal_entries_versi_delete", "journal_entries", "DELETE", "old"),
+        ]:
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {nama} AFTER {kejadian} ON {tabel} BEGIN
+                    INSERT INTO versi_laporan (user_id, versi) VALUES ({baris}.user_id, 1)
+                    ON CONFLICT (user_id) DO UPDATE SET versi = versi + 1;
+                END
+            ''')
+
+        # Tabel log_pemeliharaan mencatat durasi dan ruang yang dibebaskan setiap tugas pemeliharaan
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS log_pemeliharaan (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tugas TEXT NOT NULL,
+                durasi_ms REAL NOT NULL,
+                bytes_dibebaskan INTEGER NOT NULL DEFAULT 0,
+                keterangan TEXT NOT NULL DEFAULT '',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Tabel mutasi_persediaan menghubungkan transaksi dengan perubahan jumlah stok yang ditimbulkannya.
+        # Trigger menerapkan mutasi ke inventory, sehingga membatalkan transaksi cukup menghapus mutasinya.
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS mutasi_persediaan (
+                transaksi_id INTEGER PRIMARY KEY,
+                inventory_id INTEGER NOT NULL,
+                jumlah INTEGER NOT NULL,
+                FOREIGN KEY (inventory_id) REFERENCES inventory (id)
+            )
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS mutasi_persediaan_insert AFTER INSERT ON mutasi_persediaan BEGIN
+                UPDATE inventory SET jumlah = jumlah + new.jumlah WHERE id = new.inventory_id;
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS mutasi_persediaan_delete AFTER DELETE ON mutasi_persediaan BEGIN
+                UPDATE inventory SET jumlah = jumlah - old.jumlah WHERE id = old.inventory_id;
+            END
+        ''')
+
+        # Template transaksi berulang. berikutnya: tanggal kejadian berikutnya yang belum dibuat (YYYY-MM-DD);
+        # hari: tanggal dalam bulan untuk jadwal bulanan (disesuaikan untuk bulan yang lebih pendek)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS transaksi_berulang (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                nama TEXT NOT NULL,
+                akun_debit TEXT NOT NULL,
+                jenis_debit TEXT NOT NULL,
+                akun_kredit TEXT NOT NULL,
+                jenis_kredit TEXT NOT NULL,
+                nominal REAL NOT NULL CHECK (nominal > 0),
+                frekuensi TEXT NOT NULL CHECK (frekuensi IN ('Harian', 'Mingguan', 'Bulanan')),
+                hari INTEGER NOT NULL,
+                berikutnya TEXT NOT NULL,
+                selesai TEXT,
+                aktif INTEGER NOT NULL DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_berulang_jatuh_tempo ON transaksi_berulang (aktif, berikutnya)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_berulang_pengguna ON transaksi_berulang (user_id)')
+
+        # Anggaran bulanan per akun Pendapatan/Beban, dibandingkan dengan realisasi dari rekap_bulanan
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS budgets (
+                user_id INTEGER NOT NULL,
+                tahun INTEGER NOT NULL,
+                bulan INTEGER NOT NULL,
+                akun TEXT NOT NULL,
+                jenis TEXT NOT NULL CHECK (jenis IN ('Pendapatan', 'Beban')),
+                nominal REAL NOT NULL CHECK (nominal >= 0),
+                PRIMARY KEY (user_id, tahun, bulan, akun, jenis),
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+
+# Fungsi untuk menambahkan kolom baru pada database lama yang tabelnya sudah ada (True jika kolom baru ditambahkan)
+def tambah_kolom_jika_belum_ada(conn, tabel, kolom, definisi):
+    kolom_ada = [row['name'] for row in conn.execute(f'PRAGMA table_info({tabel})')]
+    if kolom not in kolom_ada:
+        conn.execute(f'ALTER TABLE {tabel} ADD COLUMN {kolom} {definisi}')
+        return True
+    return False
+
+# Fungsi untuk hash password menggunakan SHA256
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+# Fungsi untuk mendaftarkan pengguna baru
+def register_user(username, password):
+    with get_db_connection() as conn:
+        try:
+            conn.execute(
+                'INSERT INTO users (username, password) VALUES (?, ?)',
+                (username, hash_password(password))
+            )
+            return True, "Pendaftaran berhasil! Silakan login."
+        except sqlite3.IntegrityError:
+            return False, "Username sudah terdaftar."
+
+# Fungsi verifikasi login pengguna
+def login_user(username, password):
+    with get_db_connection() as conn:
+        user = conn.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
+    if user and user['password'] == hash_password(password):
+        return True, user['id'], user['username']
+    else:
+        return False, None, None
+
+# Fungsi untuk memasukkan transaksi baru ke database.
+# mutasi: (inventory_id, jumlah) jika transaksi ini menambah (+) atau mengurangi (-) stok persediaan.
+def insert_transaction(user_id, tanggal, bulan, tahun,
+                       akun_debit, jenis_debit, nominal_debit,
+                       akun_kredit, jenis_kredit, nominal_kredit, mutasi=None):
+    with get_db_connection() as conn:
+        cek_periode_terbuka(conn, user_id, tahun, bulan)
+        transaksi_id = tulis_transaksi(conn, user_id, tanggal, bulan, tahun,
+                                       akun_debit, jenis_debit, nominal_debit,
+                                       akun_kredit, jenis_kredit, nominal_kredit)
+        if mutasi:
+            conn.execute(
+                'INSERT INTO mutasi_persediaan (transaksi_id, inventory_id, jumlah) VALUES (?, ?, ?)',
+                (transaksi_id, *mutasi)
+            )
+    jadwalkan_prahitung(user_id)
+    return transaksi_id
+
+# Fungsi untuk menolak penulisan ke periode yang sudah ditutup (ValueError)
+def cek_periode_terbuka(conn, user_id, tahun, bulan, objek="transaksi"):
+    terakhir = get_periode_tutup_terakhir(conn, user_id)
+    if terakhir and (tahun, bulan) <= terakhir:
+        raise ValueError(f"Periode {bulan:02d}-{tahun} sudah ditutup, {objek} tidak dapat disimpan.")
+
+# Fungsi untuk menulis satu baris transaksi pada koneksi yang sudah terbuka, sekaligus memperbarui hash isi periode.
+# Semua penulisan transaksi dari aplikasi harus lewat fungsi ini.
+def tulis_transaksi(conn, user_id, tanggal, bulan, tahun,
+                    akun_debit, jenis_debit, nominal_debit,
+                    akun_kredit, jenis_kredit, nominal_kredit, sumber="umum"):
+    transaksi_id = conn.execute('''
+        INSERT INTO transactions 
+        (user_id, tanggal, bulan, tahun,
+         akun_debit, jenis_debit, nominal_debit,
+         akun_kredit, jenis_kredit, nominal_kredit, sumber)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (user_id, tanggal, bulan, tahun,
+          akun_debit, jenis_debit, nominal_debit,
+          akun_kredit, jenis_kredit, nominal_kredit, sumber)
+    ).lastrowid
+    catat_hash_transaksi(conn, transaksi_id)
+    return transaksi_id
+
+# Fungsi untuk menulis banyak transaksi sekaligus pada koneksi yang sudah terbuka (tanpa commit).
+# baris: daftar (user_id, tanggal, bulan, tahun, akun_debit, jenis_debit, nominal_debit,
+# akun_kredit, jenis_kredit, nominal_kredit). Baris disisipkan dengan satu executemany, lalu hash
+# isi periode dijumlahkan per periode dan ditulis dengan satu UPDATE per periode.
+def tulis_transaksi_massal(conn, baris, sumber="umum"):
+    if not baris:
+        return 0
+    id_awal = conn.execute('SELECT COALESCE(MAX(id), 0) FROM transactions').fetchone()[0]
+    conn.executemany('''
+        INSERT INTO transactions
+        (user_id, tanggal, bulan, tahun,
+         akun_debit, jenis_debit, nominal_debit,
+         akun_kredit, jenis_kredit, nominal_kredit, sumber)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [(*b, sumber) for b in baris])
+
+    hash_periode = {}
+    for row in iter_baris(conn, SQL_LAPORAN["hash_transaksi_sejak"], (id_awal,)):
+        kunci = (row[1], row[4], row[3])
+        hash_periode[kunci] = (hash_periode.get(kunci, 0) + hash_baris(row)) % MODULUS_HASH
+    conn.executemany('''
+        UPDATE checksum_periode SET hash_isi = (hash_isi + ?) % ?
+        WHERE user_id = ? AND tahun = ? AND bulan = ?
+    ''', [(h, MODULUS_HASH, *kunci) for kunci, h in hash_periode.items()])
+    return len(baris)
+
+# Fungsi untuk mengambil satu transaksi jurnal umum milik pengguna yang masih boleh diubah.
+# Mengembalikan (row, pesan_error); row None jika transaksi tidak ditemukan, jurnal penutup, atau periodenya ditutup.
+def get_transaksi_terbuka(conn, user_id, transaksi_id):
+    row = conn.execute(SQL_LAPORAN["transaksi_milik_pengguna"], (transaksi_id, user_id)).fetchone()
+    if not row:
+        return None, "Transaksi tidak ditemukan (mungkin sudah dibatalkan atau diarsipkan)."
+    if row['sumber'] == 'penutup':
+        return None, "Jurnal penutup tidak dapat diubah atau dibatalkan."
+    terakhir = get_periode_tutup_terakhir(conn, user_id)
+    if terakhir and (row['tahun'], row['bulan']) <= terakhir:
+        return None, f"Periode {row['bulan']:02d}-{row['tahun']} sudah ditutup, transaksi tidak dapat diubah."
+    return row, None
+
+# Fungsi untuk mengubah transaksi dengan jejak audit. Posting, saldo berjalan, rekap bulanan, indeks
+# pencarian dan checksum ikut disesuaikan sebesar selisihnya oleh trigger, tanpa menghitung ulang semuanya.
+# Transaksi yang mencatat mutasi stok tidak dapat diubah (batalkan lalu catat ulang), agar buku tetap
+# cocok dengan jumlah dan harga persediaan.
+def ubah_transaksi(user_id, transaksi_id, tanggal, bulan, tahun,
+                   akun_debit, jenis_debit, nominal_debit,
+                   akun_kredit, jenis_kredit, nominal_kredit, alasan=""):
+    pesan = validasi_baris_jurnal([(akun_debit, jenis_debit, "Debit", nominal_debit),
+                                   (akun_kredit, jenis_kredit, "Kredit", nominal_kredit)])
+    if pesan:
+        return False, pesan
+    with get_db_connection() as conn:
+        lama, pesan = get_transaksi_terbuka(conn, user_id, transaksi_id)
+        if not lama:
+            return False, pesan
+        mutasi = conn.execute(SQL_LAPORAN["mutasi_transaksi"], (transaksi_id,)).fetchone()
+        if mutasi:
+            return False, (f"Transaksi ini mencatat mutasi stok {mutasi['nama']} dan tidak dapat diubah. "
+                           "Batalkan transaksi lalu catat ulang mutasinya di halaman Persediaan.")
+        terakhir = get_periode_tutup_terakhir(conn, user_id)
+        if terakhir and (tahun, bulan) <= terakhir:
+            return False, f"Periode {bulan:02d}-{tahun} sudah ditutup, transaksi tidak dapat dipindah ke sana."
+
+        catat_hash_transaksi(conn, transaksi_id, tanda=-1)
+        conn.execute('''
+            UPDATE transactions SET tanggal = ?, bulan = ?, tahun = ?,
+                akun_debit = ?, jenis_debit = ?, nominal_debit = ?,
+                akun_kredit = ?, jenis_kredit = ?, nominal_kredit = ?
+            WHERE id = ?
+        ''', (tanggal, bulan, tahun, akun_debit, jenis_debit, nominal_debit,
+              akun_kredit, jenis_kredit, nominal_kredit, transaksi_id))
+        catat_hash_transaksi(conn, transaksi_id)
+
+        baru = conn.execute(SQL_LAPORAN["hash_transaksi"], (transaksi_id,)).fetchone()
+        conn.execute('''
+            INSERT INTO riwayat_perubahan (user_id, transaksi_id, aksi, data_lama, data_baru, alasan)
+            VALUES (?, ?, 'ubah', ?, ?, ?)
+        ''', (user_id, transaksi_id, json.dumps(dict(lama)), json.dumps(dict(baru)), alasan))
+    jadwalkan_prahitung(user_id)
+    return True, "Transaksi berhasil diubah."
+
+# Fungsi untuk membatalkan (menghapus) transaksi dengan jejak audit. Data turunan dikurangi sebesar
+# transaksi itu saja; mutasi stok yang ditimbulkannya dikembalikan lewat trigger mutasi_persediaan.
+def batalkan_transaksi(user_id, transaksi_id, alasan=""):
+    with get_db_connection() as conn:
+        lama, pesan = get_transaksi_terbuka(conn, user_id, transaksi_id)
+        if not lama:
+            return False, pesan
+
+        mutasi = conn.execute(SQL_LAPORAN["mutasi_transaksi"], (transaksi_id,)).fetchone()
+        if mutasi and mutasi['stok'] - mutasi['jumlah'] < 0:
+            return False, f"Stok {mutasi['nama']} tidak cukup untuk membatalkan transaksi ini (stok {mutasi['stok']})."
+
+        catat_hash_transaksi(conn, transaksi_id, tanda=-1)
+        conn.execute('DELETE FROM mutasi_persediaan WHERE transaksi_id = ?', (transaksi_id,))
+        conn.execute('DELETE FROM transactions WHERE id = ?', (transaksi_id,))
+        conn.execute('''
+            INSERT INTO riwayat_perubahan (user_id, transaksi_id, aksi, data_lama, alasan)
+            VALUES (?, ?, 'batal', ?, ?)
+        ''', (user_id, transaksi_id, json.dumps(dict(lama)), alasan))
+    jadwalkan_prahitung(user_id)
+    if mutasi:
+        return True, f"Transaksi dibatalkan, stok {mutasi['nama']} dikoreksi {-mutasi['jumlah']:+d} unit."
+    return True, "Transaksi berhasil dibatalkan."
+
+# Fungsi untuk memeriksa baris jurnal majemuk: nama akun terisi, jenis akun dikenal, minimal satu debit
+# dan satu kredit, nominal positif, dan total debit sama dengan total kredit.
+# Dipakai form input maupun API. Mengembalikan pesan kesalahan atau None jika seimbang.
+def validasi_baris_jurnal(baris):
+    if len(baris) < 2:
+        return "Jurnal majemuk minimal terdiri dari dua baris."
+    total = {"Debit": 0.0, "Kredit": 0.0}
+    for akun, jenis, posisi, nominal in baris:
+        if not isinstance(akun, str) or not akun.strip():
+            return "Nama akun setiap baris harus diisi."
+        if jenis not in JENIS_AKUN:
+            return f"Jenis akun {akun} harus salah satu dari {', '.join(JENIS_AKUN)}, bukan {jenis}."
+        if posisi not in total:
+            return f"Posisi baris harus Debit atau Kredit, bukan {posisi}."
+        if nominal <= 0:
+            return f"Nominal akun {akun} harus lebih dari 0."
+        total[posisi] += nominal
+    if not total["Debit"] or not total["Kredit"]:
+        return "Jurnal harus memiliki baris debit dan baris kredit."
+    if round(total["Debit"] - total["Kredit"], 2) != 0:
+        return (f"Jurnal tidak seimbang: total debit {format_rupiah(total['Debit'])} "
+                f"≠ total kredit {format_rupiah(total['Kredit'])}.")
+    return None
+
+# Fungsi untuk menyimpan jurnal majemuk (header + baris). baris: daftar (akun, jenis, posisi, nominal).
+def insert_jurnal(user_id, tanggal, bulan, tahun, keterangan, baris):
+    with get_db_connection() as conn:
+        entry_id = tulis_jurnal(conn, user_id, tanggal, bulan, tahun, keterangan, baris)
+    jadwalkan_prahitung(user_id)
+    return entry_id
+
+# Fungsi untuk memvalidasi dan menulis jurnal majemuk pada koneksi yang sudah terbuka (tanpa commit).
+# Posting tiap baris dibuat oleh trigger journal_lines_posting_insert.
+def tulis_jurnal(conn, user_id, tanggal, bulan, tahun, keterangan, baris):
+    pesan = validasi_baris_jurnal(baris)
+    if pesan:
+        raise ValueError(pesan)
+    cek_periode_terbuka(conn, user_id, tahun, bulan, "jurnal")
+    entry_id = conn.execute('''
+        INSERT INTO journal_entries (user_id, tanggal, bulan, tahun, keterangan) VALUES (?, ?, ?, ?, ?)
+    ''', (user_id, tanggal, bulan, tahun, keterangan)).lastrowid
+    conn.executemany('''
+        INSERT INTO journal_lines (entry_id, akun, jenis, posisi, nominal) VALUES (?, ?, ?, ?, ?)
+    ''', [(entry_id, akun.strip(), jenis, posisi, nominal) for akun, jenis, posisi, nominal in baris])
+    catat_hash_jurnal(conn, entry_id)
+    return entry_id
+
+# Fungsi untuk mengambil jurnal majemuk terbaru pengguna beserta barisnya
+def get_jurnal_majemuk(user_id, limit=PER_HALAMAN):
+    with get_db_connection() as conn:
+        jurnal = conn.execute(SQL_LAPORAN["jurnal_majemuk"], (user_id, limit)).fetchall()
+        hasil = [(j, conn.execute(SQL_LAPORAN["baris_jurnal"], (j['id'],)).fetchall()) for j in jurnal]
+    return hasil
+
+# Fungsi untuk membatalkan jurnal majemuk dengan jejak audit; posting barisnya ikut terhapus lewat trigger
+def batalkan_jurnal(user_id, entry_id, alasan=""):
+    with get_db_connection() as conn:
+        jurnal = conn.execute(SQL_LAPORAN["jurnal_milik_pengguna"], (entry_id, user_id)).fetchone()
+        if not jurnal:
+            return False, "Jurnal tidak ditemukan (mungkin sudah dibatalkan)."
+        terakhir = get_periode_tutup_terakhir(conn, user_id)
+        if terakhir and (jurnal['tahun'], jurnal['bulan']) <= terakhir:
+            return False, f"Periode {jurnal['bulan']:02d}-{jurnal['tahun']} sudah ditutup, jurnal tidak dapat dibatalkan."
+
+        baris = conn.execute(SQL_LAPORAN["baris_jurnal"], (entry_id,)).fetchall()
+        data_lama = dict(jurnal)
+        data_lama["baris"] = [dict(b) for b in baris]
+        catat_hash_jurnal(conn, entry_id, tanda=-1)
+        conn.execute('DELETE FROM journal_entries WHERE id = ?', (entry_id,))
+        conn.execute('''
+            INSERT INTO riwayat_perubahan (user_id, transaksi_id, aksi, data_lama, alasan)
+            VALUES (?, ?, 'batal_jurnal', ?, ?)
+        ''', (user_id, entry_id, json.dumps(data_lama), alasan))
+    jadwalkan_prahitung(user_id)
+    return True, "Jurnal majemuk berhasil dibatalkan."
+
+# Fungsi untuk mengambil jejak audit perubahan transaksi pengguna (terbaru dulu)
+def get_riwayat_perubahan(user_id, limit=PER_HALAMAN):
+    with get_db_connection() as conn:
+        perubahan = conn.execute(SQL_LAPORAN["riwayat_perubahan"], (user_id, limit)).fetchall()
+    return perubahan
+
+# Fungsi untuk mengambil data transaksi pengguna (dibaca bertahap, tidak dimuat sekaligus)
+def get_transactions(user_id):
+    with get_db_connection() as conn:
+        yield from iter_transaksi(conn, user_id)
+
+# Fungsi untuk membaca transaksi pengguna secara bertahap sebagai objek Transaksi (terbaru dulu)
+def iter_transaksi(conn, user_id):
+    return iter_baris(conn, SQL_LAPORAN["transaksi_pengguna"], (user_id,), kelas=Transaksi)
+
+# Fungsi untuk mengambil daftar nama akun yang pernah dipakai pengguna
+def get_daftar_akun(user_id):
+    with get_db_connection() as conn:
+        akun = conn.execute(SQL_LAPORAN["daftar_akun"], (user_id, user_id)).fetchall()
+    return [a['akun'] for a in akun]
+
+# Fungsi untuk mengubah teks pencarian menjadi query FTS5 (setiap kata dicari sebagai awalan)
+def buat_query_fts(kata_kunci):
+    kata = re.findall(r"\w+", kata_kunci)
+    return " ".join(f'"{k}"*' for k in kata)
+
+# Fungsi untuk mencari transaksi dengan filter teks, akun, nominal dan tanggal.
+# Hasil dibagi per halaman dengan keyset (kursor = tahun, bulan, tanggal, id baris terakhir)
+# sehingga halaman mana pun hanya membaca baris yang ditampilkan.
+def cari_transaksi(user_id, kata_kunci="", akun=None, nominal_min=None, nominal_max=None,
+                   dari=None, sampai=None, kursor=None, per_halaman=PER_HALAMAN):
+    kondisi = ['t.user_id = ?']
+    params = [user_id]
+
+    # Hasil FTS dipakai sebagai himpunan id sehingga urutan tetap diambil dari indeks periode
+    query_fts = buat_query_fts(kata_kunci or "")
+    if query_fts:
+        kondisi.append('t.id IN (SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH ?)')
+        params.append(query_fts)
+    if akun:
+        kondisi.append('(t.akun_debit = ? OR t.akun_kredit = ?)')
+        params += [akun, akun]
+    if nominal_min is not None:
+        kondisi.append('t.nominal_debit >= ?')
+        params.append(nominal_min)
+    if nominal_max is not None:
+        kondisi.append('t.nominal_debit <= ?')
+        params.append(nominal_max)
+    if dari:
+        kondisi.append('(t.tahun, t.bulan, t.tanggal) >= (?, ?, ?)')
+        params += [dari.year, dari.month, dari.day]
+    if sampai:
+        kondisi.append('(t.tahun, t.bulan, t.tanggal) <= (?, ?, ?)')
+        params += [sampai.year, sampai.month, sampai.day]
+    if kursor:
+        kondisi.append('(t.tahun, t.bulan, t.tanggal, t.id) < (?, ?, ?, ?)')
+        params += list(kursor)
+
+    with get_db_connection() as conn:
+        # File arsip hanya dibuka jika filter tanggal menjangkau tahun yang sudah diarsipkan
+        tabel = buka_arsip(conn, user_id, dari.year) if dari else 'transactions'
+        if query_fts and tabel != 'transactions':
+            # Indeks FTS hanya mencakup data aktif, data arsip dicocokkan dengan LIKE
+            indeks = kondisi.index('t.id IN (SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH ?)')
+            kata = re.findall(r"\w+", kata_kunci)
+            kondisi[indeks] = ' AND '.join(['(t.akun_debit LIKE ? OR t.akun_kredit LIKE ?)'] * len(kata))
+            params[indeks:indeks + 1] = [f"%{k}%" for k in kata for _ in range(2)]
+
+        query = SQL_LAPORAN["cari_transaksi"].format(tabel=tabel, kondisi=' AND '.join(kondisi))
+        transactions = list(iter_baris(conn, query, params + [per_halaman + 1], kelas=Transaksi))
+
+    ada_berikutnya = len(transactions) > per_halaman
+    return transactions[:per_halaman], ada_berikutnya
+
+# Fungsi untuk menghitung ulang saldo berjalan akun yang ditandai kotor (karena transaksi mundur tanggal).
+# Hanya posting mulai dari tanda kotor yang dihitung ulang, dengan saldo posting sebelumnya sebagai dasar.
+def perbaiki_saldo_berjalan(user_id):
+    with get_db_connection() as conn:
+        jumlah = tulis_saldo_berjalan(conn, user_id)
+    return jumlah
+
+# Fungsi untuk menghitung ulang saldo berjalan yang ditandai kotor pada koneksi yang sudah terbuka (tanpa commit)
+def tulis_saldo_berjalan(conn, user_id):
+    # Umumnya tidak ada tanda kotor: diperiksa dulu tanpa kunci tulis agar halaman laporan tidak mengantre
+    if not conn.execute(SQL_LAPORAN["saldo_kotor"], (user_id,)).fetchall():
+        return 0
+    # Baca tanda, hitung ulang dan hapus tanda dalam satu transaksi tulis. Tanpa BEGIN IMMEDIATE, tanda
+    # baru dari insert mundur tanggal yang di-commit di antara pembacaan dan DELETE ikut terhapus.
+    conn.execute('BEGIN IMMEDIATE')
+    tanda_kotor = conn.execute(SQL_LAPORAN["saldo_kotor"], (user_id,)).fetchall()
+    for tanda in tanda_kotor:
+        kunci = (tanda['tahun'], tanda['bulan'], tanda['tanggal'], tanda['posting_id'])
+        dasar = conn.execute(
+            SQL_LAPORAN["saldo_posting_sebelum"], (user_id, tanda['akun'], *kunci)
+        ).fetchone()
+        conn.execute(
+            SQL_LAPORAN["hitung_saldo_berjalan"],
+            (dasar['saldo'] if dasar else 0.0, user_id, tanda['akun'], *kunci)
+        )
+        conn.execute('DELETE FROM saldo_berjalan_kotor WHERE user_id = ? AND akun = ?', (user_id, tanda['akun']))
+    if tanda_kotor:
+        # Saldo posting berubah tanpa melewati trigger versi: versi laporan dinaikkan di transaksi yang sama,
+        # agar halaman buku besar yang di-cache sebelum perbaikan (saldo berjalan lama) tidak terpakai lagi
+        conn.execute('''
+            INSERT INTO versi_laporan (user_id, versi) VALUES (?, 1)
+            ON CONFLICT (user_id) DO UPDATE SET versi = versi + 1
+        ''', (user_id,))
+    return len(tanda_kotor)
+
+# Fungsi untuk mengambil saldo kumulatif (debit - kredit) akun sampai tanggal tertentu lewat satu pencarian indeks
+def get_saldo_akun_per_tanggal(conn, user_id, akun, tanggal=None):
+    batas = (tanggal.year, tanggal.month, tanggal.day) if tanggal else (9999, 12, 31)
+    row = conn.execute(SQL_LAPORAN["saldo_akun_per_tanggal"], (user_id, akun, *batas)).fetchone()
+    return row['saldo'] if row else 0.0
+
+# Fungsi untuk mengambil satu halaman posting akun (urut tanggal, lengkap dengan saldo berjalannya).
+# Tanpa kursor diambil halaman terbaru; dengan kursor (tahun, bulan, tanggal, id) diambil posting sebelum kursor.
+# Halaman dicari mundur lewat idx_posting_akun tanpa COUNT/OFFSET, sehingga biayanya tidak bergantung
+# pada panjang riwayat akun. Mengembalikan (posting, ada_sebelumnya).
+def get_posting_akun(conn, user_id, akun, kursor=None, limit=PER_HALAMAN):
+    query = SQL_LAPORAN["halaman_posting_akun"].format(kursor=KURSOR_POSTING if kursor else "")
+    params = (user_id, akun, *(kursor or ()), limit + 1)
+    posting = list(iter_baris(conn, query, params, kelas=Posting))
+    return posting[:limit][::-1], len(posting) > limit
+
+# Fungsi untuk menentukan lokasi file arsip sebuah tahun buku (satu file per tahun, di samping database utama)
+def get_path_arsip(tahun):
+    folder = os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "arsip")
+    return os.path.join(folder, f"jurnal_{tahun}.db")
+
+# Fungsi untuk mengambil daftar tahun yang sudah diarsipkan
+def get_daftar_arsip(user_id):
+    with get_db_connection() as conn:
+        arsip = conn.execute(SQL_LAPORAN["daftar_arsip"], (user_id,)).fetchall()
+    return arsip
+
+# Fungsi untuk menempelkan (ATTACH) file arsip tahun >= dari_tahun ke koneksi dan membuat view
+# gabungan dengan transaksi aktif. Mengembalikan nama tabel/view yang harus dipakai query.
+def buka_arsip(conn, user_id, dari_tahun):
+    arsip = conn.execute(SQL_LAPORAN["arsip_sejak"], (user_id, dari_tahun)).fetchall()
+    if not arsip:
+        return 'transactions'
+
+    kolom = ", ".join(KOLOM_ARSIP)
+    sumber = [f"SELECT {kolom} FROM main.transactions"]
+    terpasang = {row['name'] for row in conn.execute('PRAGMA database_list')}
+    for a in arsip:
+        nama = f"arsip_{a['tahun']}"
+        if nama not in terpasang:
+            conn.execute('ATTACH DATABASE ? AS ' + nama, (f"file:{quote(a['path'])}?mode=ro",))
+        sumber.append(f"SELECT {kolom} FROM {nama}.transactions")
+    conn.execute('DROP VIEW IF EXISTS temp.semua_transaksi')
+    conn.execute(f"CREATE TEMP VIEW semua_transaksi AS {' UNION ALL '.join(sumber)}")
+    return 'semua_transaksi'
+
+# Fungsi untuk memindahkan transaksi satu tahun buku yang sudah ditutup ke file arsip tahunan.
+# Yang tertinggal di database utama: snapshot saldo akhir tahun, rekap bulanan, dan satu posting
+# "saldo awal" per akun yang membawa saldo berjalan dari tahun yang diarsipkan.
+def arsipkan_tahun(user_id, tahun):
+    # Saldo berjalan harus sudah benar sebelum posting tahun ini dihapus
+    perbaiki_saldo_berjalan(user_id)
+
+    conn = get_db_connection()
+    try:
+        tutup = conn.execute(
+            'SELECT 1 FROM tutup_buku WHERE user_id = ? AND tahun = ? AND bulan = 12', (user_id, tahun)
+        ).fetchone()
+        if not tutup:
+            return False, f"Tahun {tahun} belum ditutup (tutup buku tahunan diperlukan sebelum diarsipkan)."
+        if conn.execute('SELECT 1 FROM arsip_tahun WHERE user_id = ? AND tahun = ?', (user_id, tahun)).fetchone():
+            return False, f"Tahun {tahun} sudah diarsipkan."
+
+        path = get_path_arsip(tahun)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        kolom = ", ".join(KOLOM_ARSIP)
+
+        # ATTACH tidak bisa dilakukan di dalam transaksi, jadi dipasang sebelum perubahan data
+        conn.execute('ATTACH DATABASE ? AS arsip', (path,))
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS arsip.transactions (
+                    id INTEGER PRIMARY KEY,
+                    user_id INTEGER NOT NULL,
+                    tanggal INTEGER NOT NULL,
+                    bulan INTEGER NOT NULL,
+                    tahun INTEGER NOT NULL,
+                    akun_debit TEXT NOT NULL,
+                    jenis_debit TEXT NOT NULL,
+                    nominal_debit REAL NOT NULL,
+                    akun_kredit TEXT NOT NULL,
+                    jenis_kredit TEXT NOT NULL,
+                    nominal_kredit REAL NOT NULL,
+                    sumber TEXT NOT NULL,
+                    created_at TIMESTAMP
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS arsip.idx_arsip_periode ON transactions (user_id, tahun, bulan, tanggal)')
+            # INSERT OR IGNORE agar pengarsipan yang terputus bisa diulang tanpa duplikasi
+            jumlah = conn.execute(f'''
+                INSERT OR IGNORE INTO arsip.transactions ({kolom})
+                SELECT {kolom} FROM main.transactions WHERE user_id = ? AND tahun = ?
+            ''', (user_id, tahun)).rowcount
+
+            # Jurnal majemuk tahun ini ikut diarsipkan (header dan barisnya)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS arsip.journal_entries (
+                    id INTEGER PRIMARY KEY,
+                    user_id INTEGER NOT NULL,
+                    tanggal INTEGER NOT NULL,
+                    bulan INTEGER NOT NULL,
+                    tahun INTEGER NOT NULL,
+                    keterangan TEXT NOT NULL,
+                    created_at TIMESTAMP
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS arsip.journal_lines (
+                    id INTEGER PRIMARY KEY,
+                    entry_id INTEGER NOT NULL,
+                    akun TEXT NOT NULL,
+                    jenis TEXT NOT NULL,
+                    posisi TEXT NOT NULL,
+                    nominal REAL NOT NULL
+                )
+            ''')
+            jumlah += conn.execute('''
+                INSERT OR IGNORE INTO arsip.journal_entries (id, user_id, tanggal, bulan, tahun, keterangan, created_at)
+                SELECT id, user_id, tanggal, bulan, tahun, keterangan, created_at FROM main.journal_entries
+                WHERE user_id = ? AND tahun = ?
+            ''', (user_id, tahun)).rowcount
+            conn.execute('''
+                INSERT OR IGNORE INTO arsip.journal_lines (id, entry_id, akun, jenis, posisi, nominal)
+                SELECT l.id, l.entry_id, l.akun, l.jenis, l.posisi, l.nominal
+                FROM main.journal_lines l JOIN main.journal_entries e ON e.id = l.entry_id
+                WHERE e.user_id = ? AND e.tahun = ?
+            ''', (user_id, tahun))
+
+        with conn:
+            # Rekap bulanan tahun ini tetap disimpan untuk grafik multi-tahun: posting tahun ini dilepas
+            # dari rekap sebelum dihapus, sehingga trigger posting_rekap_delete tidak mengurangi rekapnya
+            conn.execute('UPDATE posting SET direkap = 0 WHERE user_id = ? AND tahun = ?', (user_id, tahun))
+
+            conn.execute('DELETE FROM transactions WHERE user_id = ? AND tahun = ?', (user_id, tahun))
+            conn.execute('DELETE FROM journal_entries WHERE user_id = ? AND tahun = ?', (user_id, tahun))
+            # Posting saldo awal tahun arsip sebelumnya sudah digantikan oleh posting saldo awal tahun ini
+            conn.execute('DELETE FROM posting WHERE user_id = ? AND transaksi_id = 0 AND tahun < ?', (user_id, tahun))
+
+            # Posting saldo awal membawa saldo kumulatif (debit - kredit) akhir tahun dari snapshot
+            saldo_akhir = conn.execute('''
+                SELECT akun, MIN(jenis) AS jenis, SUM(debit - kredit) AS saldo FROM saldo_snapshot
+                WHERE user_id = ? AND tahun = ? AND bulan = 12
+                GROUP BY akun
+            ''', (user_id, tahun)).fetchall()
+            for row in saldo_akhir:
+                posting_id = conn.execute('''
+                    INSERT INTO posting (user_id, transaksi_id, tanggal, bulan, tahun, akun, jenis, posisi, nominal, lawan, direkap)
+                    VALUES (?, 0, 31, 12, ?, ?, ?, 'Saldo', 0, ?, 0)
+                ''', (user_id, tahun, row['akun'], row['jenis'], f"Arsip {tahun}")).lastrowid
+                conn.execute('UPDATE posting SET saldo = ? WHERE id = ?', (row['saldo'], posting_id))
+
+            # Checksum tahun arsip tidak lagi berlaku untuk tabel transaksi aktif
+            conn.execute('DELETE FROM checksum_periode WHERE user_id = ? AND tahun = ?', (user_id, tahun))
+
+            # Menghapus awal riwayat tidak mengubah saldo kumulatif posting sesudahnya
+            conn.execute('DELETE FROM saldo_berjalan_kotor WHERE user_id = ?', (user_id,))
+            conn.execute('''
+                INSERT INTO arsip_tahun (user_id, tahun, path, jumlah_transaksi) VALUES (?, ?, ?, ?)
+            ''', (user_id, tahun, path, jumlah))
+        conn.execute('DETACH DATABASE arsip')
+    finally:
+        conn.close()
+
+    jadwalkan_prahitung(user_id)
+
+    return True, f"{jumlah} transaksi tahun {tahun} dipindahkan ke arsip {os.path.basename(path)}."
+
+# Fungsi untuk menghitung hash satu baris transaksi (urutan kolom mengikuti KOLOM_HASH)
+def hash_baris(row):
+    isi = "\x1f".join(repr(v) for v in row).encode()
+    return int.from_bytes(hashlib.blake2b(isi, digest_size=8).digest(), "big") % MODULUS_HASH
+
+# Fungsi untuk menambahkan (tanda=1) atau mengurangkan (tanda=-1) hash sebuah transaksi ke checksum periodenya
+def catat_hash_transaksi(conn, transaksi_id, tanda=1):
+    row = conn.execute(SQL_LAPORAN["hash_transaksi"], (transaksi_id,)).fetchone()
+    h = hash_baris(tuple(row)) if tanda > 0 else MODULUS_HASH - hash_baris(tuple(row))
+    conn.execute('''
+        UPDATE checksum_periode SET hash_isi = (hash_isi + ?) % ?
+        WHERE user_id = ? AND tahun = ? AND bulan = ?
+    ''', (h, MODULUS_HASH, row['user_id'], row['tahun'], row['bulan']))
+
+# Fungsi untuk menghitung hash satu baris jurnal majemuk (urutan kolom mengikuti KOLOM_HASH_JURNAL);
+# diberi penanda agar tidak bisa tertukar dengan hash baris transaksi
+def hash_baris_jurnal(row):
+    return hash_baris(("jurnal", *row))
+
+# Fungsi untuk menambahkan (tanda=1) atau mengurangkan (tanda=-1) hash semua baris sebuah jurnal majemuk
+# ke checksum periodenya
+def catat_hash_jurnal(conn, entry_id, tanda=1):
+    rows = conn.execute(SQL_LAPORAN["hash_jurnal"], (entry_id,)).fetchall()
+    if not rows:
+        return
+    h = sum(hash_baris_jurnal(tuple(row)) for row in rows) % MODULUS_HASH
+    if tanda < 0:
+        h = MODULUS_HASH - h
+    conn.execute('''
+        UPDATE checksum_periode SET hash_isi = (hash_isi + ?) % ?
+        WHERE user_id = ? AND tahun = ? AND bulan = ?
+    ''', (h, MODULUS_HASH, rows[0]['user_id'], rows[0]['tahun'], rows[0]['bulan']))
+
+# Fungsi untuk menghitung total dan hash isi periode langsung dari baris transaksi dan baris jurnal majemuk.
+# periode: daftar (user_id, tahun, bulan), atau None untuk semua periode di database.
+# Baris dibaca bertahap (fetchmany) sehingga memori tetap kecil untuk database besar.
+def hitung_isi_periode(conn, periode=None):
+    hasil = {}
+    query = SQL_LAPORAN["isi_periode"]
+    query_jurnal = SQL_LAPORAN["isi_periode_jurnal"]
+    if periode is None:
+        daftar_rows = [iter_baris(conn, query.format(where=''))]
+        daftar_jurnal = [iter_baris(conn, query_jurnal.format(where=''))]
+    else:
+        query = query.format(where='WHERE user_id = ? AND tahun = ? AND bulan = ?')
+        query_jurnal = query_jurnal.format(where='WHERE e.user_id = ? AND e.tahun = ? AND e.bulan = ?')
+        daftar_rows = [iter_baris(conn, query, p) for p in periode]
+        daftar_jurnal = [iter_baris(conn, query_jurnal, p) for p in periode]
+        for p in periode:
+            hasil[tuple(p)] = [0.0, 0.0, 0, 0, 0]
+    for rows in daftar_rows:
+        for row in rows:
+            # total_debit, total_kredit, jumlah_baris, hash_isi, transaksi/jurnal tidak seimbang
+            isi = hasil.setdefault((row[1], row[4], row[3]), [0.0, 0.0, 0, 0, 0])
+            isi[0] += row[7]
+            isi[1] += row[10]
+            isi[2] += 1
+            isi[3] = (isi[3] + hash_baris(row)) % MODULUS_HASH
+            if abs(row[7] - row[10]) >= 0.005:
+                isi[4] += 1
+    # Baris jurnal: keseimbangan diperiksa per jurnal (selisih debit - kredit per entry_id)
+    selisih_jurnal = {}
+    for rows in daftar_jurnal:
+        for row in rows:
+            kunci = (row[1], row[4], row[3])
+            isi = hasil.setdefault(kunci, [0.0, 0.0, 0, 0, 0])
+            if row[8] == 'Debit':
+                isi[0] += row[9]
+            else:
+                isi[1] += row[9]
+            isi[2] += 1
+            isi[3] = (isi[3] + hash_baris_jurnal(row)) % MODULUS_HASH
+            selisih = selisih_jurnal.setdefault((kunci, row[5]), [0.0])
+            selisih[0] += row[9] if row[8] == 'Debit' else -row[9]
+    for (kunci, _), (selisih,) in selisih_jurnal.items():
+        if abs(selisih) >= 0.005:
+            hasil[kunci][4] += 1
+    return hasil
+
+# Fungsi untuk mengisi ulang checksum semua periode dari isi tabel transaksi (dipakai saat migrasi)
+def hitung_ulang_checksum(conn):
+    isi = hitung_isi_periode(conn)
+    conn.execute('DELETE FROM checksum_periode')
+    conn.executemany('''
+        INSERT INTO checksum_periode (user_id, tahun, bulan, total_debit, total_kredit, jumlah_baris, hash_isi)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', [(u, t, b, d, k, n, h) for (u, t, b), (d, k, n, h, _) in isi.items()])
+
+# Fungsi untuk memverifikasi integritas data transaksi. Hanya periode yang checksum-nya berubah
+# sejak verifikasi terakhir (versi != versi_terverifikasi) yang dihitung ulang, kecuali semua=True.
+# Mengembalikan daftar masalah: (user_id, tahun, bulan, keterangan).
+def verifikasi_integritas(user_id=None, semua=False):
+    with get_db_connection() as conn:
+        kondisi = []
+        params = []
+        if user_id is not None:
+            kondisi.append('user_id = ?')
+            params.append(user_id)
+        if not semua:
+            kondisi.append('versi != versi_terverifikasi')
+        where = f"WHERE {' AND '.join(kondisi)}" if kondisi else ''
+        tercatat = conn.execute(SQL_LAPORAN["checksum_periode"].format(where=where), params).fetchall()
+
+        if semua and user_id is None:
+            isi = hitung_isi_periode(conn)
+        else:
+            isi = hitung_isi_periode(conn, [(c['user_id'], c['tahun'], c['bulan']) for c in tercatat])
+
+        masalah = []
+        status_baru = []
+        for c in tercatat:
+            kunci = (c['user_id'], c['tahun'], c['bulan'])
+            debit, kredit, jumlah, hash_isi, tidak_seimbang = isi.pop(kunci, [0.0, 0.0, 0, 0, 0])
+            keterangan = []
+            if tidak_seimbang:
+                keterangan.append(f"{tidak_seimbang} transaksi/jurnal dengan nominal debit ≠ kredit")
+            if abs(debit - kredit) >= 0.005:
+                keterangan.append(f"total debit {format_rupiah(debit)} ≠ total kredit {format_rupiah(kredit)}")
+            if (jumlah != c['jumlah_baris'] or abs(debit - c['total_debit']) >= 0.005
+                    or abs(kredit - c['total_kredit']) >= 0.005):
+                keterangan.append("total tercatat tidak cocok dengan isi transaksi dan jurnal")
+            if hash_isi != c['hash_isi']:
+                keterangan.append("hash isi tidak cocok (transaksi atau jurnal diubah di luar aplikasi)")
+            status = "; ".join(keterangan) or "OK"
+            if keterangan:
+                masalah.append((*kunci, status))
+            status_baru.append((c['versi'], status, *kunci))
+
+        # Periode yang punya transaksi tetapi tidak punya checksum sama sekali
+        for (u, t, b), (debit, kredit, jumlah, hash_isi, tidak_seimbang) in isi.items():
+            if jumlah:
+                masalah.append((u, t, b, "periode tidak memiliki checksum"))
+
+        conn.executemany('''
+            UPDATE checksum_periode SET versi_terverifikasi = ?, status = ?, diverifikasi_at = CURRENT_TIMESTAMP
+            WHERE user_id = ? AND tahun = ? AND bulan = ?
+        ''', status_baru)
+    return masalah
+
+# Fungsi untuk mengambil periode yang hasil verifikasi terakhirnya bermasalah
+def get_periode_bermasalah(user_id):
+    with get_db_connection() as conn:
+        periode = conn.execute(SQL_LAPORAN["periode_bermasalah"], (user_id,)).fetchall()
+    return periode
+
+# Fungsi untuk audit seluruh database dari command line: python main.py audit [path_database]
+def audit_database():
+    init_db()
+    masalah = verifikasi_integritas(semua=True)
+    with get_db_connection() as conn:
+        jumlah_periode, jumlah_baris = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(jumlah_baris), 0) FROM checksum_periode'
+        ).fetchone()
+    print(f"Audit {DB_PATH}: {jumlah_periode} periode, {jumlah_baris} baris transaksi dan jurnal diperiksa.")
+    for user_id, tahun, bulan, keterangan in masalah:
+        print(f"- user {user_id} periode {bulan:02d}-{tahun}: {keterangan}")
+    print("Hasil: data utuh." if not masalah else f"Hasil: {len(masalah)} periode bermasalah.")
+    return 1 if masalah else 0
+
+# Fungsi untuk memetakan alias tabel pada sebuah query ke nama tabelnya (FROM posting p -> p: posting)
+def get_alias_tabel(query):
+    alias = {}
+    for tabel, nama in re.findall(r"(?:FROM|JOIN|UPDATE)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", query, re.IGNORECASE):
+        alias[tabel] = tabel
+        if nama and nama.upper() not in ("WHERE", "SET", "JOIN", "ON", "ORDER", "GROUP", "UNION", "LIMIT"):
+            alias[nama] = tabel
+    return alias
+
+# Fungsi untuk memeriksa rencana eksekusi (EXPLAIN QUERY PLAN) semua query di SQL_LAPORAN.
+# Mengembalikan daftar (nama, detail) untuk setiap full scan tak terduga pada TABEL_BESAR.
+def cek_rencana_query(conn):
+    masalah = []
+    for nama, query in SQL_LAPORAN.items():
+        for varian in VARIAN_SQL.get(nama, [{}]):
+            sql = query.format(**varian) if varian else query
+            alias = get_alias_tabel(sql)
+            params = [1] * sql.count("?")
+            for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params):
+                detail = row[3]
+                cocok = re.match(r"SCAN (\w+)", detail)
+                if not cocok:
+                    continue
+                tabel = alias.get(cocok.group(1), cocok.group(1))
+                if tabel in TABEL_BESAR and (nama, tabel) not in SCAN_DIIZINKAN:
+                    masalah.append((nama, detail))
+    return masalah
+
+# Fungsi untuk cek rencana query dari command line: python main.py cek-query [path_database].
+# Memeriksa database di DB_PATH; isi_contoh mengisi contoh transaksi (dipakai untuk database sementara).
+def cek_query_database(isi_contoh=False):
+    init_db()
+    if isi_contoh:
+        register_user("contoh", "contoh")
+        _, user_id, _ = login_user("contoh", "contoh")
+        for bulan in range(1, 13):
+            insert_transaction(user_id, 1, bulan, 2024, "Kas", "Aktiva", 1000.0, "Pendapatan", "Pendapatan", 1000.0)
+            insert_transaction(user_id, 2, bulan, 2024, "Beban", "Beban", 400.0, "Kas", "Aktiva", 400.0)
+        tutup_periode(user_id, 2024, 6)
+
+    with get_db_connection() as conn:
+        masalah = cek_rencana_query(conn)
+    jumlah = sum(len(VARIAN_SQL.get(nama, [{}])) for nama in SQL_LAPORAN)
+    print(f"Cek rencana query {DB_PATH}: {jumlah} query diperiksa.")
+    for nama, detail in masalah:
+        print(f"- {nama}: {detail}")
+    print("Hasil: semua query memakai indeks." if not masalah else f"Hasil: {len(masalah)} full scan tak terduga.")
+    return 1 if masalah else 0
+
+# Fungsi untuk membaca ukuran dan kondisi file database (halaman, freelist, WAL)
+def get_status_database(conn):
+    ukuran_halaman = conn.execute('PRAGMA page_size').fetchone()[0]
+    path_wal = DB_PATH + "-wal"
+    return {
+        "ukuran_halaman": ukuran_halaman,
+        "jumlah_halaman": conn.execute('PRAGMA page_count').fetchone()[0],
+        "halaman_kosong": conn.execute('PRAGMA freelist_count').fetchone()[0],
+        "auto_vacuum": conn.execute('PRAGMA auto_vacuum').fetchone()[0],
+        "ukuran_wal": os.path.getsize(path_wal) if os.path.exists(path_wal) else 0,
+    }
+
+# Fungsi untuk mencatat hasil satu tugas pemeliharaan
+def catat_pemeliharaan(conn, tugas, mulai, bytes_dibebaskan=0, keterangan=""):
+    conn.execute('''
+        INSERT INTO log_pemeliharaan (tugas, durasi_ms, bytes_dibebaskan, keterangan) VALUES (?, ?, ?, ?)
+    ''', (tugas, (time.perf_counter() - mulai) * 1000, bytes_dibebaskan, keterangan))
+
+# Fungsi untuk menjalankan satu siklus pemeliharaan: incremental vacuum jika freelist melewati ambang atau
+# sudah waktunya, checkpoint WAL, PRAGMA optimize, lalu log lama dipangkas.
+# Checkpoint PASSIVE dan incremental vacuum bertahap tidak menahan pembaca maupun penulis lama.
+# Database lama (auto_vacuum NONE) tidak di-vacuum di sini: konversinya butuh VACUUM penuh yang
+# menahan kunci tulis, jadi hanya lewat konversi_incremental_vacuum atas perintah admin.
+def jalankan_pemeliharaan(paksa_vacuum=False):
+    conn = sqlite3.connect(DB_PATH, timeout=10, isolation_level=None)
+    try:
+        status = get_status_database(conn)
+        terakhir = conn.execute('''
+            SELECT CAST(strftime('%s', 'now') - strftime('%s', MAX(created_at)) AS INTEGER)
+            FROM log_pemeliharaan WHERE tugas IN ('incremental_vacuum', 'vacuum')
+        ''').fetchone()[0]
+        terjadwal = terakhir is None or terakhir >= JADWAL_VACUUM
+        kosong = status["halaman_kosong"]
+        if status["auto_vacuum"] == 2 and kosong and (paksa_vacuum or kosong >= AMBANG_FREELIST or terjadwal):
+            # Incremental: dibebaskan bertahap agar kunci tulis hanya dipegang sebentar
+            mulai = time.perf_counter()
+            tersisa = kosong
+            while tersisa:
+                conn.execute(f'PRAGMA incremental_vacuum({HALAMAN_PER_VACUUM})').fetchall()
+                sisa_baru = conn.execute('PRAGMA freelist_count').fetchone()[0]
+                if sisa_baru >= tersisa:
+                    break
+                tersisa = sisa_baru
+            sesudah = get_status_database(conn)
+            dibebaskan = (status["jumlah_halaman"] - sesudah["jumlah_halaman"]) * status["ukuran_halaman"]
+            catat_pemeliharaan(conn, "incremental_vacuum", mulai, dibebaskan,
+                               f"freelist {kosong} -> {sesudah['halaman_kosong']} halaman")
+
+        mulai = time.perf_counter()
+        _, halaman_wal, halaman_disalin = conn.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchone()
+        catat_pemeliharaan(conn, "checkpoint", mulai, keterangan=f"{halaman_disalin}/{halaman_wal} halaman WAL disalin")
+
+        mulai = time.perf_counter()
+        conn.execute('PRAGMA analysis_limit=400')
+        conn.execute('PRAGMA optimize')
+        catat_pemeliharaan(conn, "optimize", mulai)
+
+        # Hanya MAKS_LOG_PEMELIHARAAN baris terbaru yang disimpan (dihapus lewat rentang id)
+        conn.execute('''
+            DELETE FROM log_pemeliharaan WHERE id <= (SELECT MAX(id) FROM log_pemeliharaan) - ?
+        ''', (MAKS_LOG_PEMELIHARAAN,))
+    finally:
+        conn.close()
+
+# Fungsi untuk mengonversi database lama (auto_vacuum NONE) ke incremental vacuum dengan satu VACUUM penuh.
+# VACUUM menahan kunci tulis selama database dibangun ulang, jadi hanya dijalankan atas perintah admin
+# (tombol di halaman Pemeliharaan atau python main.py konversi-vacuum [path_database]), tidak oleh penjadwal.
+def konversi_incremental_vacuum():
+    conn = sqlite3.connect(DB_PATH, timeout=10, isolation_level=None)
+    try:
+        status = get_status_database(conn)
+        if status["auto_vacuum"] == 2:
+            return False, "Database sudah memakai incremental vacuum."
+        mulai = time.perf_counter()
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        conn.execute('VACUUM')
+        sesudah = get_status_database(conn)
+        dibebaskan = (status["jumlah_halaman"] - sesudah["jumlah_halaman"]) * status["ukuran_halaman"]
+        catat_pemeliharaan(conn, "vacuum", mulai, dibebaskan, "konversi ke incremental vacuum")
+    finally:
+        conn.close()
+    return True, f"Database dikonversi ke incremental vacuum, {dibebaskan / 1024:.1f} KB dibebaskan."
+
+# Fungsi untuk menjalankan satu tugas thread latar. Galat apa pun (bukan hanya sqlite3.Error) dicatat ke
+# stderr lalu ditelan, karena exception yang lolos mematikan thread tanpa jejak dan tugas berhenti selamanya.
+def jalankan_tugas_latar(nama, fungsi, *args, **kwargs):
+    try:
+        fungsi(*args, **kwargs)
+        return True
+    except Exception as e:
+        print(f"{nama} gagal: {type(e).__name__}: {e}", file=sys.stderr)
+        return False
+
+# Fungsi untuk memulai thread pemeliharaan latar, sekali per proses server.
+# Mengembalikan Event yang bisa di-set untuk menjalankan siklus berikutnya segera tanpa menunggu.
+@st.cache_resource(show_spinner=False)
+def mulai_pemeliharaan_latar():
+    picu = threading.Event()
+    def siklus():
+        while True:
+            paksa = picu.is_set()
+            picu.clear()
+            jalankan_tugas_latar("Pemeliharaan database", jalankan_pemeliharaan, paksa_vacuum=paksa)
+            picu.wait(INTERVAL_PEMELIHARAAN)
+    threading.Thread(target=siklus, name="pemeliharaan-db", daemon=True).start()
+    return picu
+
+# Fungsi untuk memulai penjadwal transaksi berulang, sekali per proses server: kejadian yang jatuh
+# tempo dibuat saat aplikasi mulai, lalu diperiksa lagi setiap INTERVAL_BERULANG detik
+@st.cache_resource(show_spinner=False)
+def mulai_penjadwal_berulang():
+    threading.Thread(target=siklus_transaksi_berulang, name="transaksi-berulang", daemon=True).start()
+    return True
+
+# Fungsi untuk menjalankan thread penjadwal transaksi berulang; satu putaran yang gagal tidak menghentikannya
+def siklus_transaksi_berulang():
+    while True:
+        jalankan_tugas_latar("Pembuatan transaksi berulang", buat_transaksi_berulang)
+        time.sleep(INTERVAL_BERULANG)
+
+# Prahitung laporan: setelah penulisan, saldo akun pengguna (dasar Neraca Saldo, Laba Rugi,
+# Perubahan Modal dan Neraca), saldo berjalan buku besar dan verifikasi integritas dihitung di
+# thread pekerja, lalu hasilnya disimpan per pengguna bersama versi datanya. Permintaan berulang
+# untuk pengguna yang masih mengantre digabung, dan antrean dibatasi MAKS_ANTREAN_PRAHITUNG pengguna.
+class PrahitungLaporan:
+    def __init__(self, pekerja=PEKERJA_PRAHITUNG, maks_antrean=MAKS_ANTREAN_PRAHITUNG):
+        self.pool = ThreadPoolExecutor(max_workers=pekerja, thread_name_prefix="prahitung")
+        self.maks_antrean = maks_antrean
+        self.kunci = threading.Lock()
+        self.menunggu = set()
+        self.cache = {}
+
+    # Menjadwalkan prahitung untuk pengguna; False jika antrean penuh (laporan dihitung saat dibuka)
+    def jadwalkan(self, user_id):
+        with self.kunci:
+            if user_id in self.menunggu:
+                return True
+            if len(self.menunggu) >= self.maks_antrean:
+                return False
+            self.menunggu.add(user_id)
+        self.pool.submit(self.hitung, user_id)
+        return True
+
+    def hitung(self, user_id):
+        # Dikeluarkan dari antrean sebelum mulai, agar penulisan selama perhitungan memicu putaran baru
+        with self.kunci:
+            self.menunggu.discard(user_id)
+        try:
+            perbaiki_saldo_berjalan(user_id)
+            verifikasi_integritas(user_id)
+            conn = get_report_connection()
+            try:
+                versi = get_versi_laporan(conn, user_id)
+                saldo = hitung_saldo_akun(conn, user_id)
+            finally:
+                conn.close()
+            self.simpan(user_id, versi, saldo)
+            get_cache_bersama().simpan(user_id, "saldo", versi, saldo_ke_json(saldo))
+        except sqlite3.Error as e:
+            print(f"Prahitung laporan gagal: {e}", file=sys.stderr)
+
+    def simpan(self, user_id, versi, saldo):
+        with self.kunci:
+            lama = self.cache.get(user_id)
+            if lama is None or lama[0] < versi:
+                self.cache[user_id] = (versi, saldo)
+
+    # Mengembalikan saldo dari cache jika versinya sama dengan versi data pada koneksi, selain itu None
+    def ambil(self, user_id, versi):
+        with self.kunci:
+            hasil = self.cache.get(user_id)
+        return hasil[1] if hasil and hasil[0] == versi else None
+
+# Fungsi untuk mengambil objek prahitung laporan, satu per proses server
+@st.cache_resource(show_spinner=False)
+def get_prahitung_laporan():
+    return PrahitungLaporan()
+
+# Fungsi untuk menjadwalkan prahitung laporan pengguna setelah penulisan selesai di-commit
+def jadwalkan_prahitung(user_id):
+    return get_prahitung_laporan().jadwalkan(user_id)
+
+# Fungsi untuk membaca versi data laporan pengguna pada koneksi (snapshot) yang sedang dipakai
+def get_versi_laporan(conn, user_id):
+    row = conn.execute(SQL_LAPORAN["versi_laporan"], (user_id,)).fetchone()
+    return row[0] if row else 0
+
+# Fungsi untuk mengambil saldo akun bagi halaman laporan: dari cache prahitung proses ini, lalu dari
+# cache bersama antar proses, jika versinya masih sama dengan snapshot koneksi; selain itu dihitung
+# langsung dan disimpan ke kedua cache
+def get_saldo_laporan(conn, user_id):
+    prahitung = get_prahitung_laporan()
+    versi = get_versi_laporan(conn, user_id)
+    saldo = prahitung.ambil(user_id, versi)
+    if saldo is None:
+        cache = get_cache_bersama()
+        data = cache.ambil(user_id, "saldo", versi)
+        if data is not None:
+            saldo = saldo_dari_json(data)
+        else:
+            saldo = hitung_saldo_akun(conn, user_id)
+            cache.simpan(user_id, "saldo", versi, saldo_ke_json(saldo))
+        prahitung.simpan(user_id, versi, saldo)
+    return saldo
+
+# Cache hasil laporan yang dipakai bersama oleh semua proses Streamlit di satu host (satu file SQLite
+# di samping database utama). Setiap entri disimpan dengan versi_laporan pengguna saat dihitung;
+# versi ini dinaikkan trigger pada setiap penulisan, sehingga entri lama otomatis tidak terpakai dan
+# tertimpa saat dihitung ulang. Entri juga kedaluwarsa setelah TTL_CACHE detik dan yang paling lama
+# tidak dipakai dibuang jika jumlahnya melebihi MAKS_ENTRI_CACHE. Jumlah hit/miss per jenis laporan
+# dicatat agar hit rate bisa dilihat di halaman Pemeliharaan. Galat cache tidak pernah menggagalkan
+# laporan: ambil() mengembalikan None dan simpan() diabaikan.
+# Pembacaan yang hit tidak menulis ke file cache: hit/miss dikumpulkan di memori dan ditulis paling
+# sering sekali per interval_statistik detik, dan waktu pakai entri (dasar LRU) hanya diperbarui jika
+# sudah lebih lama dari interval_dipakai detik.
+class CacheBersama:
+    def __init__(self, path, ttl=TTL_CACHE, maks_entri=MAKS_ENTRI_CACHE,
+                 interval_statistik=INTERVAL_STATISTIK_CACHE, interval_dipakai=INTERVAL_DIPAKAI_CACHE):
+        self.path = path
+        self.ttl = ttl
+        self.maks_entri = maks_entri
+        self.interval_statistik = interval_statistik
+        self.interval_dipakai = interval_dipakai
+        self.lokal = threading.local()
+        self.kunci = threading.Lock()
+        self.akses = {}
+        self.terakhir_ditulis = time.time()
+
+    # Koneksi per thread (thread prahitung dan thread skrip Streamlit memakai koneksi masing-masing)
+    def koneksi(self):
+        conn = getattr(self.lokal, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS cache (
+                    kunci TEXT PRIMARY KEY,
+                    user_id INTEGER NOT NULL,
+                    nama TEXT NOT NULL,
+                    versi INTEGER NOT NULL,
+                    nilai TEXT NOT NULL,
+                    dipakai REAL NOT NULL,
+                    kedaluwarsa REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_dipakai ON cache (dipakai)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_kedaluwarsa ON cache (kedaluwarsa)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS statistik_cache (
+                    nama TEXT PRIMARY KEY,
+                    hit INTEGER NOT NULL DEFAULT 0,
+                    miss INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            self.lokal.conn = conn
+        return conn
+
+    # Jenis laporan untuk statistik: bagian nama sebelum ":" (misal "buku_besar:Kas:0" -> "buku_besar")
+    def jenis(self, nama):
+        return nama.split(":", 1)[0]
+
+    def ambil(self, user_id, nama, versi):
+        try:
+            conn = self.koneksi()
+            sekarang = time.time()
+            kunci = f"{user_id}:{nama}"
+            row = conn.execute('SELECT nilai, dipakai FROM cache WHERE kunci = ? AND versi = ? AND kedaluwarsa > ?',
+                               (kunci, versi, sekarang)).fetchone()
+            if row and sekarang - row[1] >= self.interval_dipakai:
+                conn.execute('UPDATE cache SET dipakai = ? WHERE kunci = ?', (sekarang, kunci))
+        except sqlite3.Error as e:
+            print(f"Cache bersama gagal dibaca: {e}", file=sys.stderr)
+            return None
+        self.catat_akses(nama, row is not None)
+        return json.loads(row[0]) if row else None
+
+    # Menambahkan satu hit/miss ke statistik di memori; ditulis ke file cache jika jedanya sudah lewat
+    def catat_akses(self, nama, hit):
+        with self.kunci:
+            angka = self.akses.setdefault(self.jenis(nama), [0, 0])
+            angka[0 if hit else 1] += 1
+            perlu_ditulis = time.time() - self.terakhir_ditulis >= self.interval_statistik
+        if perlu_ditulis:
+            self.tulis_statistik()
+
+    # Menulis hit/miss yang terkumpul di memori ke tabel statistik_cache
+    def tulis_statistik(self):
+        with self.kunci:
+            akses, self.akses = self.akses, {}
+            self.terakhir_ditulis = time.time()
+        if not akses:
+            return
+        try:
+            conn = self.koneksi()
+            with conn:
+                conn.executemany('''
+                    INSERT INTO statistik_cache (nama, hit, miss) VALUES (?, ?, ?)
+                    ON CONFLICT (nama) DO UPDATE SET hit = hit + excluded.hit, miss = miss + excluded.miss
+                ''', [(jenis, hit, miss) for jenis, (hit, miss) in akses.items()])
+        except sqlite3.Error as e:
+            print(f"Statistik cache bersama gagal disimpan: {e}", file=sys.stderr)
+
+    def simpan(self, user_id, nama, versi, nilai):
+        try:
+            conn = self.koneksi()
+            sekarang = time.time()
+            with conn:
+                # Versi lama untuk kunci yang sama tertimpa; versi yang lebih baru tidak ditimpa versi lama
+                conn.execute('''
+                    INSERT INTO cache (kunci, user_id, nama, versi, nilai, dipakai, kedaluwarsa)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (kunci) DO UPDATE SET
+                        versi = excluded.versi, nilai = excluded.nilai,
+                        dipakai = excluded.dipakai, kedaluwarsa = excluded.kedaluwarsa
+                    WHERE excluded.versi >= cache.versi
+                ''', (f"{user_id}:{nama}", user_id, nama, versi, json.dumps(nilai), sekarang, sekarang + self.ttl))
+                conn.execute('DELETE FROM cache WHERE kedaluwarsa <= ?', (sekarang,))
+                conn.execute('''
+                    DELETE FROM cache WHERE kunci IN (
+                        SELECT kunci FROM cache ORDER BY dipakai DESC LIMIT -1 OFFSET ?
+                    )
+                ''', (self.maks_entri,))
+        except sqlite3.Error as e:
+            print(f"Cache bersama gagal disimpan: {e}", file=sys.stderr)
+
+    # Mengembalikan (jumlah_entri, ukuran_bytes, [(jenis, hit, miss)])
+    def statistik(self):
+        self.tulis_statistik()
+        conn = self.koneksi()
+        jumlah = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        ukuran = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        rows = conn.execute('SELECT nama, hit, miss FROM statistik_cache ORDER BY nama').fetchall()
+        return jumlah, ukuran, rows
+
+    def kosongkan(self):
+        with self.kunci:
+            self.akses = {}
+        conn = self.koneksi()
+        with conn:
+            conn.execute('DELETE FROM cache')
+            conn.execute('DELETE FROM statistik_cache')
+
+# Fungsi untuk menentukan path file cache bersama (di samping database utama)
+def get_path_cache():
+    return os.path.splitext(DB_PATH)[0] + "_cache.db"
+
+# Fungsi untuk mengambil objek cache bersama, satu per proses server (file cache-nya dipakai semua proses)
+@st.cache_resource(show_spinner=False)
+def get_cache_bersama():
+    return CacheBersama(get_path_cache())
+
+# Fungsi untuk mengubah saldo akun {(akun, jenis): [debit, kredit]} ke bentuk JSON dan sebaliknya
+def saldo_ke_json(saldo):
+    return [[akun, jenis, debit, kredit] for (akun, jenis), (debit, kredit) in saldo.items()]
+
+def saldo_dari_json(data):
+    return {(akun, jenis): [debit, kredit] for akun, jenis, debit, kredit in data}
+
+# Fungsi untuk mengambil satu halaman buku besar lewat cache bersama (kunci: akun dan kursor halaman)
+def get_posting_akun_cache(conn, user_id, akun, kursor=None, limit=PER_HALAMAN):
+    cache = get_cache_bersama()
+    versi = get_versi_laporan(conn, user_id)
+    nama = f"buku_besar:{akun}:{kursor}:{limit}"
+    data = cache.ambil(user_id, nama, versi)
+    if data is not None:
+        return [Posting(*row) for row in data["posting"]], data["ada_sebelumnya"]
+    posting, ada_sebelumnya = get_posting_akun(conn, user_id, akun, kursor, limit)
+    cache.simpan(user_id, nama, versi, {"posting": [[getattr(p, k) for k in Posting.__slots__] for p in posting],
+                                        "ada_sebelumnya": ada_sebelumnya})
+    return posting, ada_sebelumnya
+
+# Fungsi untuk mengambil laporan komparatif lewat cache bersama
+def get_laporan_komparatif(conn, user_id, dari, hingga, per="bulan"):
+    cache = get_cache_bersama()
+    versi = get_versi_laporan(conn, user_id)
+    nama = f"komparatif:{per}:{dari[0]}-{dari[1]}:{hingga[0]}-{hingga[1]}"
+    laporan = cache.ambil(user_id, nama, versi)
+    if laporan is None:
+        laporan = hitung_laporan_komparatif(conn, user_id, dari, hingga, per)
+        cache.simpan(user_id, nama, versi, laporan)
+    return laporan
+
+# Fungsi untuk mengambil log pemeliharaan terbaru
+def get_log_pemeliharaan(limit=PER_HALAMAN):
+    with get_db_connection() as conn:
+        log = conn.execute('''
+            SELECT tugas, durasi_ms, bytes_dibebaskan, keterangan, created_at FROM log_pemeliharaan
+            ORDER BY id DESC LIMIT ?
+        ''', (limit,)).fetchall()
+    return log
+
+# Fungsi untuk mengambil tren bulanan (pendapatan, beban, laba dan saldo kas) dari rekap bulanan
+def get_tren_bulanan(conn, user_id):
+    return list(iter_baris(conn, SQL_LAPORAN["tren_bulanan"], (AKUN_KAS, user_id)))
+
+# Fungsi untuk menambahkan data persediaan baru
+def insert_inventory(user_id, nama, jumlah, harga_satuan, stok_minimum=0):
+    with get_db_connection() as conn:
+        conn.execute('''
+            INSERT INTO inventory (user_id, nama, jumlah, harga_satuan, stok_minimum)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (user_id, nama, jumlah, harga_satuan, stok_minimum))
+
+# Fungsi untuk mengambil daftar persediaan pengguna
+def get_inventory(user_id):
+    with get_db_connection() as conn:
+        items = conn.execute(SQL_LAPORAN["inventory_pengguna"], (user_id,)).fetchall()
+    return items
+
+# Fungsi untuk mengambil ringkasan persediaan (jumlah barang, total unit, total nilai) dari tabel ringkasan
+def get_ringkasan_persediaan(conn, user_id):
+    row = conn.execute(SQL_LAPORAN["ringkasan_persediaan"], (user_id,)).fetchone()
+    return tuple(row) if row else (0, 0, 0.0)
+
+# Fungsi untuk mengambil satu halaman daftar persediaan beserta nilainya (jumlah * harga dihitung di SQL)
+def get_halaman_persediaan(conn, user_id, offset=0, limit=PER_HALAMAN):
+    return conn.execute(SQL_LAPORAN["halaman_persediaan"], (user_id, limit, offset)).fetchall()
+
+# Fungsi untuk mencari barang berdasarkan awal nama (peka huruf besar/kecil) untuk pilihan barang.
+# Pencarian rentang pada idx_inventory_pengguna (user_id, nama) dan dibatasi limit baris,
+# sehingga pilihan barang tetap cepat walau persediaan berisi puluhan ribu barang.
+def cari_persediaan(conn, user_id, awalan="", limit=PER_HALAMAN):
+    return conn.execute(SQL_LAPORAN["cari_persediaan"],
+                        (user_id, awalan, awalan + "\U0010ffff", limit)).fetchall()
+
+# Fungsi untuk mengambil barang yang stoknya sudah mencapai atau di bawah stok minimum
+def get_stok_menipis(conn, user_id, limit=PER_HALAMAN):
+    return conn.execute(SQL_LAPORAN["stok_menipis"], (user_id, limit)).fetchall()
+
+# Fungsi untuk mengubah stok minimum barang
+def ubah_stok_minimum(user_id, item_id, stok_minimum):
+    with get_db_connection() as conn:
+        conn.execute('UPDATE inventory SET stok_minimum = ? WHERE id = ? AND user_id = ?',
+                     (stok_minimum, item_id, user_id))
+
+# Fungsi untuk memperbarui data persediaan
+def update_inventory_item(item_id, jumlah, harga_satuan):
+    with get_db_connection() as conn:
+        conn.execute('''
+            UPDATE inventory SET jumlah = ?, harga_satuan = ? WHERE id = ?
+        ''', (jumlah, harga_satuan, item_id))
+
+# Fungsi untuk mencatat penambahan (jumlah > 0) atau pengurangan (jumlah < 0) stok beserta jurnalnya.
+# Penambahan: Persediaan Barang pada Kas dengan harga baru (jika diisi); pengurangan: Beban Persediaan
+# pada Persediaan Barang dengan harga satuan saat ini. Ditulis pada koneksi terbuka tanpa commit.
+def tulis_mutasi_persediaan(conn, user_id, item, jumlah, tanggal, harga_satuan=None):
+    if jumlah == 0:
+        raise ValueError("Jumlah mutasi persediaan tidak boleh 0.")
+    cek_periode_terbuka(conn, user_id, tanggal.year, tanggal.month)
+    if jumlah > 0:
+        harga = harga_satuan if harga_satuan else item['harga_satuan']
+        akun = ("Persediaan Barang", "Aktiva", "Kas", "Aktiva")
+    else:
+        if -jumlah > item['jumlah']:
+            raise ValueError(f"Jumlah melebihi stok {item['nama']}! Stok tersedia: {item['jumlah']}")
+        harga = item['harga_satuan']
+        akun = ("Beban Persediaan", "Beban", "Persediaan Barang", "Aktiva")
+    nominal = abs(jumlah) * harga
+    transaksi_id = tulis_transaksi(conn, user_id, tanggal.day, tanggal.month, tanggal.year,
+                                   akun[0], akun[1], nominal, akun[2], akun[3], nominal)
+    conn.execute(
+        'INSERT INTO mutasi_persediaan (transaksi_id, inventory_id, jumlah) VALUES (?, ?, ?)',
+        (transaksi_id, item['id'], jumlah)
+    )
+    if harga != item['harga_satuan']:
+        conn.execute('UPDATE inventory SET harga_satuan = ? WHERE id = ?', (harga, item['id']))
+    return transaksi_id
+
+# Fungsi untuk mencatat mutasi stok hari ini dari halaman Persediaan
+def catat_mutasi_persediaan(user_id, item, jumlah, harga_satuan=None):
+    with get_db_connection() as conn:
+        tulis_mutasi_persediaan(conn, user_id, item, jumlah, datetime.now(), harga_satuan)
+    jadwalkan_prahitung(user_id)
+
+# Fungsi untuk menghitung tanggal kejadian berikutnya dari jadwal berulang
+def tanggal_berulang_berikutnya(tanggal, frekuensi, hari):
+    if frekuensi == "Harian":
+        return tanggal + timedelta(days=1)
+    if frekuensi == "Mingguan":
+        return tanggal + timedelta(days=7)
+    tahun, bulan = (tanggal.year + 1, 1) if tanggal.month == 12 else (tanggal.year, tanggal.month + 1)
+    return date(tahun, bulan, min(hari, calendar.monthrange(tahun, bulan)[1]))
+
+# Fungsi untuk menyimpan template transaksi berulang (ValueError jika isian tidak valid)
+def tambah_transaksi_berulang(user_id, nama, akun_debit, jenis_debit, akun_kredit, jenis_kredit,
+                              nominal, frekuensi, mulai, selesai=None):
+    if not nama.strip() or not akun_debit.strip() or not akun_kredit.strip():
+        raise ValueError("Nama template, akun debit dan akun kredit harus diisi.")
+    if nominal <= 0:
+        raise ValueError("Nominal harus lebih dari 0.")
+    if frekuensi not in FREKUENSI_BERULANG:
+        raise ValueError(f"Frekuensi harus salah satu dari {', '.join(FREKUENSI_BERULANG)}.")
+    if selesai and selesai < mulai:
+        raise ValueError("Tanggal selesai harus setelah tanggal mulai.")
+    with get_db_connection() as conn:
+        template_id = conn.execute('''
+            INSERT INTO transaksi_berulang
+            (user_id, nama, akun_debit, jenis_debit, akun_kredit, jenis_kredit, nominal,
+             frekuensi, hari, berikutnya, selesai)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (user_id, nama.strip(), akun_debit.strip(), jenis_debit, akun_kredit.strip(), jenis_kredit,
+              nominal, frekuensi, mulai.day, mulai.isoformat(), selesai.isoformat() if selesai else None)).lastrowid
+    return template_id
+
+# Fungsi untuk mengambil daftar template transaksi berulang pengguna
+def get_transaksi_berulang(user_id):
+    with get_db_connection() as conn:
+        rows = conn.execute(SQL_LAPORAN["transaksi_berulang_pengguna"], (user_id,)).fetchall()
+    return rows
+
+# Fungsi untuk mengaktifkan atau menghentikan template transaksi berulang
+def ubah_status_berulang(user_id, template_id, aktif):
+    with get_db_connection() as conn:
+        conn.execute('UPDATE transaksi_berulang SET aktif = ? WHERE id = ? AND user_id = ?',
+                     (1 if aktif else 0, template_id, user_id))
+
+# Fungsi untuk membuat semua kejadian transaksi berulang yang sudah jatuh tempo sampai tanggal tertentu
+# (bawaan hari ini) dalam satu transaksi database. Kejadian pada periode yang sudah ditutup dilewati.
+# BEGIN IMMEDIATE mengunci penulisan sejak awal, sehingga dua proses tidak membuat kejadian yang sama.
+# Mengembalikan (jumlah_dibuat, jumlah_dilewati).
+def buat_transaksi_berulang(sampai=None, user_id=None):
+    sampai = sampai or date.today()
+    baris = []
+    dilewati = 0
+    pengguna = set()
+    with get_db_connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        tutup = {}
+        for t in conn.execute(SQL_LAPORAN["berulang_jatuh_tempo"], (sampai.isoformat(),)).fetchall():
+            if user_id is not None and t['user_id'] != user_id:
+                continue
+            if t['user_id'] not in tutup:
+                tutup[t['user_id']] = get_periode_tutup_terakhir(conn, t['user_id']) or (0, 0)
+            selesai = date.fromisoformat(t['selesai']) if t['selesai'] else None
+            tanggal = date.fromisoformat(t['berikutnya'])
+            while tanggal <= sampai and (selesai is None or tanggal <= selesai):
+                if (tanggal.year, tanggal.month) > tutup[t['user_id']]:
+                    baris.append((t['user_id'], tanggal.day, tanggal.month, tanggal.year,
+                                  t['akun_debit'], t['jenis_debit'], t['nominal'],
+                                  t['akun_kredit'], t['jenis_kredit'], t['nominal']))
+                else:
+                    dilewati += 1
+                tanggal = tanggal_berulang_berikutnya(tanggal, t['frekuensi'], t['hari'])
+            aktif = 0 if selesai and tanggal > selesai else 1
+            conn.execute('UPDATE transaksi_berulang SET berikutnya = ?, aktif = ? WHERE id = ?',
+                         (tanggal.isoformat(), aktif, t['id']))
+            pengguna.add(t['user_id'])
+        tulis_transaksi_massal(conn, baris, sumber="berulang")
+    for uid in pengguna:
+        jadwalkan_prahitung(uid)
+    return len(baris), dilewati
+
+# Fungsi untuk mengambil periode terakhir yang sudah ditutup, opsional dibatasi sampai periode tertentu
+def get_periode_tutup_terakhir(conn, user_id, sampai=None):
+    if sampai is None:
+        row = conn.execute(SQL_LAPORAN["tutup_terakhir"], (user_id,)).fetchone()
+    else:
+        row = conn.execute(SQL_LAPORAN["tutup_terakhir_sampai"], (user_id, sampai[0], sampai[1])).fetchone()
+    return (row['tahun'], row['bulan']) if row else None
+
+# Fungsi untuk mengambil daftar periode yang sudah ditutup
+def get_daftar_tutup_buku(user_id):
+    with get_db_connection() as conn:
+        periode = conn.execute(SQL_LAPORAN["daftar_tutup_buku"], (user_id,)).fetchall()
+    return periode
+
+# Fungsi untuk menghitung total debit dan kredit setiap (akun, jenis) sampai periode tertentu.
+# Dimulai dari snapshot penutupan terakhir lalu ditambah posting setelahnya saja (transaksi biasa
+# maupun baris jurnal majemuk) dengan satu GROUP BY pada indeks periode posting.
+def hitung_saldo_akun(conn, user_id, sampai=None):
+    snapshot = get_periode_tutup_terakhir(conn, user_id, sampai)
+    saldo = {}
+    if snapshot:
+        rows = iter_baris(conn, SQL_LAPORAN["saldo_snapshot"], (user_id, snapshot[0], snapshot[1]))
+        for akun, jenis, debit, kredit in rows:
+            saldo[(akun, jenis)] = [debit, kredit]
+
+    dari = snapshot or (0, 0)
+    hingga = sampai or (9999, 12)
+    params = (user_id, dari[0], dari[1], hingga[0], hingga[1])
+    delta = iter_baris(conn, SQL_LAPORAN["saldo_delta"], params)
+    for akun, jenis, debit, kredit in delta:
+        total = saldo.setdefault((akun, jenis), [0.0, 0.0])
+        total[0] += debit
+        total[1] += kredit
+    return dict(sorted(saldo.items()))
+
+# Fungsi untuk menjumlahkan debit dan kredit per nama akun (semua jenis)
+def total_per_akun(saldo):
+    total = {}
+    for (akun, jenis), (debit, kredit) in saldo.items():
+        akun_total = total.setdefault(akun, [0.0, 0.0])
+        akun_total[0] += debit
+        akun_total[1] += kredit
+    return total
+
+# Fungsi untuk menghitung saldo akun Pendapatan (kredit - debit) dan Beban (debit - kredit)
+def hitung_laba_rugi(saldo):
+    pendapatan = {}
+    beban = {}
+    for (akun, jenis), (debit, kredit) in saldo.items():
+        if jenis == "Pendapatan":
+            pendapatan[akun] = kredit - debit
+        elif jenis == "Beban":
+            beban[akun] = debit - kredit
+    return pendapatan, beban
+
+# Fungsi untuk menyusun neraca: saldo akun Aktiva dan Utang (yang tidak nol) serta modal akhir
+def hitung_neraca(saldo):
+    aktiva = {}
+    utang = {}
+    total_akun = total_per_akun(saldo)
+    for nama_akun, jenis in saldo:
+        debit, kredit = total_akun[nama_akun]
+        nilai = debit - kredit if jenis in ["Aktiva", "Beban"] else kredit - debit
+        if abs(nilai) > 0.01:
+            if jenis == "Aktiva":
+                aktiva[nama_akun] = nilai
+            elif jenis == "Utang":
+                utang[nama_akun] = nilai
+    modal_awal, laba_rugi, total_prive = hitung_perubahan_modal(saldo)
+    return aktiva, utang, modal_awal + laba_rugi - total_prive
+
+# Fungsi untuk menghitung modal awal, laba/rugi dan prive dari saldo akun
+def hitung_perubahan_modal(saldo):
+    modal_awal = 0
+    total_pendapatan = 0
+    total_beban = 0
+    total_prive = 0
+    for (akun, jenis), (debit, kredit) in saldo.items():
+        nama = akun.lower()
+        if jenis == "Modal" and "prive" not in nama and "tambahan modal" not in nama:
+            modal_awal += kredit - debit
+        elif jenis == "Pendapatan":
+            total_pendapatan += kredit - debit
+        elif jenis == "Beban":
+            total_beban += debit - kredit
+        elif jenis == "Prive" and "kas" not in nama and "pengurang modal" not in nama:
+            total_prive += debit - kredit
+    return modal_awal, total_pendapatan - total_beban, total_prive
+
+# Fungsi untuk menyusun daftar kunci periode (tahun * 100 + bulan, atau tahun) dalam rentang dari..hingga
+def get_kunci_periode(dari, hingga, per="bulan"):
+    if per == "tahun":
+        return list(range(dari[0], hingga[0] + 1))
+    periode = []
+    tahun, bulan = dari
+    while (tahun, bulan) <= hingga:
+        periode.append(tahun * 100 + bulan)
+        tahun, bulan = (tahun + 1, 1) if bulan == 12 else (tahun, bulan + 1)
+    return periode
+
+# Fungsi untuk menampilkan kunci periode sebagai label kolom ("2024-03" atau "2024")
+def label_periode(kunci, per="bulan"):
+    return str(kunci) if per == "tahun" else f"{kunci // 100}-{kunci % 100:02d}"
+
+# Fungsi untuk menghitung laporan laba rugi dan neraca beberapa periode sekaligus dari rekap_bulanan.
+# Laba rugi memakai satu GROUP BY per periode; neraca memakai jumlah kumulatif (window function) sehingga
+# saldo akhir setiap periode didapat dari satu query, berapa pun jumlah kolomnya. Jurnal penutup tidak
+# direkap, sehingga modal akhir = modal + pendapatan - beban - prive kumulatif.
+# Mengembalikan dict berisi daftar nilai per periode (urutan sama dengan "periode").
+def hitung_laporan_komparatif(conn, user_id, dari, hingga, per="bulan"):
+    periode = get_kunci_periode(dari, hingga, per)
+    kolom = {p: i for i, p in enumerate(periode)}
+    if per == "tahun":
+        dari, hingga = (dari[0], 1), (hingga[0], 12)
+    ekspresi = EKSPRESI_PERIODE[per]
+
+    pendapatan = {}
+    beban = {}
+    query = SQL_LAPORAN["laba_rugi_periode"].format(periode=ekspresi)
+    for p, akun, jenis, nilai in iter_baris(conn, query, (user_id, dari[0], dari[1], hingga[0], hingga[1])):
+        tujuan = pendapatan if jenis == "Pendapatan" else beban
+        tujuan.setdefault(akun, [0.0] * len(periode))[kolom[p]] += nilai
+
+    # Saldo kumulatif hanya muncul pada periode yang ada mutasinya, lalu dibawa ke periode sesudahnya
+    saldo = {}
+    query = SQL_LAPORAN["neraca_periode"].format(periode=ekspresi)
+    for p, akun, jenis, nilai in iter_baris(conn, query, (user_id, hingga[0], hingga[1])):
+        baris = saldo.setdefault((akun, jenis), [0.0] * len(periode))
+        for i, kunci in enumerate(periode):
+            if kunci >= p:
+                baris[i] = nilai
+
+    aktiva = {}
+    utang = {}
+    modal_akhir = [0.0] * len(periode)
+    for (akun, jenis), nilai in saldo.items():
+        if jenis == "Aktiva":
+            aktiva[akun] = nilai
+        elif jenis == "Utang":
+            utang[akun] = [-n for n in nilai]
+        else:
+            modal_akhir = [m - n for m, n in zip(modal_akhir, nilai)]
+
+    return {
+        "periode": [label_periode(p, per) for p in periode],
+        "pendapatan": pendapatan,
+        "beban": beban,
+        "laba_rugi": [sum(v[i] for v in pendapatan.values()) - sum(v[i] for v in beban.values())
+                      for i in range(len(periode))],
+        "aktiva": {akun: nilai for akun, nilai in aktiva.items() if any(abs(n) > 0.01 for n in nilai)},
+        "utang": {akun: nilai for akun, nilai in utang.items() if any(abs(n) > 0.01 for n in nilai)},
+        "modal_akhir": modal_akhir,
+    }
+
+# Fungsi untuk menghitung selisih dan persentase perubahan (None jika nilai awal nol)
+def hitung_perubahan(lama, baru):
+    selisih = baru - lama
+    return selisih, (selisih / abs(lama) * 100 if abs(lama) > 0.01 else None)
+
+# Fungsi untuk menyusun satu baris tabel komparatif: nilai tiap periode, lalu selisih dan % perubahan
+# periode terakhir terhadap periode sebelumnya
+def baris_komparatif(nama, nilai, label):
+    row = {"Akun": nama}
+    row.update({kolom: format_rupiah(n) for kolom, n in zip(label, nilai)})
+    if len(nilai) > 1:
+        selisih, persen = hitung_perubahan(nilai[-2], nilai[-1])
+        row["Selisih"] = format_rupiah(selisih)
+        row["% Perubahan"] = f"{persen:+.1f}%" if persen is not None else "-"
+    return row
+
+# Fungsi untuk menyimpan anggaran satu akun untuk bulan dari..hingga pada satu tahun.
+# Nominal 0 menghapus anggaran bulan tersebut. ValueError jika isian tidak valid.
+def simpan_anggaran(user_id, akun, jenis, tahun, bulan_dari, bulan_hingga, nominal):
+    if not akun.strip():
+        raise ValueError("Nama akun harus diisi.")
+    if jenis not in ("Pendapatan", "Beban"):
+        raise ValueError("Anggaran hanya untuk akun Pendapatan atau Beban.")
+    if nominal < 0:
+        raise ValueError("Nominal anggaran tidak boleh negatif.")
+    if bulan_dari > bulan_hingga:
+        raise ValueError("Bulan awal harus sebelum bulan akhir.")
+    baris = [(user_id, tahun, bulan, akun.strip(), jenis) for bulan in range(bulan_dari, bulan_hingga + 1)]
+    with get_db_connection() as conn:
+        if nominal:
+            conn.executemany('''
+                INSERT INTO budgets (user_id, tahun, bulan, akun, jenis, nominal) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (user_id, tahun, bulan, akun, jenis) DO UPDATE SET nominal = excluded.nominal
+            ''', [b + (nominal,) for b in baris])
+        else:
+            conn.executemany(
+                'DELETE FROM budgets WHERE user_id = ? AND tahun = ? AND bulan = ? AND akun = ? AND jenis = ?', baris
+            )
+    return len(baris)
+
+# Fungsi untuk membandingkan anggaran dengan realisasi per akun pada rentang periode (tahun, bulan).
+# Satu query: anggaran dan rekap bulanan digabung (UNION ALL) lalu dikelompokkan per akun, sehingga
+# akun yang beranggaran tanpa realisasi maupun realisasi tanpa anggaran sama-sama muncul.
+# Mengembalikan daftar (akun, jenis, anggaran, realisasi, selisih, melebihi). Selisih positif berarti
+# menguntungkan (beban di bawah anggaran, pendapatan di atas anggaran); melebihi True jika beban
+# melampaui anggaran atau pendapatan belum mencapai anggaran.
+def hitung_anggaran_vs_realisasi(conn, user_id, dari, hingga):
+    params = (user_id, dari[0], dari[1], hingga[0], hingga[1])
+    hasil = []
+    for akun, jenis, anggaran, realisasi in iter_baris(conn, SQL_LAPORAN["anggaran_vs_realisasi"], params * 2):
+        selisih = realisasi - anggaran if jenis == "Pendapatan" else anggaran - realisasi
+        hasil.append((akun, jenis, anggaran, realisasi, selisih, anggaran > 0 and selisih < -0.01))
+    return hasil
+
+# Fungsi untuk menutup buku sampai akhir periode (tahun, bulan):
+# akun Pendapatan, Beban dan Prive ditutup ke Modal lalu saldo semua akun disimpan sebagai snapshot
+def tutup_periode(user_id, tahun, bulan):
+    with get_db_connection() as conn:
+        # Kunci tulis dipegang sejak pembacaan saldo: transaksi lain tidak bisa masuk di antara perhitungan
+        # saldo dan jurnal penutup, dan dua penutupan bersamaan tidak bisa sama-sama lolos cek di bawah.
+        conn.execute('BEGIN IMMEDIATE')
+        terakhir = get_periode_tutup_terakhir(conn, user_id)
+        if terakhir and (tahun, bulan) <= terakhir:
+            return False, f"Periode {bulan:02d}-{tahun} sudah ditutup (penutupan terakhir {terakhir[1]:02d}-{terakhir[0]})."
+
+        saldo = hitung_saldo_akun(conn, user_id, sampai=(tahun, bulan))
+        tanggal = calendar.monthrange(tahun, bulan)[1]
+
+        jurnal_penutup = []
+        for (akun, jenis), (debit, kredit) in saldo.items():
+            if jenis not in JENIS_NOMINAL:
+                continue
+            selisih = round(debit - kredit, 2)
+            if selisih > 0:
+                # Saldo debit (Beban, Prive) ditutup dengan mengkredit akun dan mendebit Modal
+                jurnal_penutup.append((AKUN_MODAL_PENUTUP, "Modal", akun, jenis, selisih))
+            elif selisih < 0:
+                # Saldo kredit (Pendapatan) ditutup dengan mendebit akun dan mengkredit Modal
+                jurnal_penutup.append((akun, jenis, AKUN_MODAL_PENUTUP, "Modal", -selisih))
+
+        for akun_debit, jenis_debit, akun_kredit, jenis_kredit, nominal in jurnal_penutup:
+            tulis_transaksi(conn, user_id, tanggal, bulan, tahun,
+                            akun_debit, jenis_debit, nominal,
+                            akun_kredit, jenis_kredit, nominal, sumber="penutup")
+            saldo.setdefault((akun_debit, jenis_debit), [0.0, 0.0])[0] += nominal
+            saldo.setdefault((akun_kredit, jenis_kredit), [0.0, 0.0])[1] += nominal
+
+        conn.executemany('''
+            INSERT INTO saldo_snapshot (user_id, tahun, bulan, akun, jenis, debit, kredit)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [(user_id, tahun, bulan, akun, jenis, round(debit, 2), round(kredit, 2))
+              for (akun, jenis), (debit, kredit) in saldo.items()])
+        conn.execute('INSERT INTO tutup_buku (user_id, tahun, bulan) VALUES (?, ?, ?)', (user_id, tahun, bulan))
+
+    jadwalkan_prahitung(user_id)
+    return True, f"Periode {bulan:02d}-{tahun} berhasil ditutup dengan {len(jurnal_penutup)} jurnal penutup."
+
+# === API JSON LOKAL ===
+# Aplikasi ASGI tanpa framework untuk integrasi batch (impor penjualan, sinkronisasi stok, rekonsiliasi).
+# Semua pekerjaan database yang memblokir dijalankan lewat asyncio.to_thread di atas koneksi dari
+# PoolKoneksi, sehingga event loop tetap melayani permintaan lain. Autentikasi memakai HTTP Basic
+# dengan akun pengguna aplikasi. Jalankan dengan: python main.py api [port]
+
+# Pool koneksi SQLite yang dipakai ulang antar permintaan API. Koneksi dibuka dengan
+# check_same_thread=False karena dipakai bergantian oleh thread asyncio.to_thread.
+class PoolKoneksi:
+    def __init__(self, path, ukuran=UKURAN_POOL_API):
+        self.path = path
+        self.bebas = queue.LifoQueue()
+        self.slot = threading.BoundedSemaphore(ukuran)
+
+    # Mengambil koneksi (membuka koneksi baru jika pool masih kosong); menunggu jika semua slot dipakai
+    def ambil(self):
+        self.slot.acquire()
+        try:
+            return self.bebas.get_nowait()
+        except queue.Empty:
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            return conn
+
+    # Mengembalikan koneksi ke pool; transaksi yang belum selesai dibatalkan
+    def kembalikan(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        self.bebas.put(conn)
+        self.slot.release()
+
+    def tutup(self):
+        while True:
+            try:
+                self.bebas.get_nowait().close()
+            except queue.Empty:
+                return
+
+# Galat permintaan API dengan kode status HTTP
+class GalatApi(Exception):
+    def __init__(self, status, pesan):
+        super().__init__(pesan)
+        self.status = status
+        self.pesan = pesan
+
+# Fungsi untuk membaca tanggal "YYYY-MM-DD" dari JSON (bawaan: hari ini)
+def baca_tanggal_api(nilai):
+    if not nilai:
+        return datetime.now()
+    try:
+        return datetime.strptime(nilai, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        raise ValueError(f"Tanggal tidak valid: {nilai!r} (format YYYY-MM-DD).")
+
+# Fungsi untuk membaca angka dari JSON; bool dan teks ditolak dengan pesan per kolom
+def baca_angka_api(nilai, kolom, bulat=False):
+    if bulat:
+        if isinstance(nilai, int) and not isinstance(nilai, bool):
+            return nilai
+        raise ValueError(f"'{kolom}' harus berupa bilangan bulat.")
+    if isinstance(nilai, (int, float)) and not isinstance(nilai, bool) and math.isfinite(nilai):
+        return float(nilai)
+    raise ValueError(f"'{kolom}' harus berupa angka.")
+
+# Fungsi untuk mengubah satu jurnal JSON menjadi argumen tulis_jurnal. Isi tiap baris (akun, jenis,
+# posisi, nominal > 0, keseimbangan) diperiksa oleh validasi_baris_jurnal di dalam tulis_jurnal.
+# Format: {"tanggal": "YYYY-MM-DD", "keterangan": "...", "baris": [{"akun", "jenis", "posisi", "nominal"}]}
+def baca_jurnal_api(data):
+    if not isinstance(data, dict) or not isinstance(data.get("baris"), list):
+        raise ValueError("Jurnal harus berupa objek dengan daftar 'baris'.")
+    tanggal = baca_tanggal_api(data.get("tanggal"))
+    baris = []
+    for j, b in enumerate(data["baris"]):
+        if not isinstance(b, dict):
+            raise ValueError(f"Baris ke-{j + 1} harus berupa objek.")
+        for kolom in ("akun", "jenis", "posisi", "nominal"):
+            if kolom not in b:
+                raise ValueError(f"Baris ke-{j + 1}: '{kolom}' wajib diisi.")
+        try:
+            nominal = baca_angka_api(b["nominal"], "nominal")
+        except ValueError as e:
+            raise ValueError(f"Baris ke-{j + 1}: {e}")
+        baris.append((b["akun"], b["jenis"], b["posisi"], nominal))
+    return tanggal.day, tanggal.month, tanggal.year, str(data.get("keterangan", "")), baris
+
+# Fungsi untuk menulis sekumpulan jurnal dalam satu transaksi database (semua atau tidak sama sekali)
+def simpan_jurnal_api(pool, user_id, daftar):
+    jurnal = []
+    for i, data in enumerate(daftar):
+        try:
+            jurnal.append(baca_jurnal_api(data))
+        except ValueError as e:
+            raise ValueError(f"Jurnal ke-{i + 1}: {e}")
+    conn = pool.ambil()
+    try:
+        hasil = []
+        for i, args in enumerate(jurnal):
+            try:
+                hasil.append(tulis_jurnal(conn, user_id, *args))
+            except ValueError as e:
+                raise ValueError(f"Jurnal ke-{i + 1}: {e}")
+        conn.commit()
+    finally:
+        pool.kembalikan(conn)
+    jadwalkan_prahitung(user_id)
+    return hasil
+
+# Fungsi untuk mencatat sekumpulan mutasi persediaan dalam satu transaksi database.
+# Format: [{"nama": "...", "jumlah": +/-n, "harga_satuan": opsional, "tanggal": opsional}]
+def simpan_mutasi_api(pool, user_id, daftar):
+    conn = pool.ambil()
+    try:
+        # Barang dicari per nama lewat idx_inventory_pengguna dan disimpan per permintaan,
+        # sehingga mutasi berikutnya pada barang yang sama memakai stok dan harga terbaru
+        barang = {}
+        hasil = []
+        for i, data in enumerate(daftar):
+            try:
+                if not isinstance(data, dict) or not isinstance(data.get("nama"), str):
+                    raise ValueError("'nama' barang wajib diisi.")
+                if data["nama"] not in barang:
+                    rows = conn.execute(SQL_LAPORAN["barang_per_nama"], (user_id, data["nama"])).fetchall()
+                    if not rows:
+                        raise ValueError(f"Barang '{data['nama']}' tidak ditemukan di persediaan.")
+                    if len(rows) > 1:
+                        raise ValueError(f"Nama barang '{data['nama']}' tidak unik di persediaan; "
+                                         "ubah nama barang agar dapat dimutasi lewat API.")
+                    barang[data["nama"]] = dict(rows[0])
+                item = barang[data["nama"]]
+                jumlah = baca_angka_api(data.get("jumlah"), "jumlah", bulat=True)
+                harga = None
+                if data.get("harga_satuan") is not None:
+                    harga = baca_angka_api(data["harga_satuan"], "harga_satuan")
+                    if harga <= 0:
+                        raise ValueError("'harga_satuan' harus lebih dari 0.")
+                tanggal = baca_tanggal_api(data.get("tanggal"))
+                hasil.append(tulis_mutasi_persediaan(conn, user_id, item, jumlah, tanggal, harga))
+            except ValueError as e:
+                raise ValueError(f"Mutasi ke-{i + 1}: {e}")
+            # Stok dan harga di memori ikut diperbarui agar mutasi berikutnya pada barang yang sama benar
+            item['jumlah'] += jumlah
+            if jumlah > 0 and harga:
+                item['harga_satuan'] = harga
+        conn.commit()
+    finally:
+        pool.kembalikan(conn)
+    jadwalkan_prahitung(user_id)
+    return hasil
+
+# Fungsi untuk menghitung ulang saldo berjalan yang kotor pada koneksi pool sebelum buku besar dialirkan
+def perbaiki_saldo_api(pool, user_id):
+    conn = pool.ambil()
+    try:
+        jumlah = tulis_saldo_berjalan(conn, user_id)
+        conn.commit()
+    finally:
+        pool.kembalikan(conn)
+    return jumlah
+
+# Fungsi untuk membaca saldo akun pengguna di atas satu snapshot baca pada koneksi pool
+def baca_saldo_api(pool, user_id):
+    conn = pool.ambil()
+    try:
+        conn.execute('BEGIN')
+        return get_saldo_laporan(conn, user_id)
+    finally:
+        pool.kembalikan(conn)
+
+# Fungsi untuk menyusun neraca saldo JSON: satu baris per akun dengan saldo di sisi debit atau kredit
+def neraca_saldo_api(saldo):
+    total_akun = total_per_akun(saldo)
+    akun = []
+    for nama_akun, jenis in saldo:
+        debit, kredit = total_akun[nama_akun]
+        nilai = debit - kredit
+        akun.append({"akun": nama_akun, "jenis": jenis,
+                     "debit": max(nilai, 0.0), "kredit": max(-nilai, 0.0)})
+    total_debit = sum(a["debit"] for a in akun)
+    total_kredit = sum(a["kredit"] for a in akun)
+    return {"akun": akun, "total_debit": total_debit, "total_kredit": total_kredit,
+            "seimbang": abs(total_debit - total_kredit) < 0.01}
+
+# Fungsi untuk menyusun laporan laba rugi, perubahan modal dan neraca JSON dari saldo akun
+def laporan_api(saldo):
+    pendapatan, beban = hitung_laba_rugi(saldo)
+    modal_awal, laba_rugi, total_prive = hitung_perubahan_modal(saldo)
+    aktiva, utang, modal_akhir = hitung_neraca(saldo)
+    return {
+        "laba_rugi": {"pendapatan": pendapatan, "beban": beban, "laba_bersih": laba_rugi},
+        "perubahan_modal": {"modal_awal": modal_awal, "laba_rugi": laba_rugi,
+                            "prive": total_prive, "modal_akhir": modal_akhir},
+        "neraca": {"aktiva": aktiva, "utang": utang, "modal_akhir": modal_akhir,
+                   "total_aktiva": sum(aktiva.values()),
+                   "total_pasiva": sum(utang.values()) + modal_akhir},
+    }
+
+# Fungsi untuk mengubah objek bertipe __slots__ (Transaksi, Posting) menjadi dict JSON
+def slot_ke_dict(obj):
+    return {nama: getattr(obj, nama) for nama in obj.__slots__}
+
+# Aplikasi ASGI API JSON. Daftar rute:
+#   POST /api/jurnal                 satu jurnal majemuk
+#   POST /api/jurnal/batch           {"jurnal": [...]}, satu commit untuk seluruh batch
+#   POST /api/persediaan/mutasi      {"mutasi": [...]}, satu commit untuk seluruh batch
+#   GET  /api/neraca-saldo           neraca saldo
+#   GET  /api/laporan                laba rugi, perubahan modal dan neraca
+#   GET  /api/transaksi              semua transaksi (dialirkan per UKURAN_BATCH baris)
+#   GET  /api/buku-besar?akun=...    posting satu akun dengan saldo berjalan (dialirkan)
+class AplikasiApi:
+    def __init__(self, path=None):
+        self.pool = PoolKoneksi(path or DB_PATH)
+        self.rute = {
+            ("POST", "/api/jurnal"): self.post_jurnal,
+            ("POST", "/api/jurnal/batch"): self.post_jurnal_batch,
+            ("POST", "/api/persediaan/mutasi"): self.post_mutasi,
+            ("GET", "/api/neraca-saldo"): self.get_neraca_saldo,
+            ("GET", "/api/laporan"): self.get_laporan,
+            ("GET", "/api/transaksi"): self.get_transaksi,
+            ("GET", "/api/buku-besar"): self.get_buku_besar,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        try:
+            metode = {m for m, p in self.rute if p == scope["path"]}
+            if not metode:
+                raise GalatApi(404, "Rute tidak ditemukan.")
+            if scope["method"] not in metode:
+                raise GalatApi(405, "Metode tidak diizinkan.")
+            user_id = await self.autentikasi(scope)
+            await self.rute[(scope["method"], scope["path"])](scope, receive, send, user_id)
+        except GalatApi as e:
+            await self.kirim_json(send, e.status, {"galat": e.pesan})
+        except ValueError as e:
+            await self.kirim_json(send, 400, {"galat": str(e)})
 
-# Fungsi untuk hash password menggunakan SHA256
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+    async def lifespan(self, receive, send):
+        while True:
+            pesan = await receive()
+            if pesan["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif pesan["type"] == "lifespan.shutdown":
+                self.pool.tutup()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
 
-# Fungsi untuk mendaftarkan pengguna baru
-def register_user(username, password):
-    with get_db_connection() as conn:
+    async def autentikasi(self, scope):
+        header = dict(scope["headers"]).get(b"authorization", b"")
         try:
-            conn.execute(
-                'INSERT INTO users (username, password) VALUES (?, ?)',
-                (username, hash_password(password))
-            )
-            return True, "Pendaftaran berhasil! Silakan login."
-        except sqlite3.IntegrityError:
-            return False, "Username sudah terdaftar."
+            jenis, token = header.decode().split(" ", 1)
+            username, password = base64.b64decode(token).decode().split(":", 1)
+        except ValueError:
+            raise GalatApi(401, "Autentikasi Basic diperlukan.")
+        if jenis.lower() != "basic":
+            raise GalatApi(401, "Autentikasi Basic diperlukan.")
+        sukses, user_id, _ = await asyncio.to_thread(login_user, username, password)
+        if not sukses:
+            raise GalatApi(401, "Username atau password salah.")
+        return user_id
 
-# Fungsi verifikasi login pengguna
-def login_user(username, password):
-    with get_db_connection() as conn:
-        user = conn.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
-    if user and user['password'] == hash_password(password):
-        return True, user['id'], user['username']
-    else:
-        return False, None, None
+    async def baca_json(self, receive):
+        isi = b""
+        while True:
+            pesan = await receive()
+            isi += pesan.get("body", b"")
+            if not pesan.get("more_body"):
+                break
+        try:
+            return json.loads(isi or b"null")
+        except ValueError:
+            raise GalatApi(400, "Body bukan JSON yang valid.")
 
-# Fungsi untuk memasukkan transaksi baru ke database
-def insert_transaction(user_id, tanggal, bulan, tahun,
-                       akun_debit, jenis_debit, nominal_debit,
-                       akun_kredit, jenis_kredit, nominal_kredit):
-    with get_db_connection() as conn:
-        conn.execute('''
-            INSERT INTO transactions 
-            (user_id, tanggal, bulan, tahun,
-             akun_debit, jenis_debit, nominal_debit,
-             akun_kredit, jenis_kredit, nominal_kredit)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (user_id, tanggal, bulan, tahun,
-              akun_debit, jenis_debit, nominal_debit,
-              akun_kredit, jenis_kredit, nominal_kredit)
-        )
+    async def kirim_json(self, send, status, data):
+        isi = json.dumps(data).encode()
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json"),
+                                (b"content-length", str(len(isi)).encode())]})
+        await send({"type": "http.response.body", "body": isi})
 
-# Fungsi untuk mengambil data transaksi pengguna
-def get_transactions(user_id):
-    with get_db_connection() as conn:
-        transactions = conn.execute('''
-            SELECT tanggal, bulan, tahun, akun_debit, jenis_debit, nominal_debit,
-                   akun_kredit, jenis_kredit, nominal_kredit
-            FROM transactions
-            WHERE user_id = ?
-            ORDER BY tahun DESC, bulan DESC, tanggal DESC
-        ''', (user_id,)).fetchall()
-    return transactions
+    # Mengirim array JSON secara bertahap: tiap potongan UKURAN_BATCH objek diambil di thread
+    # pada satu transaksi baca, sehingga respons besar tidak pernah dimuat sekaligus ke memori
+    async def kirim_aliran_json(self, send, buat_iterator):
+        conn = await asyncio.to_thread(self.pool.ambil)
+        try:
+            def mulai():
+                conn.execute('BEGIN')
+                return buat_iterator(conn)
+            baris = await asyncio.to_thread(mulai)
+            def potongan():
+                return [slot_ke_dict(obj) for obj in itertools.islice(baris, UKURAN_BATCH)]
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"application/json")]})
+            awal = b"["
+            while True:
+                data = await asyncio.to_thread(potongan)
+                if not data:
+                    break
+                isi = ",".join(json.dumps(d) for d in data).encode()
+                await send({"type": "http.response.body", "body": awal + isi, "more_body": True})
+                awal = b","
+            await send({"type": "http.response.body", "body": b"[]" if awal == b"[" else b"]"})
+        finally:
+            await asyncio.to_thread(self.pool.kembalikan, conn)
 
-# Fungsi untuk menambahkan data persediaan baru
-def insert_inventory(user_id, nama, jumlah, harga_satuan):
-    with get_db_connection() as conn:
-        conn.execute('''
-            INSERT INTO inventory (user_id, nama, jumlah, harga_satuan)
-            VALUES (?, ?, ?, ?)
-        ''', (user_id, nama, jumlah, harga_satuan))
+    async def post_jurnal(self, scope, receive, send, user_id):
+        data = await self.baca_json(receive)
+        hasil = await asyncio.to_thread(simpan_jurnal_api, self.pool, user_id, [data])
+        await self.kirim_json(send, 201, {"entry_id": hasil[0]})
 
-# Fungsi untuk mengambil daftar persediaan pengguna
-def get_inventory(user_id):
-    with get_db_connection() as conn:
-        items = conn.execute('''
-            SELECT id, nama, jumlah, harga_satuan
-            FROM inventory
-            WHERE user_id = ?
-            ORDER BY nama ASC
-        ''', (user_id,)).fetchall()
-    return items
+    async def post_jurnal_batch(self, scope, receive, send, user_id):
+        data = await self.baca_json(receive)
+        if not isinstance(data, dict) or not isinstance(data.get("jurnal"), list):
+            raise ValueError("Body harus berupa {\"jurnal\": [...]}.")
+        hasil = await asyncio.to_thread(simpan_jurnal_api, self.pool, user_id, data["jurnal"])
+        await self.kirim_json(send, 201, {"entry_id": hasil})
 
-# Fungsi untuk memperbarui data persediaan
-def update_inventory_item(item_id, jumlah, harga_satuan):
-    with get_db_connection() as conn:
-        conn.execute('''
-            UPDATE inventory SET jumlah = ?, harga_satuan = ? WHERE id = ?
-        ''', (jumlah, harga_satuan, item_id))
+    async def post_mutasi(self, scope, receive, send, user_id):
+        data = await self.baca_json(receive)
+        if not isinstance(data, dict) or not isinstance(data.get("mutasi"), list):
+            raise ValueError("Body harus berupa {\"mutasi\": [...]}.")
+        hasil = await asyncio.to_thread(simpan_mutasi_api, self.pool, user_id, data["mutasi"])
+        await self.kirim_json(send, 201, {"transaksi_id": hasil})
+
+    async def get_neraca_saldo(self, scope, receive, send, user_id):
+        saldo = await asyncio.to_thread(baca_saldo_api, self.pool, user_id)
+        await self.kirim_json(send, 200, neraca_saldo_api(saldo))
+
+    async def get_laporan(self, scope, receive, send, user_id):
+        saldo = await asyncio.to_thread(baca_saldo_api, self.pool, user_id)
+        await self.kirim_json(send, 200, laporan_api(saldo))
+
+    async def get_transaksi(self, scope, receive, send, user_id):
+        await self.kirim_aliran_json(send, lambda conn: iter_transaksi(conn, user_id))
+
+    async def get_buku_besar(self, scope, receive, send, user_id):
+        query = parse_qs(scope.get("query_string", b"").decode())
+        akun = query.get("akun", [""])[0]
+        if not akun:
+            raise ValueError("Parameter 'akun' wajib diisi.")
+        # Saldo berjalan dari transaksi mundur tanggal diperbaiki dulu, seperti halaman Buku Besar
+        await asyncio.to_thread(perbaiki_saldo_api, self.pool, user_id)
+        await self.kirim_aliran_json(send, lambda conn: iter_baris(
+            conn, SQL_LAPORAN["posting_akun"], (user_id, akun), kelas=Posting))
+
+# Fungsi untuk membuat aplikasi API (path database opsional, bawaan DB_PATH)
+def buat_aplikasi_api(path=None):
+    return AplikasiApi(path)
+
+# Fungsi untuk menjalankan server API lokal dengan uvicorn (hanya mendengarkan 127.0.0.1)
+def jalankan_api(port=PORT_API):
+    try:
+        import uvicorn
+    except ImportError:
+        print("Paket uvicorn belum terpasang: pip install uvicorn", file=sys.stderr)
+        return 1
+    init_db()
+    uvicorn.run(buat_aplikasi_api(), host="127.0.0.1", port=port)
+    return 0
 
 # Fungsi utama aplikasi Streamlit
 def main():
-    st.set_page_config(page_title="Sistem Akuntansi", page_icon="logo_aplikasi.jpg", layout="centered")
+    try:
+        page_icon = muat_gambar("logo_aplikasi.jpg", LEBAR_IKON)
+    except FileNotFoundError:
+        page_icon = "📒"
+    st.set_page_config(page_title="Sistem Akuntansi", page_icon=page_icon, layout="centered")
     st.title("Sistem Akuntansi")
+    picu_pemeliharaan = mulai_pemeliharaan_latar()
+    mulai_penjadwal_berulang()
 
     # Inisialisasi variabel session state
     if 'logged_in' not in st.session_state:
@@ -154,8 +3034,6 @@ def main():
     if 'username' not in st.session_state:
         st.session_state.username = ""
 
-    JENIS_AKUN = ["Aktiva", "Utang", "Modal", "Pendapatan", "Beban", "Prive"]
-
     # Jika belum login, tampilkan form Login dan Daftar
     if not st.session_state.logged_in:
         menu = st.selectbox("Menu", options=["Login", "Daftar Akun Baru"])
@@ -204,9 +3082,9 @@ def main():
             st.rerun()
 
         menu_options = [
-            "Informasi", "Persediaan", "Input Transaksi", "Riwayat Transaksi", "Buku Besar", 
+            "Informasi", "Dashboard", "Persediaan", "Input Transaksi", "Riwayat Transaksi", "Buku Besar", 
             "Neraca Saldo", "Laporan Laba Rugi", 
-            "Laporan Perubahan Modal", "Neraca"
+            "Laporan Perubahan Modal", "Neraca", "Laporan Komparatif", "Anggaran", "Tutup Buku", "Pemeliharaan"
         ]
         selected_menu = st.sidebar.selectbox("Menu", menu_options)
 
@@ -236,25 +3114,241 @@ def main():
                     elif not akun_debit.strip() or not akun_kredit.strip():
                         st.error("Nama akun debit dan kredit harus diisi.")
                     else:
-                        insert_transaction(st.session_state.user_id, tanggal, bulan, tahun,
-                                        akun_debit.strip(), jenis_debit, nominal_debit,
-                                        akun_kredit.strip(), jenis_kredit, nominal_kredit)
-                        st.success("Transaksi berhasil disimpan.")
+                        try:
+                            insert_transaction(st.session_state.user_id, tanggal, bulan, tahun,
+                                            akun_debit.strip(), jenis_debit, nominal_debit,
+                                            akun_kredit.strip(), jenis_kredit, nominal_kredit)
+                            st.success("Transaksi berhasil disimpan.")
+                        except ValueError as e:
+                            st.error(str(e))
+
+            # Jurnal majemuk: banyak baris debit/kredit dalam satu jurnal (misal penjualan dengan pajak dan diskon)
+            st.subheader("🧾 Jurnal Majemuk")
+            jumlah_baris = st.number_input("Jumlah baris jurnal", min_value=2, max_value=20, value=3)
+            with st.form("form_jurnal_majemuk", clear_on_submit=True):
+                col1, col2, col3 = st.columns(3)
+                tanggal = col1.number_input("Tanggal", min_value=1, max_value=31, value=1, key="jurnal_tanggal")
+                bulan = col2.number_input("Bulan", min_value=1, max_value=12, value=1, key="jurnal_bulan")
+                tahun = col3.number_input("Tahun", min_value=2000, max_value=2100, value=2024, key="jurnal_tahun")
+                keterangan = st.text_input("Keterangan")
+
+                baris = []
+                for i in range(jumlah_baris):
+                    col1, col2, col3, col4 = st.columns([3, 2, 2, 2])
+                    akun = col1.text_input("Akun", key=f"jurnal_akun_{i}")
+                    jenis = col2.selectbox("Jenis", JENIS_AKUN, key=f"jurnal_jenis_{i}")
+                    posisi = col3.selectbox("Posisi", ["Debit", "Kredit"], index=0 if i == 0 else 1, key=f"jurnal_posisi_{i}")
+                    nominal = col4.number_input("Nominal", min_value=0.0, format="%.2f", key=f"jurnal_nominal_{i}")
+                    # Baris yang dibiarkan kosong diabaikan
+                    if akun.strip() or nominal:
+                        baris.append((akun, jenis, posisi, nominal))
+
+                if st.form_submit_button("Simpan Jurnal"):
+                    try:
+                        insert_jurnal(st.session_state.user_id, tanggal, bulan, tahun, keterangan.strip(), baris)
+                        st.success(f"Jurnal majemuk dengan {len(baris)} baris berhasil disimpan.")
+                    except ValueError as e:
+                        st.error(str(e))
+
+            # Transaksi berulang: template yang dibuat otomatis oleh penjadwal latar saat jatuh tempo
+            st.subheader("🔁 Transaksi Berulang")
+            with st.expander("Tambah Template Transaksi Berulang"):
+                with st.form("form_transaksi_berulang", clear_on_submit=True):
+                    nama = st.text_input("Nama Template", placeholder="Contoh: Penjualan panen 100 kg @ Rp4.500")
+                    col1, col2 = st.columns(2)
+                    akun_debit = col1.text_input("Akun Debit", key="berulang_akun_debit")
+                    jenis_debit = col2.selectbox("Jenis Debit", JENIS_AKUN, key="berulang_jenis_debit")
+                    akun_kredit = col1.text_input("Akun Kredit", key="berulang_akun_kredit")
+                    jenis_kredit = col2.selectbox("Jenis Kredit", JENIS_AKUN, key="berulang_jenis_kredit")
+                    nominal = st.number_input("Nominal", min_value=0.0, format="%.2f", key="berulang_nominal")
+                    col1, col2, col3 = st.columns(3)
+                    frekuensi = col1.selectbox("Frekuensi", FREKUENSI_BERULANG, index=2)
+                    mulai = col2.date_input("Mulai", value=date.today())
+                    selesai = col3.date_input("Selesai (opsional)", value=None)
+
+                    if st.form_submit_button("Simpan Template"):
+                        try:
+                            tambah_transaksi_berulang(st.session_state.user_id, nama, akun_debit, jenis_debit,
+                                                      akun_kredit, jenis_kredit, nominal, frekuensi, mulai, selesai)
+                            dibuat, dilewati = buat_transaksi_berulang(user_id=st.session_state.user_id)
+                            st.success(f"Template berhasil disimpan. {dibuat} transaksi jatuh tempo dibuat.")
+                            if dilewati:
+                                st.info(f"{dilewati} kejadian pada periode yang sudah ditutup dilewati.")
+                        except ValueError as e:
+                            st.error(str(e))
+
+            template = get_transaksi_berulang(st.session_state.user_id)
+            if template:
+                for t in template:
+                    col1, col2 = st.columns([4, 1])
+                    status = f"berikutnya {t['berikutnya']}" if t['aktif'] else "berhenti"
+                    col1.write(f"**{t['nama']}** — {t['frekuensi']}, {format_rupiah(t['nominal'])} "
+                               f"({t['akun_debit']} / {t['akun_kredit']}), {status}")
+                    if col2.button("Hentikan" if t['aktif'] else "Aktifkan", key=f"berulang_status_{t['id']}"):
+                        ubah_status_berulang(st.session_state.user_id, t['id'], not t['aktif'])
+                        st.rerun()
+                if st.button("Buat Transaksi Jatuh Tempo Sekarang"):
+                    dibuat, dilewati = buat_transaksi_berulang(user_id=st.session_state.user_id)
+                    st.success(f"{dibuat} transaksi berulang dibuat.")
+                    if dilewati:
+                        st.info(f"{dilewati} kejadian pada periode yang sudah ditutup dilewati.")
+            else:
+                st.info("Belum ada template transaksi berulang.")
 
         # memilih menu riwayat transaksi
         elif selected_menu == "Riwayat Transaksi":
             st.header("📜 Riwayat Transaksi")
-            transactions = get_transactions(st.session_state.user_id)
+
+            # Filter pencarian
+            with st.expander("🔎 Cari Transaksi", expanded=False):
+                kata_kunci = st.text_input("Cari nama akun")
+                akun_filter = st.selectbox("Akun", ["Semua Akun"] + get_daftar_akun(st.session_state.user_id))
+                col1, col2 = st.columns(2)
+                nominal_min = col1.number_input("Nominal minimum", min_value=0.0, format="%.2f", value=0.0)
+                nominal_max = col2.number_input("Nominal maksimum (0 = tanpa batas)", min_value=0.0, format="%.2f", value=0.0)
+                pakai_tanggal = st.checkbox("Filter tanggal")
+                col1, col2 = st.columns(2)
+                dari = col1.date_input("Dari tanggal", disabled=not pakai_tanggal)
+                sampai = col2.date_input("Sampai tanggal", disabled=not pakai_tanggal)
+
+            filter_aktif = (
+                kata_kunci.strip(),
+                None if akun_filter == "Semua Akun" else akun_filter,
+                nominal_min if nominal_min > 0 else None,
+                nominal_max if nominal_max > 0 else None,
+                dari if pakai_tanggal else None,
+                sampai if pakai_tanggal else None,
+            )
+
+            # Kursor halaman disimpan di session state dan diulang dari awal jika filter berubah
+            if st.session_state.get('riwayat_filter') != filter_aktif:
+                st.session_state.riwayat_filter = filter_aktif
+                st.session_state.riwayat_kursor = [None]
+
+            kursor_list = st.session_state.riwayat_kursor
+            transactions, ada_berikutnya = cari_transaksi(
+                st.session_state.user_id, *filter_aktif, kursor=kursor_list[-1]
+            )
+
             if not transactions:
-                st.info("Belum ada transaksi.")
+                st.info("Belum ada transaksi." if len(kursor_list) == 1 else "Tidak ada transaksi lagi.")
             else:
                 for t in transactions: # tambah sampai 252
                     st.write(
-                        f"{t['tanggal']:02d}-{t['bulan']:02d}-{t['tahun']} | "
-                        f"Debit: {t['akun_debit']} ({t['jenis_debit']}) {format_rupiah(t['nominal_debit'])} | "
-                        f"Kredit: {t['akun_kredit']} ({t['jenis_kredit']}) {format_rupiah(t['nominal_kredit'])}"
+                        f"{t.tanggal:02d}-{t.bulan:02d}-{t.tahun} | "
+                        f"Debit: {t.akun_debit} ({t.jenis_debit}) {format_rupiah(t.nominal_debit)} | "
+                        f"Kredit: {t.akun_kredit} ({t.jenis_kredit}) {format_rupiah(t.nominal_kredit)}"
                     )
 
+            # Navigasi halaman
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col1:
+                if len(kursor_list) > 1 and st.button("⬅ Sebelumnya"):
+                    kursor_list.pop()
+                    st.rerun()
+            with col2:
+                st.caption(f"Halaman {len(kursor_list)}")
+            with col3:
+                if ada_berikutnya and st.button("Berikutnya ➡"):
+                    t = transactions[-1]
+                    kursor_list.append((t.tahun, t.bulan, t.tanggal, t.id))
+                    st.rerun()
+
+            # Koreksi transaksi: ubah atau batalkan, tercatat di riwayat perubahan
+            if transactions:
+                with st.expander("✏ Ubah / Batalkan Transaksi", expanded=False):
+                    pilihan = {
+                        f"#{t.id} | {t.tanggal:02d}-{t.bulan:02d}-{t.tahun} | {t.akun_debit} / {t.akun_kredit} "
+                        f"{format_rupiah(t.nominal_debit)}": t
+                        for t in transactions
+                    }
+                    t = pilihan[st.selectbox("Pilih transaksi di halaman ini", list(pilihan))]
+                    with st.form(f"form_ubah_transaksi_{t.id}"):
+                        col1, col2, col3 = st.columns(3)
+                        tanggal = col1.number_input("Tanggal", min_value=1, max_value=31, value=t.tanggal)
+                        bulan = col2.number_input("Bulan", min_value=1, max_value=12, value=t.bulan)
+                        tahun = col3.number_input("Tahun", min_value=2000, max_value=2100, value=t.tahun)
+                        col1, col2, col3 = st.columns(3)
+                        akun_debit = col1.text_input("Akun Debit", value=t.akun_debit)
+                        jenis_debit = col2.selectbox("Jenis Debit", JENIS_AKUN,
+                                                     index=JENIS_AKUN.index(t.jenis_debit) if t.jenis_debit in JENIS_AKUN else 0)
+                        nominal_debit = col3.number_input("Nominal Debit", min_value=0.0, format="%.2f", value=float(t.nominal_debit))
+                        col1, col2, col3 = st.columns(3)
+                        akun_kredit = col1.text_input("Akun Kredit", value=t.akun_kredit)
+                        jenis_kredit = col2.selectbox("Jenis Kredit", JENIS_AKUN,
+                                                      index=JENIS_AKUN.index(t.jenis_kredit) if t.jenis_kredit in JENIS_AKUN else 0)
+                        nominal_kredit = col3.number_input("Nominal Kredit", min_value=0.0, format="%.2f", value=float(t.nominal_kredit))
+                        alasan = st.text_input("Alasan koreksi")
+
+                        col1, col2 = st.columns(2)
+                        simpan = col1.form_submit_button("Simpan Perubahan")
+                        batalkan = col2.form_submit_button("Batalkan Transaksi")
+                        if simpan:
+                            # Keseimbangan, nama dan jenis akun serta mutasi stok diperiksa oleh ubah_transaksi
+                            success, message = ubah_transaksi(
+                                st.session_state.user_id, t.id, tanggal, bulan, tahun,
+                                akun_debit.strip(), jenis_debit, nominal_debit,
+                                akun_kredit.strip(), jenis_kredit, nominal_kredit, alasan.strip()
+                            )
+                            if success:
+                                st.success(message)
+                                st.rerun()
+                            else:
+                                st.error(message)
+                        elif batalkan:
+                            success, message = batalkan_transaksi(st.session_state.user_id, t.id, alasan.strip())
+                            if success:
+                                st.success(message)
+                                st.rerun()
+                            else:
+                                st.error(message)
+
+            jurnal_majemuk = get_jurnal_majemuk(st.session_state.user_id)
+            if jurnal_majemuk:
+                with st.expander("📑 Jurnal Majemuk", expanded=False):
+                    for j, baris in jurnal_majemuk:
+                        st.write(f"#{j['id']} | {j['tanggal']:02d}-{j['bulan']:02d}-{j['tahun']} | {j['keterangan'] or '-'}")
+                        for b in baris:
+                            st.write(f"    {b['posisi']}: {b['akun']} ({b['jenis']}) {format_rupiah(b['nominal'])}")
+                    with st.form("form_batal_jurnal"):
+                        pilihan = {f"#{j['id']} | {j['keterangan'] or '-'}": j['id'] for j, _ in jurnal_majemuk}
+                        dipilih = st.selectbox("Jurnal yang dibatalkan", list(pilihan))
+                        alasan = st.text_input("Alasan pembatalan")
+                        if st.form_submit_button("Batalkan Jurnal"):
+                            success, message = batalkan_jurnal(st.session_state.user_id, pilihan[dipilih], alasan.strip())
+                            if success:
+                                st.success(message)
+                                st.rerun()
+                            else:
+                                st.error(message)
+
+            perubahan = get_riwayat_perubahan(st.session_state.user_id)
+            if perubahan:
+                with st.expander("🕘 Riwayat Perubahan", expanded=False):
+                    for p in perubahan:
+                        lama = json.loads(p['data_lama'])
+                        if p['aksi'] == 'batal_jurnal':
+                            st.write(
+                                f"{p['created_at']} | Jurnal #{p['transaksi_id']} Dibatalkan: "
+                                f"{lama['tanggal']:02d}-{lama['bulan']:02d}-{lama['tahun']} {lama['keterangan'] or '-'} "
+                                f"({len(lama['baris'])} baris)" + (f" | Alasan: {p['alasan']}" if p['alasan'] else "")
+                            )
+                            continue
+                        keterangan = (
+                            f"{lama['tanggal']:02d}-{lama['bulan']:02d}-{lama['tahun']} "
+                            f"{lama['akun_debit']} / {lama['akun_kredit']} {format_rupiah(lama['nominal_debit'])}"
+                        )
+                        if p['aksi'] == 'ubah':
+                            baru = json.loads(p['data_baru'])
+                            keterangan += (
+                                f" → {baru['tanggal']:02d}-{baru['bulan']:02d}-{baru['tahun']} "
+                                f"{baru['akun_debit']} / {baru['akun_kredit']} {format_rupiah(baru['nominal_debit'])}"
+                            )
+                        st.write(
+                            f"{p['created_at']} | #{p['transaksi_id']} {'Diubah' if p['aksi'] == 'ubah' else 'Dibatalkan'}: "
+                            f"{keterangan}" + (f" | Alasan: {p['alasan']}" if p['alasan'] else "")
+                        )
+
         #memilih manajemen persediaan
         elif selected_menu == "Persediaan":
             st.header("📦 Manajemen Persediaan")
@@ -264,37 +3358,53 @@ def main():
             
             with tab1:
                 st.subheader("Stok Akhir Persediaan")
-                inventory_items = get_inventory(st.session_state.user_id)
+                conn = get_report_connection()
+                jumlah_barang, total_unit, total_nilai = get_ringkasan_persediaan(conn, st.session_state.user_id)
                 
-                if not inventory_items:
+                if not jumlah_barang:
                     st.info("Belum ada data persediaan.")
                 else:
-                    # Tampilkan hanya 1 barang jika semua barang sama (berdasarkan nama)
-                    unique_items = set(item['nama'] for item in inventory_items)
-                    
-                    if len(unique_items) == 1:
-                        item = inventory_items[0]
+                    col1, col2, col3 = st.columns(3)
+                    col1.metric("Jumlah Barang", jumlah_barang)
+                    col2.metric("Total Unit", total_unit)
+                    col3.metric("Total Nilai Persediaan", format_rupiah(total_nilai))
+
+                    # Peringatan barang yang stoknya sudah mencapai stok minimum
+                    menipis = get_stok_menipis(conn, st.session_state.user_id)
+                    if menipis:
+                        st.warning(f"⚠️ {len(menipis)}{'+' if len(menipis) == PER_HALAMAN else ''} barang mencapai stok minimum.")
+                        with st.expander("Daftar Barang Stok Menipis"):
+                            for item in menipis:
+                                st.write(f"- {item['nama']}: {item['jumlah']} unit (minimum {item['stok_minimum']})")
+
+                    if jumlah_barang == 1:
+                        item = get_halaman_persediaan(conn, st.session_state.user_id)[0]
                         st.markdown(f""" #tambah sampai 278
                         - Nama Barang: {item['nama']}
                         - Stok Akhir: {item['jumlah']} unit
                         - Harga Satuan: {format_rupiah(item['harga_satuan'])}
-                        - Total Nilai: {format_rupiah(item['jumlah'] * item['harga_satuan'])}
+                        - Total Nilai: {format_rupiah(item['nilai'])}
                         """)
                     else:
-                        # Jika ada multiple items, tampilkan semua
+                        # Jika ada multiple items, tampilkan per halaman (nilai per barang dihitung di SQL)
+                        jumlah_halaman = max(1, -(-jumlah_barang // PER_HALAMAN))
+                        halaman = st.number_input(f"Halaman (dari {jumlah_halaman})", min_value=1,
+                                                  max_value=jumlah_halaman, value=1, key="halaman_persediaan")
                         data = []
-                        for item in inventory_items:
+                        for item in get_halaman_persediaan(conn, st.session_state.user_id,
+                                                           offset=(halaman - 1) * PER_HALAMAN):
                             data.append([
                                 item['nama'],
                                 item['jumlah'],
                                 format_rupiah(item['harga_satuan']), #tambah 2
-                                format_rupiah(item['jumlah'] * item['harga_satuan'])
-
+                                format_rupiah(item['nilai']),
+                                item['stok_minimum']
                             ])
                         
                         import pandas as pd
-                        df = pd.DataFrame(data, columns=["Nama Barang", "Stok Akhir", "Harga Satuan", "Total Nilai"])
+                        df = pd.DataFrame(data, columns=["Nama Barang", "Stok Akhir", "Harga Satuan", "Total Nilai", "Stok Minimum"])
                         st.dataframe(df, hide_index=True, use_container_width=True)
+                conn.close()
             
             with tab2:
                 st.subheader("Operasi Persediaan")
@@ -305,6 +3415,7 @@ def main():
                         nama = st.text_input("Nama Barang Baru")
                         jumlah = st.number_input("Jumlah Awal", min_value=0, step=1, value=0)
                         harga_satuan = st.number_input("Harga Satuan (Rp)", min_value=0.0, step=1000.0, format="%.2f", value=0.0)
+                        stok_minimum = st.number_input("Stok Minimum (0 = tanpa peringatan)", min_value=0, step=1, value=0)
 
                         if st.form_submit_button("Simpan Barang Baru"):
                             if not nama.strip():
@@ -312,15 +3423,21 @@ def main():
                             elif harga_satuan <= 0:
                                 st.error("Harga satuan harus lebih dari 0")
                             else:
-                                insert_inventory(st.session_state.user_id, nama.strip(), jumlah, harga_satuan)
+                                insert_inventory(st.session_state.user_id, nama.strip(), jumlah, harga_satuan, stok_minimum)
                                 st.success("Barang baru berhasil ditambahkan!")
                                 st.rerun()
                 
-                elif operation == "Tambah Stok":
-                    inventory_items = get_inventory(st.session_state.user_id)
+                else:
+                    # Pilihan barang dibatasi hasil pencarian awal nama, bukan seluruh katalog
+                    awalan = st.text_input("Cari Barang (awal nama)", key="operasi_cari_barang").strip()
+                    with get_db_connection() as conn:
+                        inventory_items = cari_persediaan(conn, st.session_state.user_id, awalan)
+                    if len(inventory_items) == PER_HALAMAN:
+                        st.caption(f"Menampilkan {PER_HALAMAN} barang pertama, persempit pencarian untuk barang lain.")
+
                     if not inventory_items:
-                        st.info("Belum ada data persediaan.")
-                    else:
+                        st.info("Tidak ada barang yang cocok." if awalan else "Belum ada data persediaan.")
+                    elif operation == "Tambah Stok":
                         with st.form("form_add_stock"):
                             selected_item = st.selectbox(
                                 "Pilih Barang",
@@ -334,31 +3451,17 @@ def main():
                             if st.form_submit_button("Tambah Stok"):
                                 selected_item_data = next((item for item in inventory_items if item['nama'] == selected_item), None)
                                 if selected_item_data:
-                                    # Jika harga baru tidak diisi, gunakan harga lama
-                                    updated_price = new_price if new_price > 0 else selected_item_data['harga_satuan']
-                                    new_amount = selected_item_data['jumlah'] + add_amount
-                                    update_inventory_item(selected_item_data['id'], new_amount, updated_price)
-                                    
-                                    # Catat transaksi penambahan stok
-                                    tanggal_now = datetime.now().day
-                                    bulan_now = datetime.now().month
-                                    tahun_now = datetime.now().year
-                                    
-                                    insert_transaction(
-                                        st.session_state.user_id,
-                                        tanggal_now, bulan_now, tahun_now,
-                                        "Persediaan Barang", "Aktiva", add_amount * updated_price,
-                                        "Kas", "Aktiva", add_amount * updated_price
-                                    )
-                                    
-                                    st.success(f"Berhasil menambah {add_amount} {selected_item} ke persediaan.")
-                                    st.rerun()
+                                    # Catat transaksi penambahan stok (harga lama dipakai jika harga baru tidak diisi)
+                                    try:
+                                        catat_mutasi_persediaan(st.session_state.user_id, selected_item_data,
+                                                                add_amount, new_price if new_price > 0 else None)
+                                    except ValueError as e:
+                                        st.error(str(e))
+                                    else:
+                                        st.success(f"Berhasil menambah {add_amount} {selected_item} ke persediaan.")
+                                        st.rerun()
                 
-                else:  # Kurangi Stok
-                    inventory_items = get_inventory(st.session_state.user_id)
-                    if not inventory_items:
-                        st.info("Belum ada data persediaan.")
-                    else:
+                    else:  # Kurangi Stok
                         with st.form("form_reduce_stock"):
                             selected_item = st.selectbox(
                                 "Pilih Barang",
@@ -371,35 +3474,28 @@ def main():
                             if st.form_submit_button("Kurangi Stok"):
                                 selected_item_data = next((item for item in inventory_items if item['nama'] == selected_item), None)
                                 if selected_item_data:
-                                    if reduce_amount > selected_item_data['jumlah']:
-                                        st.error(f"Jumlah melebihi stok! Stok tersedia: {selected_item_data['jumlah']}")
+                                    # Catat transaksi pengurangan stok (stok yang tidak cukup ditolak)
+                                    try:
+                                        catat_mutasi_persediaan(st.session_state.user_id, selected_item_data, -reduce_amount)
+                                    except ValueError as e:
+                                        st.error(str(e))
                                     else:
-                                        new_amount = selected_item_data['jumlah'] - reduce_amount
-                                        update_inventory_item(selected_item_data['id'], new_amount, selected_item_data['harga_satuan'])
-                                        
-                                        # Catat transaksi pengurangan stok
-                                        tanggal_now = datetime.now().day
-                                        bulan_now = datetime.now().month
-                                        tahun_now = datetime.now().year
-                                        
-                                        insert_transaction(
-                                            st.session_state.user_id,
-                                            tanggal_now, bulan_now, tahun_now,
-                                            "Beban Persediaan", "Beban", reduce_amount * selected_item_data['harga_satuan'],
-                                            "Persediaan Barang", "Aktiva", reduce_amount * selected_item_data['harga_satuan']
-                                        )
-                                        
                                         st.success(f"Berhasil mengurangi {reduce_amount} {selected_item} dari persediaan.")
                                         st.info(f"Alasan: {reason}")
                                         st.rerun()
             
             with tab3:
                 st.subheader("Detail & Perhitungan Rata-rata")
-                inventory_items = get_inventory(st.session_state.user_id)
+                # Sama seperti tab Operasi: hanya barang hasil pencarian awal nama yang dimuat
+                awalan = st.text_input("Cari Barang (awal nama)", key="detail_cari_barang").strip()
+                with get_db_connection() as conn:
+                    inventory_items = cari_persediaan(conn, st.session_state.user_id, awalan)
                 
                 if not inventory_items:
-                    st.info("Belum ada data persediaan.")
+                    st.info("Tidak ada barang yang cocok." if awalan else "Belum ada data persediaan.")
                 else:
+                    if len(inventory_items) == PER_HALAMAN:
+                        st.caption(f"Menampilkan {PER_HALAMAN} barang pertama, persempit pencarian untuk barang lain.")
                     selected_item = st.selectbox(
                         "Pilih Barang untuk Detail",
                         options=[item['nama'] for item in inventory_items],
@@ -416,7 +3512,16 @@ def main():
                         - Stok Akhir: {selected_item_data['jumlah']} unit
                         - Harga Satuan Terakhir: {format_rupiah(selected_item_data['harga_satuan'])}
                         - Nilai Persediaan: {format_rupiah(selected_item_data['jumlah'] * selected_item_data['harga_satuan'])}
+                        - Stok Minimum: {selected_item_data['stok_minimum']} unit
                         """)
+
+                        with st.form("form_stok_minimum"):
+                            stok_minimum = st.number_input("Ubah Stok Minimum", min_value=0, step=1,
+                                                           value=selected_item_data['stok_minimum'])
+                            if st.form_submit_button("Simpan Stok Minimum"):
+                                ubah_stok_minimum(st.session_state.user_id, selected_item_data['id'], stok_minimum)
+                                st.success("Stok minimum berhasil diperbarui.")
+                                st.rerun()
                         
                         # Perhitungan rata-rata sederhana (persediaan awal + persediaan akhir dibagi 2)
                         st.markdown("""
@@ -449,17 +3554,13 @@ def main():
         elif selected_menu == "Buku Besar":
             st.header("Buku Besar")
             
-            conn = get_db_connection()
+            # Hitung ulang saldo berjalan yang tertinggal karena transaksi mundur tanggal
+            perbaiki_saldo_berjalan(st.session_state.user_id)
+            
+            conn = get_report_connection()
             
             # Ambil semua akun dengan jenisnya
-            akun_data = conn.execute(
-                '''
-                SELECT akun_debit as akun, jenis_debit as jenis FROM transactions WHERE user_id = ?
-                UNION
-                SELECT akun_kredit as akun, jenis_kredit as jenis FROM transactions WHERE user_id = ?
-                ''',
-                (st.session_state.user_id, st.session_state.user_id)
-            ).fetchall()
+            akun_data = conn.execute(SQL_LAPORAN["daftar_akun_jenis"], (st.session_state.user_id,)).fetchall()
             
             # Buat dictionary untuk menyimpan jenis akun
             akun_jenis = {a['akun']: a['jenis'] for a in akun_data}
@@ -469,84 +3570,89 @@ def main():
                 conn.close()
                 return
                 
-            # Tampilkan buku besar untuk semua akun
-            for akun, jenis in akun_jenis.items():
-                st.subheader(f"Akun: {akun} ({jenis})")
-                
-                # Tentukan saldo normal dengan benar
-                if jenis in ["Aktiva", "Beban"]:
-                    saldo_normal = "Debit"
-                elif jenis in  ["Utang", "Modal", "Pendapatan"]:
-                    saldo_normal = "Kredit"
-                    
-                st.caption(f"Saldo Normal: {saldo_normal}")
-                
-                # Ambil transaksi untuk akun ini
-                transactions = conn.execute(
-                    '''
-                    SELECT tanggal, bulan, tahun, 
-                        akun_debit, nominal_debit, 
-                        akun_kredit, nominal_kredit 
-                    FROM transactions 
-                    WHERE user_id = ? AND (akun_debit = ? OR akun_kredit = ?)
-                    ORDER BY tahun, bulan, tanggal
-                    ''',
-                    (st.session_state.user_id, akun, akun)
-                ).fetchall()
-                
-                if not transactions:
-                    st.write("Tidak ada transaksi untuk akun ini.")
-                    continue
+            # Tampilkan buku besar untuk akun yang dipilih
+            akun = st.selectbox("Pilih Akun", list(akun_jenis.keys()))
+            jenis = akun_jenis[akun]
+            st.subheader(f"Akun: {akun} ({jenis})")
+            
+            # Tentukan saldo normal dengan benar
+            if jenis in ["Aktiva", "Beban", "Prive"]:
+                saldo_normal = "Debit"
+            else:  # Utang, Modal, Pendapatan
+                saldo_normal = "Kredit"
+            
+            # Saldo tersimpan sebagai debit - kredit, dibalik untuk akun bersaldo normal kredit
+            tanda = 1 if saldo_normal == "Debit" else -1
                 
-                # Hitung saldo
-                saldo = 0.0
+            st.caption(f"Saldo Normal: {saldo_normal}")
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Saldo Saat Ini", format_rupiah(tanda * get_saldo_akun_per_tanggal(conn, st.session_state.user_id, akun)))
+            with col2:
+                per_tanggal = st.date_input("Saldo per tanggal", value=None)
+                if per_tanggal:
+                    saldo_per_tanggal = get_saldo_akun_per_tanggal(conn, st.session_state.user_id, akun, per_tanggal)
+                    st.write(format_rupiah(tanda * saldo_per_tanggal))
+            
+            # Halaman buku besar dimulai dari posting terbaru. Kursor halaman disimpan di session state
+            # dan diulang dari awal jika akun berubah, seperti pada riwayat transaksi.
+            if st.session_state.get('buku_besar_akun') != akun:
+                st.session_state.buku_besar_akun = akun
+                st.session_state.buku_besar_kursor = [None]
+            kursor_list = st.session_state.buku_besar_kursor
+            
+            # Ambil posting untuk akun ini, saldo berjalan sudah tersimpan di setiap posting
+            transactions, ada_sebelumnya = get_posting_akun_cache(conn, st.session_state.user_id, akun,
+                                                                  kursor=kursor_list[-1])
+            
+            if not transactions:
+                st.write("Tidak ada transaksi untuk akun ini.")
+                conn.close()
+                return
+            
+            # Header tabel
+            cols = st.columns([1, 2, 2, 2, 2])
+            with cols[0]: st.write("Tanggal")
+            with cols[1]: st.write("Keterangan")
+            with cols[2]: st.write("Debit")
+            with cols[3]: st.write("Kredit")
+            with cols[4]: st.write("Saldo")
+            
+            for t in transactions:
+                tanggal_str = f"{t.tanggal:02d}/{t.bulan:02d}/{t.tahun}"
+                jumlah = t.nominal
+                posisi = t.posisi
+                if posisi == "Saldo":
+                    keterangan = f"Saldo awal ({t.lawan})"
+                else:
+                    keterangan = f"Dari {t.lawan}" if posisi == "Debit" else f"Ke {t.lawan}"
+                saldo = tanda * t.saldo
                 
-                # Header tabel
+                # Tampilkan baris transaksi
                 cols = st.columns([1, 2, 2, 2, 2])
-                with cols[0]: st.write("Tanggal")
-                with cols[1]: st.write("Keterangan")
-                with cols[2]: st.write("Debit")
-                with cols[3]: st.write("Kredit")
-                with cols[4]: st.write("Saldo")
-                
-                for t in transactions:
-                    tanggal_str = f"{t['tanggal']:02d}/{t['bulan']:02d}/{t['tahun']}"
-                    
-                    if t['akun_debit'] == akun:
-                        # Transaksi debit ke akun ini
-                        jumlah = t['nominal_debit']
-                        posisi = "Debit"
-                        keterangan = f"Dari {t['akun_kredit']}"
-                        
-                        # Update saldo berdasarkan saldo normal
-                        if saldo_normal == "Debit":
-                            saldo += jumlah
-                        else:
-                            saldo -= jumlah
-                    else:
-                        # Transaksi kredit dari akun ini
-                        jumlah = t['nominal_kredit']
-                        posisi = "Kredit"
-                        keterangan = f"Ke {t['akun_debit']}"
-                        
-                        # Update saldo berdasarkan saldo normal
-                        if saldo_normal == "Kredit":
-                            saldo += jumlah
-                        else:
-                            saldo -= jumlah
-                    
-                    # Tampilkan baris transaksi
-                    cols = st.columns([1, 2, 2, 2, 2])
-                    with cols[0]: st.write(tanggal_str)
-                    with cols[1]: st.write(keterangan)
-                    with cols[2]: st.write(format_rupiah(jumlah) if posisi == "Debit" else "-") #tambah 3 baris
-                    with cols[3]: st.write(format_rupiah(jumlah) if posisi == "Kredit" else "-")
-                    with cols[4]: st.write(format_rupiah(saldo))
-
-
-                    # biar ada tabelnya
-                    saldo_str = f"{abs(saldo):.2f}"
-                    st.write("---")
+                with cols[0]: st.write(tanggal_str)
+                with cols[1]: st.write(keterangan)
+                with cols[2]: st.write(format_rupiah(jumlah) if posisi == "Debit" else "-") #tambah 3 baris
+                with cols[3]: st.write(format_rupiah(jumlah) if posisi == "Kredit" else "-")
+                with cols[4]: st.write(format_rupiah(saldo))
+
+                # biar ada tabelnya
+                st.write("---")
+            
+            # Navigasi halaman: mundur ke posting yang lebih lama atau kembali ke yang lebih baru
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col1:
+                if ada_sebelumnya and st.button("⬅ Lebih Lama"):
+                    t = transactions[0]
+                    kursor_list.append((t.tahun, t.bulan, t.tanggal, t.id))
+                    st.rerun()
+            with col2:
+                st.caption("Halaman terbaru" if len(kursor_list) == 1 else f"{len(kursor_list) - 1} halaman sebelum terbaru")
+            with col3:
+                if len(kursor_list) > 1 and st.button("Lebih Baru ➡"):
+                    kursor_list.pop()
+                    st.rerun()
             
             conn.close()
         
@@ -554,43 +3660,32 @@ def main():
         elif selected_menu == "Neraca Saldo":
             st.header("📊 Neraca Saldo")
             
-            conn = get_db_connection()
+            # Verifikasi integritas hanya untuk periode yang berubah sejak pemeriksaan terakhir
+            verifikasi_integritas(st.session_state.user_id)
+            periode_bermasalah = get_periode_bermasalah(st.session_state.user_id)
+            if periode_bermasalah:
+                st.error("❌ Pemeriksaan integritas menemukan masalah:")
+                for p in periode_bermasalah:
+                    st.write(f"- Periode {p['bulan']:02d}-{p['tahun']}: {p['status']}")
+            
+            conn = get_report_connection()
             
-            # Ambil semua akun unik dengan jenisnya
-            akun_data = conn.execute(
-                '''
-                SELECT akun_debit as akun, jenis_debit as jenis FROM transactions WHERE user_id = ?
-                UNION
-                SELECT akun_kredit as akun, jenis_kredit as jenis FROM transactions WHERE user_id = ?
-                ''',
-                (st.session_state.user_id, st.session_state.user_id)
-            ).fetchall()
+            # Ambil saldo semua akun (mulai dari snapshot tutup buku terakhir)
+            saldo_akun = get_saldo_laporan(conn, st.session_state.user_id)
             
-            if not akun_data:
+            if not saldo_akun:
                 st.warning("Belum ada transaksi yang dicatat.")
                 conn.close()
                 return
             
             # Hitung saldo setiap akun
+            total_akun = total_per_akun(saldo_akun)
             data = []
             total_debit = 0
             total_kredit = 0
             
-            for akun in akun_data:
-                akun_name = akun['akun']
-                jenis = akun['jenis']
-                
-                # Hitung total debit
-                debit = conn.execute(
-                    'SELECT COALESCE(SUM(nominal_debit), 0) FROM transactions WHERE user_id = ? AND akun_debit = ?',
-                    (st.session_state.user_id, akun_name)
-                ).fetchone()[0]
-                
-                # Hitung total kredit
-                kredit = conn.execute(
-                    'SELECT COALESCE(SUM(nominal_kredit), 0) FROM transactions WHERE user_id = ? AND akun_kredit = ?',
-                    (st.session_state.user_id, akun_name)
-                ).fetchone()[0]
+            for akun_name, jenis in saldo_akun:
+                debit, kredit = total_akun[akun_name]
                 
                 # Tentukan saldo normal
                 if jenis in ["Aktiva", "Beban", "Prive"]:
@@ -667,39 +3762,16 @@ def main():
         elif selected_menu == "Laporan Laba Rugi":
             st.header("📈 Laporan Laba Rugi")
             
-            conn = get_db_connection()
+            conn = get_report_connection()
             
             # 1. Hitung Total Pendapatan (semua akun jenis Pendapatan)
             st.subheader("Pendapatan")
             
-            # Pendapatan di kredit (normal) dan pendapatan di debit (pengurangan)
-            pendapatan_kredit = conn.execute(
-                '''
-                SELECT akun_kredit as nama_akun, SUM(nominal_kredit) as total 
-                FROM transactions 
-                WHERE user_id = ? AND jenis_kredit = 'Pendapatan'
-                GROUP BY akun_kredit
-                ''',
-                (st.session_state.user_id,)
-            ).fetchall()
-            
-            pendapatan_debit = conn.execute(
-                '''
-                SELECT akun_debit as nama_akun, SUM(nominal_debit) as total 
-                FROM transactions 
-                WHERE user_id = ? AND jenis_debit = 'Pendapatan'
-                GROUP BY akun_debit
-                ''',
-                (st.session_state.user_id,)
-            ).fetchall()
+            saldo_akun = get_saldo_laporan(conn, st.session_state.user_id)
             
-            # Gabungkan semua pendapatan
-            pendapatan_dict = {}
-            for item in pendapatan_kredit:
-                pendapatan_dict[item['nama_akun']] = pendapatan_dict.get(item['nama_akun'], 0) + item['total']
-            
-            for item in pendapatan_debit:
-                pendapatan_dict[item['nama_akun']] = pendapatan_dict.get(item['nama_akun'], 0) - item['total']
+            # Pendapatan di kredit (normal) dan pendapatan di debit (pengurangan),
+            # beban di debit (normal) dan beban di kredit (pengurangan)
+            pendapatan_dict, beban_dict = hitung_laba_rugi(saldo_akun)
             
             # Tampilkan detail pendapatan
             total_pendapatan = 0
@@ -714,35 +3786,6 @@ def main():
             # 2. Hitung Total Beban (semua akun jenis Beban)
             st.subheader("\nBeban")
             
-            # Beban di debit (normal) dan beban di kredit (pengurangan)
-            beban_debit = conn.execute(
-                '''
-                SELECT akun_debit as nama_akun, SUM(nominal_debit) as total 
-                FROM transactions 
-                WHERE user_id = ? AND jenis_debit = 'Beban'
-                GROUP BY akun_debit
-                ''',
-                (st.session_state.user_id,)
-            ).fetchall()
-            
-            beban_kredit = conn.execute(
-                '''
-                SELECT akun_kredit as nama_akun, SUM(nominal_kredit) as total 
-                FROM transactions 
-                WHERE user_id = ? AND jenis_kredit = 'Beban'
-                GROUP BY akun_kredit
-                ''',
-                (st.session_state.user_id,)
-            ).fetchall()
-            
-            # Gabungkan semua beban
-            beban_dict = {}
-            for item in beban_debit:
-                beban_dict[item['nama_akun']] = beban_dict.get(item['nama_akun'], 0) + item['total']
-            
-            for item in beban_kredit:
-                beban_dict[item['nama_akun']] = beban_dict.get(item['nama_akun'], 0) - item['total']
-            
             # Tampilkan detail beban
             total_beban = 0
             for akun, nominal in beban_dict.items():
@@ -777,96 +3820,25 @@ def main():
         elif selected_menu == "Laporan Perubahan Modal":
             st.header("📊 Laporan Perubahan Modal")
             
-            conn = get_db_connection()
-            
-            # 1. Hitung Modal Awal dari transaksi akun Modal
-            st.subheader("Modal Awal")
-            
-            # Modal di kredit (normal) dan modal di debit (pengurangan)
-            modal_kredit = conn.execute(
-                '''
-                SELECT COALESCE(SUM(nominal_kredit), 0) 
-                FROM transactions 
-                WHERE user_id = ? AND jenis_kredit = 'Modal' 
-                AND akun_kredit NOT LIKE '%prive%' 
-                AND akun_kredit NOT LIKE '%tambahan modal%'
-                ''',
-                (st.session_state.user_id,)
-            ).fetchone()[0]
+            conn = get_report_connection()
             
-            modal_debit = conn.execute(
-                '''
-                SELECT COALESCE(SUM(nominal_debit), 0) 
-                FROM transactions 
-                WHERE user_id = ? AND jenis_debit = 'Modal' 
-                AND akun_debit NOT LIKE '%prive%' 
-                AND akun_debit NOT LIKE '%tambahan modal%'
-                ''',
-                (st.session_state.user_id,)
-            ).fetchone()[0]
+            # Saldo akun dimulai dari snapshot tutup buku terakhir
+            saldo_akun = get_saldo_laporan(conn, st.session_state.user_id)
+            modal_awal, laba_rugi, total_prive = hitung_perubahan_modal(saldo_akun)
             
-            modal_awal = modal_kredit - modal_debit
+            # 1. Modal Awal dari transaksi akun Modal
+            st.subheader("Modal Awal")
             
             st.write(f"Total Modal Awal: {format_rupiah(modal_awal)}" if modal_awal >= 0 #tambah 2 baris
                 else f"Total Modal Awal: ({format_rupiah(abs(modal_awal))})")
             
-            # 2. Hitung Laba/Rugi Berjalan (dari Laporan Laba Rugi)
+            # 2. Laba/Rugi Berjalan (dari Laporan Laba Rugi)
             st.subheader("\nLaba/Rugi Berjalan")
             
-            # Hitung total pendapatan
-            pendapatan_kredit = conn.execute(
-                'SELECT COALESCE(SUM(nominal_kredit), 0) FROM transactions WHERE user_id = ? AND jenis_kredit = "Pendapatan"',
-                (st.session_state.user_id,)
-            ).fetchone()[0]
-            
-            pendapatan_debit = conn.execute(
-                'SELECT COALESCE(SUM(nominal_debit), 0) FROM transactions WHERE user_id = ? AND jenis_debit = "Pendapatan"',
-                (st.session_state.user_id,)
-            ).fetchone()[0]
-            total_pendapatan = pendapatan_kredit - pendapatan_debit
-            
-            # Hitung total beban
-            beban_debit = conn.execute(
-                'SELECT COALESCE(SUM(nominal_debit), 0) FROM transactions WHERE user_id = ? AND jenis_debit = "Beban"',
-                (st.session_state.user_id,)
-            ).fetchone()[0]
-            
-            beban_kredit = conn.execute(
-                'SELECT COALESCE(SUM(nominal_kredit), 0) FROM transactions WHERE user_id = ? AND jenis_kredit = "Beban"',
-                (st.session_state.user_id,)
-            ).fetchone()[0]
-            total_beban = beban_debit - beban_kredit
-            
-            laba_rugi = total_pendapatan - total_beban
-            
             st.write(f"Total Laba/Rugi: Rp{laba_rugi:,.2f}" if laba_rugi >= 0 
                     else f"Total Laba/Rugi: (Rp{abs(laba_rugi):,.2f})")
             
-            # 3. Hitung Prive (Pengambilan Pribadi)
-            prive_debit = conn.execute(
-                '''
-                SELECT COALESCE(SUM(nominal_debit), 0) 
-                FROM transactions 
-                WHERE user_id = ? AND jenis_debit = 'Prive' 
-                AND akun_debit NOT LIKE '%kas%' 
-                AND akun_debit NOT LIKE '%pengurang modal%'
-                ''',
-                (st.session_state.user_id,)
-            ).fetchone()[0]
-            
-            prive_kredit = conn.execute(
-                '''
-                SELECT COALESCE(SUM(nominal_kredit), 0) 
-                FROM transactions 
-                WHERE user_id = ? AND jenis_kredit = 'Prive' 
-                AND akun_kredit NOT LIKE '%kas%' 
-                AND akun_kredit NOT LIKE '%pengurang modal%'
-                ''',
-                (st.session_state.user_id,)
-            ).fetchone()[0]
-            
-            total_prive = prive_debit - prive_kredit
-
+            # 3. Prive (Pengambilan Pribadi)
             st.write(f"Prive: {format_rupiah(total_prive)}")
             
 
@@ -898,125 +3870,18 @@ def main():
         elif selected_menu == "Neraca":
             st.header("📄 Neraca (Posisi Keuangan)")
 
-            conn = get_db_connection()
+            conn = get_report_connection()
 
-            # Ambil semua akun dan jenis dari transaksi user
-            akun_data = conn.execute(
-                '''
-                SELECT akun_debit AS akun, jenis_debit AS jenis FROM transactions WHERE user_id = ?
-                UNION
-                SELECT akun_kredit AS akun, jenis_kredit AS jenis FROM transactions WHERE user_id = ?
-                ''',
-                (st.session_state.user_id, st.session_state.user_id)
-            ).fetchall()
-
-            if not akun_data:
+            # Ambil saldo semua akun (mulai dari snapshot tutup buku terakhir)
+            saldo_akun = get_saldo_laporan(conn, st.session_state.user_id)
+
+            if not saldo_akun:
                 st.warning("Belum ada transaksi yang dicatat.")
                 conn.close()
                 return
 
-            aktiva = {}
-            utang = {}
-
-            # Hitung saldo setiap akun dan klasifikasikan
-            for akun in akun_data:
-                nama_akun = akun['akun']
-                jenis = akun['jenis']
-
-                debit = conn.execute(
-                    'SELECT COALESCE(SUM(nominal_debit), 0) FROM transactions WHERE user_id = ? AND akun_debit = ?',
-                    (st.session_state.user_id, nama_akun)
-                ).fetchone()[0]
-
-                kredit = conn.execute(
-                    'SELECT COALESCE(SUM(nominal_kredit), 0) FROM transactions WHERE user_id = ? AND akun_kredit = ?',
-                    (st.session_state.user_id, nama_akun)
-                ).fetchone()[0]
-
-                # Tentukan saldo akhir
-                saldo = debit - kredit if jenis in ["Aktiva", "Beban"] else kredit - debit
-
-                # Masukkan ke kategori masing-masing jika saldo tidak nol
-                if abs(saldo) > 0.01:
-                    if jenis == "Aktiva":
-                        aktiva[nama_akun] = saldo
-                    elif jenis == "Utang":
-                        utang[nama_akun] = saldo
-
-            # Ambil Modal Akhir dari laporan perubahan modal
-            # Hitung ulang sama seperti sebelumnya (atau bisa simpan ke session jika sebelumnya sudah dihitung)
-            modal_kredit = conn.execute(
-                '''
-                SELECT COALESCE(SUM(nominal_kredit), 0) 
-                FROM transactions 
-                WHERE user_id = ? AND jenis_kredit = 'Modal' 
-                AND akun_kredit NOT LIKE '%prive%' 
-                AND akun_kredit NOT LIKE '%tambahan modal%'
-                ''',
-                (st.session_state.user_id,)
-            ).fetchone()[0]
-
-            modal_debit = conn.execute(
-                '''
-                SELECT COALESCE(SUM(nominal_debit), 0) 
-                FROM transactions 
-                WHERE user_id = ? AND jenis_debit = 'Modal' 
-                AND akun_debit NOT LIKE '%prive%' 
-                AND akun_debit NOT LIKE '%tambahan modal%'
-                ''',
-                (st.session_state.user_id,)
-            ).fetchone()[0]
-
-            modal_awal = modal_kredit - modal_debit
-
-            # Laba/rugi
-            total_pendapatan = conn.execute(
-                '''
-                SELECT COALESCE(SUM(nominal_kredit), 0) - COALESCE((SELECT SUM(nominal_debit) FROM transactions 
-                WHERE user_id = ? AND jenis_debit = 'Pendapatan'), 0) 
-                FROM transactions 
-                WHERE user_id = ? AND jenis_kredit = 'Pendapatan'
-                ''',
-                (st.session_state.user_id, st.session_state.user_id)
-            ).fetchone()[0]
-
-            total_beban = conn.execute(
-                '''
-                SELECT COALESCE(SUM(nominal_debit), 0) - COALESCE((SELECT SUM(nominal_kredit) FROM transactions 
-                WHERE user_id = ? AND jenis_kredit = 'Beban'), 0) 
-                FROM transactions 
-                WHERE user_id = ? AND jenis_debit = 'Beban'
-                ''',
-                (st.session_state.user_id, st.session_state.user_id)
-            ).fetchone()[0]
-
-            laba_rugi = total_pendapatan - total_beban
-
-            prive_debit = conn.execute(
-                '''
-                SELECT COALESCE(SUM(nominal_debit), 0) 
-                FROM transactions 
-                WHERE user_id = ? AND jenis_debit = 'Prive' 
-                AND akun_debit NOT LIKE '%kas%' 
-                AND akun_debit NOT LIKE '%pengurang modal%'
-                ''',
-                (st.session_state.user_id,)
-            ).fetchone()[0]
-            
-            prive_kredit = conn.execute(
-                '''
-                SELECT COALESCE(SUM(nominal_kredit), 0) 
-                FROM transactions 
-                WHERE user_id = ? AND jenis_kredit = 'Prive' 
-                AND akun_kredit NOT LIKE '%kas%' 
-                AND akun_kredit NOT LIKE '%pengurang modal%'
-                ''',
-                (st.session_state.user_id,)
-            ).fetchone()[0]
-            
-            total_prive = prive_debit - prive_kredit
-
-            modal_akhir = modal_awal + laba_rugi - total_prive
+            # Klasifikasi akun Aktiva dan Utang, modal akhir dihitung sama seperti laporan perubahan modal
+            aktiva, utang, modal_akhir = hitung_neraca(saldo_akun)
 
             # Tampilkan Neraca
             st.subheader("Aktiva")
@@ -1051,6 +3916,305 @@ def main():
 
             conn.close()
 
+        # === DASHBOARD ===
+        elif selected_menu == "Dashboard":
+            st.header("📉 Dashboard Tren Bulanan")
+
+            conn = get_report_connection()
+            tren = get_tren_bulanan(conn, st.session_state.user_id)
+            conn.close()
+
+            if not tren:
+                st.warning("Belum ada transaksi yang dicatat.")
+                return
+
+            import pandas as pd
+            df = pd.DataFrame(
+                [(f"{tahun}-{bulan:02d}", tahun, pendapatan, beban, kas) for tahun, bulan, pendapatan, beban, kas in tren],
+                columns=["Periode", "Tahun", "Pendapatan", "Beban", "Kas"]
+            )
+            df["Laba/Rugi"] = df["Pendapatan"] - df["Beban"]
+
+            # Filter rentang tahun
+            tahun_min, tahun_max = int(df["Tahun"].min()), int(df["Tahun"].max())
+            if tahun_min < tahun_max:
+                dari_tahun, sampai_tahun = st.slider("Rentang Tahun", tahun_min, tahun_max, (tahun_min, tahun_max))
+                df = df[(df["Tahun"] >= dari_tahun) & (df["Tahun"] <= sampai_tahun)]
+            df = df.set_index("Periode")
+
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Total Pendapatan", format_rupiah(df["Pendapatan"].sum()))
+            col2.metric("Total Beban", format_rupiah(df["Beban"].sum()))
+            col3.metric("Laba/Rugi", format_rupiah(df["Laba/Rugi"].sum()))
+
+            st.subheader("Pendapatan dan Beban")
+            st.bar_chart(df[["Pendapatan", "Beban"]], stack=False)
+
+            st.subheader("Laba/Rugi")
+            st.bar_chart(df[["Laba/Rugi"]])
+
+            st.subheader(f"Saldo {AKUN_KAS} Akhir Bulan")
+            st.line_chart(df[["Kas"]])
+
+        # === LAPORAN KOMPARATIF ===
+        elif selected_menu == "Laporan Komparatif":
+            st.header("🗂️ Laporan Komparatif")
+
+            conn = get_report_connection()
+            awal, akhir = conn.execute(SQL_LAPORAN["rentang_rekap"], (st.session_state.user_id,)).fetchone()
+            if awal is None:
+                st.warning("Belum ada transaksi yang dicatat.")
+                conn.close()
+                return
+
+            per = "tahun" if st.radio("Periode", ["Bulanan", "Tahunan"], horizontal=True) == "Tahunan" else "bulan"
+            daftar = get_kunci_periode((awal // 100, awal % 100), (akhir // 100, akhir % 100), per)
+            label = [label_periode(p, per) for p in daftar]
+            col1, col2 = st.columns(2)
+            dari = col1.selectbox("Dari", label, index=max(len(label) - 12, 0))
+            hingga = col2.selectbox("Sampai", label, index=len(label) - 1)
+            dari, hingga = daftar[label.index(dari)], daftar[label.index(hingga)]
+
+            if per == "tahun":
+                dari, hingga = (dari, 1), (hingga, 12)
+            else:
+                dari, hingga = (dari // 100, dari % 100), (hingga // 100, hingga % 100)
+            jumlah_periode = len(get_kunci_periode(dari, hingga, per))
+            if jumlah_periode == 0:
+                st.error("Periode awal harus sebelum periode akhir.")
+                conn.close()
+                return
+            if jumlah_periode > MAKS_PERIODE_KOMPARATIF:
+                st.error(f"Maksimal {MAKS_PERIODE_KOMPARATIF} periode dalam satu laporan komparatif.")
+                conn.close()
+                return
+
+            laporan = get_laporan_komparatif(conn, st.session_state.user_id, dari, hingga, per)
+            conn.close()
+            label = laporan["periode"]
+
+            import pandas as pd
+            if len(label) > 1:
+                st.caption(f"Selisih dan % perubahan: {label[-1]} dibanding {label[-2]}.")
+
+            # Laba rugi per periode
+            st.subheader("Laba Rugi")
+            data = [baris_komparatif(akun, nilai, label) for akun, nilai in laporan["pendapatan"].items()]
+            total_pendapatan = [sum(v) for v in zip(*laporan["pendapatan"].values())] or [0.0] * len(label)
+            data.append(baris_komparatif("Total Pendapatan", total_pendapatan, label))
+            data += [baris_komparatif(akun, nilai, label) for akun, nilai in laporan["beban"].items()]
+            total_beban = [sum(v) for v in zip(*laporan["beban"].values())] or [0.0] * len(label)
+            data.append(baris_komparatif("Total Beban", total_beban, label))
+            data.append(baris_komparatif("Laba/Rugi Bersih", laporan["laba_rugi"], label))
+            st.dataframe(pd.DataFrame(data).set_index("Akun"), use_container_width=True)
+
+            # Neraca pada akhir setiap periode
+            st.subheader("Neraca (Akhir Periode)")
+            data = [baris_komparatif(akun, nilai, label) for akun, nilai in laporan["aktiva"].items()]
+            total_aktiva = [sum(v) for v in zip(*laporan["aktiva"].values())] or [0.0] * len(label)
+            data.append(baris_komparatif("Total Aktiva", total_aktiva, label))
+            data += [baris_komparatif(akun, nilai, label) for akun, nilai in laporan["utang"].items()]
+            total_utang = [sum(v) for v in zip(*laporan["utang"].values())] or [0.0] * len(label)
+            data.append(baris_komparatif("Total Utang", total_utang, label))
+            data.append(baris_komparatif("Modal Akhir", laporan["modal_akhir"], label))
+            total_pasiva = [u + m for u, m in zip(total_utang, laporan["modal_akhir"])]
+            data.append(baris_komparatif("Total Utang + Modal", total_pasiva, label))
+            st.dataframe(pd.DataFrame(data).set_index("Akun"), use_container_width=True)
+
+            if all(abs(a - p) < 0.01 for a, p in zip(total_aktiva, total_pasiva)):
+                st.success("Neraca seimbang di setiap periode (Aktiva = Kewajiban + Modal)")
+            else:
+                st.error("Neraca tidak seimbang pada salah satu periode!")
+
+        # === ANGGARAN ===
+        elif selected_menu == "Anggaran":
+            st.header("🎯 Anggaran vs Realisasi")
+            tahun_ini = datetime.now().year
+
+            with st.expander("Atur Anggaran Bulanan"):
+                with st.form("form_anggaran", clear_on_submit=True):
+                    col1, col2 = st.columns(2)
+                    akun = col1.text_input("Nama Akun")
+                    jenis = col2.selectbox("Jenis Akun", ["Beban", "Pendapatan"])
+                    col1, col2, col3 = st.columns(3)
+                    tahun = col1.number_input("Tahun", min_value=2000, max_value=2100, value=tahun_ini, key="anggaran_tahun")
+                    bulan_dari = col2.number_input("Dari Bulan", min_value=1, max_value=12, value=1)
+                    bulan_hingga = col3.number_input("Sampai Bulan", min_value=1, max_value=12, value=12)
+                    nominal = st.number_input("Anggaran per Bulan (0 = hapus)", min_value=0.0, step=100000.0, format="%.2f")
+
+                    if st.form_submit_button("Simpan Anggaran"):
+                        try:
+                            jumlah = simpan_anggaran(st.session_state.user_id, akun, jenis, tahun,
+                                                     bulan_dari, bulan_hingga, nominal)
+                            st.success(f"Anggaran {akun.strip()} untuk {jumlah} bulan berhasil disimpan.")
+                        except ValueError as e:
+                            st.error(str(e))
+
+            col1, col2, col3, col4 = st.columns(4)
+            tahun_dari = col1.number_input("Tahun Awal", min_value=2000, max_value=2100, value=tahun_ini)
+            bulan_dari = col2.number_input("Bulan Awal", min_value=1, max_value=12, value=1)
+            tahun_hingga = col3.number_input("Tahun Akhir", min_value=2000, max_value=2100, value=tahun_ini)
+            bulan_hingga = col4.number_input("Bulan Akhir", min_value=1, max_value=12, value=12)
+            dari, hingga = (tahun_dari, bulan_dari), (tahun_hingga, bulan_hingga)
+            if dari > hingga:
+                st.error("Periode awal harus sebelum periode akhir.")
+                return
+
+            conn = get_report_connection()
+            hasil = hitung_anggaran_vs_realisasi(conn, st.session_state.user_id, dari, hingga)
+            conn.close()
+
+            if not hasil:
+                st.warning("Belum ada anggaran maupun transaksi pada periode ini.")
+                return
+
+            import pandas as pd
+            df = pd.DataFrame(
+                [(akun, jenis, anggaran, realisasi, selisih,
+                  f"{realisasi / anggaran * 100:.1f}%" if anggaran else "-", melebihi)
+                 for akun, jenis, anggaran, realisasi, selisih, melebihi in hasil],
+                columns=["Akun", "Jenis", "Anggaran", "Realisasi", "Selisih", "Realisasi/Anggaran", "Melebihi"]
+            )
+
+            col1, col2 = st.columns(2)
+            for kolom, jenis in zip((col1, col2), ("Pendapatan", "Beban")):
+                bagian = df[df["Jenis"] == jenis]
+                kolom.metric(f"Realisasi {jenis}", format_rupiah(bagian["Realisasi"].sum()),
+                             f"Anggaran {format_rupiah(bagian['Anggaran'].sum())}", delta_color="off")
+
+            jumlah_melebihi = int(df["Melebihi"].sum())
+            if jumlah_melebihi:
+                st.error(f"⚠️ {jumlah_melebihi} akun melampaui anggaran (beban di atas atau pendapatan di bawah anggaran).")
+            else:
+                st.success("Semua akun beranggaran masih sesuai anggaran.")
+
+            # Baris yang melampaui anggaran diberi latar merah
+            tabel = df.drop(columns=["Melebihi"]).style.apply(
+                lambda baris: ["background-color: #f8d7da" if df.loc[baris.name, "Melebihi"] else ""] * len(baris),
+                axis=1
+            ).format({kolom: format_rupiah for kolom in ("Anggaran", "Realisasi", "Selisih")})
+            st.dataframe(tabel, hide_index=True, use_container_width=True)
+            st.caption("Selisih positif = menguntungkan (beban di bawah anggaran, pendapatan di atas anggaran).")
+
+        # === TUTUP BUKU ===
+        elif selected_menu == "Tutup Buku":
+            st.header("🔒 Tutup Buku")
+            st.write("Akun Pendapatan, Beban dan Prive ditutup ke akun Modal, lalu saldo semua akun disimpan "
+                     "sebagai saldo awal periode berikutnya. Periode yang sudah ditutup tidak bisa diisi transaksi lagi.")
+
+            with st.form("form_tutup_buku"):
+                jenis_penutupan = st.radio("Jenis Penutupan", ["Bulanan", "Tahunan"], horizontal=True)
+                col1, col2 = st.columns(2)
+                tahun = col1.number_input("Tahun", min_value=2000, max_value=2100, value=datetime.now().year)
+                bulan = col2.number_input("Bulan (untuk penutupan bulanan)", min_value=1, max_value=12, value=datetime.now().month)
+
+                if st.form_submit_button("Tutup Periode"):
+                    bulan_tutup = 12 if jenis_penutupan == "Tahunan" else bulan
+                    success, message = tutup_periode(st.session_state.user_id, int(tahun), int(bulan_tutup))
+                    if success:
+                        st.success(message)
+                    else:
+                        st.error(message)
+
+            st.subheader("Periode yang Sudah Ditutup")
+            daftar_periode = get_daftar_tutup_buku(st.session_state.user_id)
+            if not daftar_periode:
+                st.info("Belum ada periode yang ditutup.")
+            else:
+                for p in daftar_periode:
+                    st.write(f"- {p['bulan']:02d}-{p['tahun']} (ditutup {p['created_at']})")
+
+            st.divider()
+            st.subheader("🗄 Arsip Tahun Buku")
+            st.write("Transaksi tahun yang sudah ditutup (tutup buku tahunan) dipindah ke file arsip terpisah. "
+                     "Laporan tetap memakai snapshot saldo, dan riwayat tahun arsip tetap bisa dicari "
+                     "lewat filter tanggal di Riwayat Transaksi.")
+
+            daftar_arsip = get_daftar_arsip(st.session_state.user_id)
+            tahun_arsip = {a['tahun'] for a in daftar_arsip}
+            tahun_siap = [p['tahun'] for p in daftar_periode if p['bulan'] == 12 and p['tahun'] not in tahun_arsip]
+            if tahun_siap:
+                with st.form("form_arsip_tahun"):
+                    tahun_dipilih = st.selectbox("Tahun yang akan diarsipkan", tahun_siap)
+                    if st.form_submit_button("Arsipkan"):
+                        success, message = arsipkan_tahun(st.session_state.user_id, tahun_dipilih)
+                        if success:
+                            st.success(message)
+                        else:
+                            st.error(message)
+            else:
+                st.info("Belum ada tahun buku tertutup yang bisa diarsipkan.")
+
+            for a in daftar_arsip:
+                st.write(f"- {a['tahun']}: {a['jumlah_transaksi']} transaksi di {os.path.basename(a['path'])} "
+                         f"(diarsipkan {a['created_at']})")
+
+        # === PEMELIHARAAN ===
+        elif selected_menu == "Pemeliharaan":
+            st.header("🛠 Pemeliharaan Database")
+            st.info("Checkpoint WAL, incremental vacuum dan PRAGMA optimize berjalan otomatis di latar belakang "
+                    f"setiap {INTERVAL_PEMELIHARAAN // 60} menit. Vacuum dijalankan jika halaman kosong "
+                    f"mencapai {AMBANG_FREELIST} halaman atau sekali sehari.")
+
+            with get_db_connection() as conn:
+                status = get_status_database(conn)
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Ukuran Database", f"{status['jumlah_halaman'] * status['ukuran_halaman'] / 1024 / 1024:.2f} MB")
+            col2.metric("Ruang Kosong", f"{status['halaman_kosong'] * status['ukuran_halaman'] / 1024 / 1024:.2f} MB")
+            col3.metric("Ukuran WAL", f"{status['ukuran_wal'] / 1024 / 1024:.2f} MB")
+
+            if st.button("Jalankan Pemeliharaan Sekarang"):
+                # Hanya membangunkan thread latar, halaman tidak menunggu pemeliharaan selesai
+                picu_pemeliharaan.set()
+                st.success("Pemeliharaan dijadwalkan, muat ulang halaman untuk melihat hasilnya.")
+
+            # Database lama belum memakai incremental vacuum: konversi dijalankan admin saat aplikasi sepi
+            if status["auto_vacuum"] != 2:
+                st.warning("Database ini belum memakai incremental vacuum, ruang kosong tidak dibebaskan otomatis. "
+                           "Konversi membangun ulang seluruh database dan menahan penulisan sampai selesai, "
+                           "jalankan saat tidak ada pengguna lain.")
+                if st.button("Konversi ke Incremental Vacuum"):
+                    success, message = konversi_incremental_vacuum()
+                    if success:
+                        st.success(message)
+                        st.rerun()
+                    else:
+                        st.error(message)
+
+            log = get_log_pemeliharaan()
+            if not log:
+                st.info("Belum ada catatan pemeliharaan.")
+            else:
+                import pandas as pd
+                df = pd.DataFrame(
+                    [(l['created_at'], l['tugas'], f"{l['durasi_ms']:.1f}",
+                      f"{l['bytes_dibebaskan'] / 1024:.1f}", l['keterangan']) for l in log],
+                    columns=["Waktu", "Tugas", "Durasi (ms)", "Dibebaskan (KB)", "Keterangan"]
+                )
+                st.dataframe(df, hide_index=True, use_container_width=True)
+
+            # Cache laporan bersama: dipakai semua proses Streamlit di host ini
+            st.subheader("Cache Laporan Bersama")
+            cache = get_cache_bersama()
+            jumlah_entri, ukuran_cache, statistik = cache.statistik()
+            total_hit = sum(r[1] for r in statistik)
+            total_akses = total_hit + sum(r[2] for r in statistik)
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Entri", jumlah_entri)
+            col2.metric("Ukuran Cache", f"{ukuran_cache / 1024 / 1024:.2f} MB")
+            col3.metric("Hit Rate", f"{total_hit / total_akses * 100:.1f}%" if total_akses else "-")
+            if statistik:
+                import pandas as pd
+                df = pd.DataFrame(
+                    [(nama, hit, miss, f"{hit / (hit + miss) * 100:.1f}%") for nama, hit, miss in statistik],
+                    columns=["Laporan", "Hit", "Miss", "Hit Rate"]
+                )
+                st.dataframe(df, hide_index=True, use_container_width=True)
+            if st.button("Kosongkan Cache"):
+                cache.kosongkan()
+                st.success("Cache laporan bersama dikosongkan.")
+                st.rerun()
+
         # === INFORMASI ===
         elif selected_menu == "Informasi":
             st.header("ℹ Informasi Aplikasi")
@@ -1061,7 +4225,7 @@ def main():
                 col1, col2 = st.columns([1, 3])
                 with col1:
                     try:
-                        st.image("logo_aplikasi.jpg", width=150, caption="Purple Book")
+                        st.image(muat_gambar("logo_aplikasi.jpg"), width=LEBAR_GAMBAR, caption="Purple Book")
                     except FileNotFoundError:
                         st.error("File 'logo_aplikasi.jpg' tidak ditemukan. Pastikan file ada di folder yang sama dengan script ini.")
                 with col2:
@@ -1104,7 +4268,7 @@ def main():
             for i, member in enumerate(team_data):
                 with cols[i]:
                     try:
-                        st.image(member["foto"], width=150,)
+                        st.image(muat_gambar(member["foto"]), width=LEBAR_GAMBAR)
                     except FileNotFoundError:
                         st.error(f"File '{member['foto']}' tidak ditemukan")
                     st.write(f"{member['nama']}")
@@ -1129,5 +4293,25 @@ def main():
             st.caption("© 2025 Purple Book - Versi 1.0")
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "audit":
+        if len(sys.argv) > 2:
+            DB_PATH = sys.argv[2]
+        sys.exit(audit_database())
+    if len(sys.argv) > 1 and sys.argv[1] == "konversi-vacuum":
+        if len(sys.argv) > 2:
+            DB_PATH = sys.argv[2]
+        success, message = konversi_incremental_vacuum()
+        print(message)
+        sys.exit(0 if success else 1)
+    if len(sys.argv) > 1 and sys.argv[1] == "cek-query":
+        # Tanpa path, pemeriksaan memakai database sementara berisi data contoh
+        if len(sys.argv) > 2:
+            DB_PATH = sys.argv[2]
+        else:
+            import tempfile
+            DB_PATH = os.path.join(tempfile.mkdtemp(), "cek_query.db")
+        sys.exit(cek_query_database(isi_contoh=len(sys.argv) <= 2))
+    if len(sys.argv) > 1 and sys.argv[1] == "api":
+        sys.exit(jalankan_api(int(sys.argv[2]) if len(sys.argv) > 2 else PORT_API))
     init_db()
     main()
@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+# Database sementara per tes dengan satu pengguna; mengembalikan user_id
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "DB_PATH", str(tmp_path / "akuntansi.db"))
+    # Prahitung latar dimatikan agar thread pekerja tidak ikut menulis ke database tes
+    monkeypatch.setattr(main, "jadwalkan_prahitung", lambda user_id: True)
+    main.init_db()
+    main.register_user("uji", "rahasia")
+    _, user_id, _ = main.login_user("uji", "rahasia")
+    return user_id
@@ -0,0 +1,129 @@
+import asyncio
+import base64
+import json
+
+import pytest
+
+import main
+
+AUTH = b"Basic " + base64.b64encode(b"uji:rahasia")
+
+
+def baris_jurnal(nominal=1000, jenis_kredit="Pendapatan", akun_debit="Kas"):
+    return [
+        {"akun": akun_debit, "jenis": "Aktiva", "posisi": "Debit", "nominal": nominal},
+        {"akun": "Pendapatan Panen", "jenis": jenis_kredit, "posisi": "Kredit", "nominal": nominal},
+    ]
+
+
+@pytest.fixture
+def panggil(db):
+    app = main.buat_aplikasi_api()
+
+    # Menjalankan satu permintaan HTTP langsung ke aplikasi ASGI; mengembalikan (status, JSON)
+    def jalankan(metode, path, body=None, auth=AUTH, query=b""):
+        masuk = [{"type": "http.request", "body": json.dumps(body).encode() if body is not None else b""}]
+        keluar = []
+
+        async def receive():
+            return masuk.pop(0)
+
+        async def send(pesan):
+            keluar.append(pesan)
+
+        scope = {"type": "http", "method": metode, "path": path, "query_string": query,
+                 "headers": [(b"authorization", auth)] if auth else []}
+        asyncio.run(app(scope, receive, send))
+        isi = b"".join(p.get("body", b"") for p in keluar if p["type"] == "http.response.body")
+        return keluar[0]["status"], json.loads(isi)
+
+    yield jalankan
+    app.pool.tutup()
+
+
+def jumlah_jurnal():
+    with main.get_db_connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM journal_entries").fetchone()[0]
+
+
+def test_tanpa_autentikasi_ditolak(panggil):
+    assert panggil("GET", "/api/neraca-saldo", auth=None)[0] == 401
+    assert panggil("GET", "/api/neraca-saldo", auth=b"Basic " + base64.b64encode(b"uji:salah"))[0] == 401
+
+
+@pytest.mark.parametrize("baris, pesan", [
+    (baris_jurnal(jenis_kredit="Whatever"), "Jenis akun"),
+    (baris_jurnal(akun_debit=None), "Nama akun"),
+    (baris_jurnal(akun_debit=123), "Nama akun"),
+    (baris_jurnal(nominal="1.000"), "'nominal' harus berupa angka"),
+])
+def test_baris_tidak_valid_ditolak(panggil, baris, pesan):
+    status, hasil = panggil("POST", "/api/jurnal", {"tanggal": "2024-03-01", "baris": baris})
+    assert status == 400
+    assert pesan in hasil["galat"]
+    assert jumlah_jurnal() == 0
+
+
+def test_batch_dengan_satu_jurnal_salah_dibatalkan(panggil):
+    jurnal = [{"tanggal": "2024-03-01", "baris": baris_jurnal()} for _ in range(3)]
+    jurnal.append({"tanggal": "2024-03-02", "baris": baris_jurnal()[:1]})
+    status, hasil = panggil("POST", "/api/jurnal/batch", {"jurnal": jurnal})
+    assert status == 400
+    assert hasil["galat"].startswith("Jurnal ke-4:")
+    assert jumlah_jurnal() == 0
+
+
+def test_mutasi_tidak_valid_tanpa_teks_exception(panggil, db):
+    main.insert_inventory(db, "Pupuk ZA", 10, 5000)
+    status, hasil = panggil("POST", "/api/persediaan/mutasi", {"mutasi": [{"nama": "Pupuk ZA", "jumlah": "lima"}]})
+    assert (status, hasil["galat"]) == (400, "Mutasi ke-1: 'jumlah' harus berupa bilangan bulat.")
+    status, hasil = panggil("POST", "/api/persediaan/mutasi",
+                            {"mutasi": [{"nama": "Pupuk ZA", "jumlah": 2, "harga_satuan": "mahal"}]})
+    assert (status, hasil["galat"]) == (400, "Mutasi ke-1: 'harga_satuan' harus berupa angka.")
+
+
+def test_jurnal_berhasil_disimpan(panggil):
+    status, hasil = panggil("POST", "/api/jurnal", {"tanggal": "2024-03-01", "keterangan": "jual",
+                                                   "baris": baris_jurnal(150000)})
+    assert status == 201
+    assert isinstance(hasil["entry_id"], int)
+    status, neraca = panggil("GET", "/api/neraca-saldo")
+    assert status == 200
+    assert neraca["seimbang"]
+    assert neraca["total_debit"] == 150000
+
+
+def test_mutasi_mencari_barang_per_nama(panggil, db):
+    main.insert_inventory(db, "Pupuk ZA", 10, 5000)
+    main.insert_inventory(db, "Benih", 4, 2000)
+    mutasi = [{"nama": "Pupuk ZA", "jumlah": -3}, {"nama": "Pupuk ZA", "jumlah": -7}, {"nama": "Benih", "jumlah": 1}]
+    status, hasil = panggil("POST", "/api/persediaan/mutasi", {"mutasi": mutasi})
+    assert status == 201
+    assert len(hasil["transaksi_id"]) == 3
+    assert {b["nama"]: b["jumlah"] for b in main.get_inventory(db)} == {"Pupuk ZA": 0, "Benih": 5}
+
+    # Stok di memori ikut berkurang, sehingga mutasi kedua melebihi stok yang tersisa
+    mutasi = [{"nama": "Benih", "jumlah": -3}, {"nama": "Benih", "jumlah": -3}]
+    status, hasil = panggil("POST", "/api/persediaan/mutasi", {"mutasi": mutasi})
+    assert status == 400
+    assert hasil["galat"].startswith("Mutasi ke-2:")
+
+    status, hasil = panggil("POST", "/api/persediaan/mutasi", {"mutasi": [{"nama": "Urea", "jumlah": 1}]})
+    assert (status, hasil["galat"]) == (400, "Mutasi ke-1: Barang 'Urea' tidak ditemukan di persediaan.")
+
+
+def test_mutasi_nama_barang_ganda_ditolak(panggil, db):
+    main.insert_inventory(db, "Pupuk ZA", 10, 5000)
+    main.insert_inventory(db, "Pupuk ZA", 5, 5500)
+    status, hasil = panggil("POST", "/api/persediaan/mutasi", {"mutasi": [{"nama": "Pupuk ZA", "jumlah": -1}]})
+    assert status == 400
+    assert "tidak unik" in hasil["galat"]
+    assert sorted(b["jumlah"] for b in main.get_inventory(db)) == [5, 10]
+
+
+def test_buku_besar_memperbaiki_saldo_berjalan(panggil, db):
+    for tanggal, nominal in ((10, 100.0), (20, 100.0), (5, 7.0)):
+        main.insert_transaction(db, tanggal, 1, 2024, "Kas", "Aktiva", nominal, "Pendapatan", "Pendapatan", nominal)
+    status, posting = panggil("GET", "/api/buku-besar", query=b"akun=Kas")
+    assert status == 200
+    assert [(p["tanggal"], p["saldo"]) for p in posting] == [(5, 7.0), (10, 107.0), (20, 207.0)]
@@ -0,0 +1,23 @@
+import main
+
+
+def test_halaman_buku_besar_dengan_kursor(db):
+    for i in range(120):
+        main.insert_transaction(db, i % 28 + 1, i // 28 + 1, 2024, "Kas", "Aktiva", 10.0, "Pendapatan", "Pendapatan", 10.0)
+    with main.get_db_connection() as conn:
+        semua = [(p.id, p.saldo) for p in main.iter_baris(conn, main.SQL_LAPORAN["posting_akun"], (db, "Kas"), kelas=main.Posting)]
+
+        halaman = []
+        kursor = None
+        while True:
+            posting, ada_sebelumnya = main.get_posting_akun(conn, db, "Kas", kursor)
+            halaman.insert(0, posting)
+            if not ada_sebelumnya:
+                break
+            t = posting[0]
+            kursor = (t.tahun, t.bulan, t.tanggal, t.id)
+
+    assert [len(h) for h in halaman] == [20, 50, 50]
+    assert [(p.id, p.saldo) for h in halaman for p in h] == semua
+    # Halaman terbaru berakhir di saldo akhir akun
+    assert halaman[-1][-1].saldo == 1200.0
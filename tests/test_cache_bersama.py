@@ -0,0 +1,113 @@
+import sqlite3
+
+import pytest
+
+import main
+
+
+class Jam:
+    def __init__(self):
+        self.sekarang = 1000.0
+
+    def __call__(self):
+        return self.sekarang
+
+
+@pytest.fixture
+def jam(monkeypatch):
+    jam = Jam()
+    monkeypatch.setattr(main.time, "time", jam)
+    return jam
+
+
+def buat_cache(tmp_path, **opsi):
+    return main.CacheBersama(str(tmp_path / "cache.db"), **opsi)
+
+
+def baca_statistik(cache):
+    conn = sqlite3.connect(cache.path)
+    try:
+        return conn.execute("SELECT nama, hit, miss FROM statistik_cache ORDER BY nama").fetchall()
+    finally:
+        conn.close()
+
+
+def test_entri_hanya_dipakai_untuk_versi_yang_sama(tmp_path, jam):
+    cache = buat_cache(tmp_path)
+    cache.simpan(1, "saldo", 3, {"nilai": 3})
+    assert cache.ambil(1, "saldo", 3) == {"nilai": 3}
+    assert cache.ambil(1, "saldo", 4) is None
+    assert cache.ambil(2, "saldo", 3) is None
+    # Versi lama tidak menimpa versi yang lebih baru
+    cache.simpan(1, "saldo", 2, {"nilai": 2})
+    assert cache.ambil(1, "saldo", 3) == {"nilai": 3}
+    cache.simpan(1, "saldo", 4, {"nilai": 4})
+    assert cache.ambil(1, "saldo", 3) is None
+    assert cache.ambil(1, "saldo", 4) == {"nilai": 4}
+
+
+def test_entri_kedaluwarsa_setelah_ttl(tmp_path, jam):
+    cache = buat_cache(tmp_path, ttl=60)
+    cache.simpan(1, "saldo", 1, [1])
+    jam.sekarang += 59
+    assert cache.ambil(1, "saldo", 1) == [1]
+    jam.sekarang += 1
+    assert cache.ambil(1, "saldo", 1) is None
+
+
+def test_entri_paling_lama_tidak_dipakai_dibuang(tmp_path, jam):
+    cache = buat_cache(tmp_path, maks_entri=2, interval_dipakai=10)
+    cache.simpan(1, "a", 1, "a")
+    jam.sekarang += 1
+    cache.simpan(1, "b", 1, "b")
+    # Dipakai sebelum interval_dipakai lewat: waktu pakai "a" belum diperbarui, jadi "a" yang dibuang
+    jam.sekarang += 1
+    assert cache.ambil(1, "a", 1) == "a"
+    jam.sekarang += 1
+    cache.simpan(1, "c", 1, "c")
+    assert cache.ambil(1, "a", 1) is None
+    assert cache.ambil(1, "b", 1) == "b"
+
+    # Setelah interval lewat, pembacaan memperbarui waktu pakai sehingga "b" bertahan
+    jam.sekarang += 10
+    assert cache.ambil(1, "b", 1) == "b"
+    jam.sekarang += 1
+    cache.simpan(1, "d", 1, "d")
+    assert cache.ambil(1, "b", 1) == "b"
+    assert cache.ambil(1, "c", 1) is None
+
+
+def test_hit_rate_dikumpulkan_di_memori(tmp_path, jam):
+    cache = buat_cache(tmp_path, interval_statistik=30)
+    cache.simpan(1, "buku_besar:Kas:None:50", 1, [])
+    for _ in range(3):
+        cache.ambil(1, "buku_besar:Kas:None:50", 1)
+    cache.ambil(1, "buku_besar:Bank:None:50", 1)
+    cache.ambil(1, "saldo", 1)
+    # Belum ada yang ditulis ke file cache sebelum interval lewat
+    assert baca_statistik(cache) == []
+
+    jam.sekarang += 30
+    cache.ambil(1, "saldo", 1)
+    assert baca_statistik(cache) == [("buku_besar", 3, 1), ("saldo", 0, 2)]
+
+    # statistik() ikut menulis hit/miss yang masih tertahan di memori
+    cache.ambil(1, "buku_besar:Kas:None:50", 1)
+    assert cache.statistik()[2] == [("buku_besar", 4, 1), ("saldo", 0, 2)]
+
+
+def test_perbaikan_saldo_berjalan_membatalkan_cache_buku_besar(db, tmp_path, monkeypatch):
+    cache = buat_cache(tmp_path)
+    monkeypatch.setattr(main, "get_cache_bersama", lambda: cache)
+    for tanggal, nominal in ((10, 100.0), (20, 100.0), (5, 7.0)):
+        main.insert_transaction(db, tanggal, 1, 2024, "Kas", "Aktiva", nominal, "Pendapatan", "Pendapatan", nominal)
+
+    # Halaman yang di-cache sebelum perbaikan memuat saldo berjalan lama
+    with main.get_db_connection() as conn:
+        posting, _ = main.get_posting_akun_cache(conn, db, "Kas")
+    assert [p.saldo for p in posting] != [7.0, 107.0, 207.0]
+
+    assert main.perbaiki_saldo_berjalan(db) > 0
+    with main.get_db_connection() as conn:
+        posting, _ = main.get_posting_akun_cache(conn, db, "Kas")
+    assert [p.saldo for p in posting] == [7.0, 107.0, 207.0]
@@ -0,0 +1,52 @@
+import main
+
+
+BARIS = [("Kas", "Aktiva", "Debit", 600.0), ("Bank", "Aktiva", "Debit", 400.0),
+         ("Modal Pemilik", "Modal", "Kredit", 1000.0)]
+
+
+def checksum(user_id):
+    with main.get_db_connection() as conn:
+        return conn.execute(
+            "SELECT total_debit, total_kredit, jumlah_baris FROM checksum_periode WHERE user_id = ? AND tahun = 2024 AND bulan = 1",
+            (user_id,),
+        ).fetchone()
+
+
+def test_jurnal_majemuk_masuk_checksum_periode(db):
+    main.insert_transaction(db, 1, 1, 2024, "Kas", "Aktiva", 200.0, "Modal Pemilik", "Modal", 200.0)
+    main.insert_jurnal(db, 2, 1, 2024, "Setoran modal", BARIS)
+    assert tuple(checksum(db)) == (1200.0, 1200.0, 4)
+    assert main.verifikasi_integritas(semua=True) == []
+
+
+def test_baris_jurnal_diubah_di_luar_aplikasi_terdeteksi(db):
+    entry_id = main.insert_jurnal(db, 2, 1, 2024, "Setoran modal", BARIS)
+    with main.get_db_connection() as conn:
+        conn.execute("UPDATE journal_lines SET akun = 'Piutang' WHERE entry_id = ? AND akun = 'Bank'", (entry_id,))
+    masalah = main.verifikasi_integritas(semua=True)
+    assert len(masalah) == 1
+    assert "hash isi tidak cocok" in masalah[0][3]
+
+    with main.get_db_connection() as conn:
+        conn.execute("UPDATE journal_lines SET nominal = 500.0 WHERE entry_id = ? AND akun = 'Piutang'", (entry_id,))
+    keterangan = main.verifikasi_integritas(semua=True)[0][3]
+    assert "1 transaksi/jurnal dengan nominal debit ≠ kredit" in keterangan
+    assert main.audit_database() == 1
+
+
+def test_batalkan_jurnal_menjaga_checksum(db):
+    main.insert_transaction(db, 1, 1, 2024, "Kas", "Aktiva", 200.0, "Modal Pemilik", "Modal", 200.0)
+    entry_id = main.insert_jurnal(db, 2, 1, 2024, "Setoran modal", BARIS)
+    assert main.batalkan_jurnal(db, entry_id)[0]
+    assert tuple(checksum(db)) == (200.0, 200.0, 1)
+    assert main.verifikasi_integritas(semua=True) == []
+    assert main.audit_database() == 0
+
+
+def test_hitung_ulang_checksum_mencakup_jurnal(db):
+    main.insert_jurnal(db, 2, 1, 2024, "Setoran modal", BARIS)
+    with main.get_db_connection() as conn:
+        main.hitung_ulang_checksum(conn)
+    assert tuple(checksum(db)) == (1000.0, 1000.0, 3)
+    assert main.verifikasi_integritas(semua=True) == []
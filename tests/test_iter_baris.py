@@ -0,0 +1,19 @@
+import main
+
+
+def test_iter_transaksi_menghasilkan_objek_slot(db):
+    main.insert_transaction(db, 1, 1, 2024, "Kas", "Aktiva", 5000, "Modal Pemilik", "Modal", 5000)
+    main.insert_transaction(db, 2, 1, 2024, "Beban Listrik", "Beban", 1500, "Kas", "Aktiva", 1500)
+    with main.get_db_connection() as conn:
+        hasil = list(main.iter_transaksi(conn, db))
+    assert [t.akun_debit for t in hasil] == ["Beban Listrik", "Kas"]
+    assert all(isinstance(t, main.Transaksi) and not hasattr(t, "__dict__") for t in hasil)
+
+
+def test_iter_baris_membaca_per_batch(db):
+    for i in range(5):
+        main.insert_transaction(db, i + 1, 1, 2024, "Kas", "Aktiva", 100, "Modal Pemilik", "Modal", 100)
+    with main.get_db_connection() as conn:
+        hasil = list(main.iter_baris(conn, main.SQL_LAPORAN["transaksi_pengguna"], (db,), kelas=main.Transaksi, ukuran=2))
+    assert len(hasil) == 5
+    assert sum(t.nominal_debit for t in hasil) == 500
@@ -0,0 +1,49 @@
+import pytest
+
+import main
+
+
+def ubah(user_id, transaksi_id, **ubahan):
+    data = dict(tanggal=2, bulan=1, tahun=2024, akun_debit="Kas", jenis_debit="Aktiva", nominal_debit=500.0,
+                akun_kredit="Modal Pemilik", jenis_kredit="Modal", nominal_kredit=500.0)
+    data.update(ubahan)
+    return main.ubah_transaksi(user_id, transaksi_id, **data)
+
+
+@pytest.mark.parametrize("ubahan, pesan", [
+    ({"nominal_kredit": 400.0}, "tidak seimbang"),
+    ({"jenis_debit": "Harta"}, "Jenis akun"),
+    ({"akun_kredit": " "}, "Nama akun"),
+    ({"nominal_debit": 0.0, "nominal_kredit": 0.0}, "lebih dari 0"),
+])
+def test_perubahan_tidak_valid_ditolak(db, ubahan, pesan):
+    transaksi_id = main.insert_transaction(db, 1, 1, 2024, "Kas", "Aktiva", 1000.0, "Modal Pemilik", "Modal", 1000.0)
+    sukses, hasil = ubah(db, transaksi_id, **ubahan)
+    assert not sukses
+    assert pesan in hasil
+    with main.get_db_connection() as conn:
+        assert conn.execute("SELECT nominal_debit FROM transactions WHERE id = ?", (transaksi_id,)).fetchone()[0] == 1000.0
+
+
+def test_transaksi_mutasi_stok_tidak_dapat_diubah(db):
+    main.insert_inventory(db, "Pupuk ZA", 10, 5000)
+    item = main.get_inventory(db)[0]
+    main.catat_mutasi_persediaan(db, item, -2)
+    with main.get_db_connection() as conn:
+        transaksi_id = conn.execute("SELECT transaksi_id FROM mutasi_persediaan").fetchone()[0]
+    sukses, pesan = ubah(db, transaksi_id, akun_debit="Beban Persediaan", jenis_debit="Beban",
+                         akun_kredit="Persediaan Barang", jenis_kredit="Aktiva")
+    assert not sukses
+    assert "mutasi stok" in pesan
+    # Membatalkan tetap bisa dan mengembalikan stok
+    assert main.batalkan_transaksi(db, transaksi_id)[0]
+    assert main.get_inventory(db)[0]["jumlah"] == 10
+
+
+def test_perubahan_valid_tersimpan(db):
+    transaksi_id = main.insert_transaction(db, 1, 1, 2024, "Kas", "Aktiva", 1000.0, "Modal Pemilik", "Modal", 1000.0)
+    sukses, _ = ubah(db, transaksi_id, alasan="salah ketik")
+    assert sukses
+    with main.get_db_connection() as conn:
+        assert conn.execute("SELECT nominal_debit FROM transactions WHERE id = ?", (transaksi_id,)).fetchone()[0] == 500.0
+        assert conn.execute("SELECT aksi FROM riwayat_perubahan WHERE transaksi_id = ?", (transaksi_id,)).fetchone()[0] == "ubah"
@@ -0,0 +1,55 @@
+import main
+
+
+def buat_halaman_kosong():
+    with main.get_db_connection() as conn:
+        conn.execute("CREATE TABLE sampah (isi TEXT)")
+        conn.executemany("INSERT INTO sampah VALUES (?)", [("x" * 1000,) for _ in range(500)])
+        conn.execute("DROP TABLE sampah")
+
+
+def test_database_baru_memakai_incremental_vacuum(db):
+    with main.get_db_connection() as conn:
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_pemeliharaan_memakai_incremental_vacuum(db):
+    buat_halaman_kosong()
+    main.jalankan_pemeliharaan(paksa_vacuum=True)
+    with main.get_db_connection() as conn:
+        tugas = [row[0] for row in conn.execute("SELECT tugas FROM log_pemeliharaan")]
+    assert "incremental_vacuum" in tugas
+    assert "vacuum" not in tugas
+
+
+def test_database_lama_tidak_divacuum_penjadwal(db):
+    # Database lama: auto_vacuum NONE
+    conn = main.sqlite3.connect(main.DB_PATH, isolation_level=None)
+    conn.execute("PRAGMA auto_vacuum=NONE")
+    conn.execute("VACUUM")
+    conn.close()
+    buat_halaman_kosong()
+
+    main.jalankan_pemeliharaan(paksa_vacuum=True)
+    with main.get_db_connection() as conn:
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+        assert conn.execute("PRAGMA freelist_count").fetchone()[0] > 0
+        assert conn.execute("SELECT COUNT(*) FROM log_pemeliharaan WHERE tugas = 'vacuum'").fetchone()[0] == 0
+
+    sukses, _ = main.konversi_incremental_vacuum()
+    assert sukses
+    with main.get_db_connection() as conn:
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+    assert not main.konversi_incremental_vacuum()[0]
+
+
+def test_log_pemeliharaan_dipangkas(db, monkeypatch):
+    monkeypatch.setattr(main, "MAKS_LOG_PEMELIHARAAN", 5)
+    for _ in range(4):
+        main.jalankan_pemeliharaan()
+    with main.get_db_connection() as conn:
+        tugas = [row[0] for row in conn.execute("SELECT tugas FROM log_pemeliharaan ORDER BY id")]
+    assert len(tugas) == 5
+    assert tugas[-1] == "optimize"
@@ -0,0 +1,11 @@
+import main
+
+
+def test_cari_persediaan_berdasarkan_awal_nama(db):
+    for nama in ["Pupuk ZA", "Pupuk Urea", "Benih Padi", "Pestisida"]:
+        main.insert_inventory(db, nama, 10, 5000)
+    with main.get_db_connection() as conn:
+        assert [b["nama"] for b in main.cari_persediaan(conn, db, "Pupuk")] == ["Pupuk Urea", "Pupuk ZA"]
+        assert [b["nama"] for b in main.cari_persediaan(conn, db, "P")] == ["Pestisida", "Pupuk Urea", "Pupuk ZA"]
+        assert len(main.cari_persediaan(conn, db, "", limit=2)) == 2
+        assert main.cari_persediaan(conn, db, "Traktor") == []
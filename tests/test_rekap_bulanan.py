@@ -0,0 +1,35 @@
+import main
+
+
+def rekap(user_id, tahun):
+    with main.get_db_connection() as conn:
+        return {(r["bulan"], r["akun"]): (r["debit"], r["kredit"]) for r in conn.execute(
+            "SELECT bulan, akun, debit, kredit FROM rekap_bulanan WHERE user_id = ? AND tahun = ?", (user_id, tahun))}
+
+
+def isi(user_id, bulan):
+    main.insert_transaction(user_id, 5, bulan, 2024, "Kas", "Aktiva", 100.0, "Pendapatan Panen", "Pendapatan", 100.0)
+    main.insert_transaction(user_id, 6, bulan, 2024, "Beban Pupuk", "Beban", 40.0, "Kas", "Aktiva", 40.0)
+
+
+def test_jurnal_penutup_tidak_mengubah_rekap(db):
+    isi(db, 1)
+    sebelum = rekap(db, 2024)
+    main.tutup_periode(db, 2024, 1)
+    assert rekap(db, 2024) == sebelum
+    with main.get_db_connection() as conn:
+        conn.execute("DELETE FROM transactions WHERE user_id = ? AND sumber = 'penutup'", (db,))
+    assert rekap(db, 2024) == sebelum
+    assert sebelum[(1, "Pendapatan Panen")] == (0.0, 100.0)
+
+
+def test_rekap_tahun_arsip_tetap_tersimpan(db):
+    isi(db, 1)
+    isi(db, 12)
+    main.tutup_periode(db, 2024, 12)
+    sebelum = rekap(db, 2024)
+    sukses, pesan = main.arsipkan_tahun(db, 2024)
+    assert sukses, pesan
+    assert rekap(db, 2024) == sebelum
+    with main.get_db_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM transactions WHERE user_id = ?", (db,)).fetchone()[0] == 0
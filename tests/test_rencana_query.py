@@ -0,0 +1,16 @@
+import main
+
+
+def test_semua_query_laporan_memakai_indeks(db):
+    for bulan in range(1, 13):
+        main.insert_transaction(db, 1, bulan, 2024, "Kas", "Aktiva", 1000.0, "Pendapatan", "Pendapatan", 1000.0)
+        main.insert_transaction(db, 2, bulan, 2024, "Beban", "Beban", 400.0, "Kas", "Aktiva", 400.0)
+    main.tutup_periode(db, 2024, 6)
+    with main.get_db_connection() as conn:
+        assert main.cek_rencana_query(conn) == []
+
+
+def test_cek_query_tidak_mengganti_db_path(db):
+    path = main.DB_PATH
+    assert main.cek_query_database() == 0
+    assert main.DB_PATH == path
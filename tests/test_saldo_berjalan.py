@@ -0,0 +1,66 @@
+import threading
+
+import main
+
+
+def saldo_salah(user_id, akun):
+    with main.get_db_connection() as conn:
+        rows = conn.execute('''
+            SELECT posisi, nominal, saldo FROM posting
+            WHERE user_id = ? AND akun = ? ORDER BY tahun, bulan, tanggal, id
+        ''', (user_id, akun)).fetchall()
+    salah = []
+    kumulatif = 0.0
+    for posisi, nominal, saldo in rows:
+        kumulatif += nominal if posisi == "Debit" else -nominal
+        if abs(kumulatif - saldo) > 0.001:
+            salah.append((kumulatif, saldo))
+    return salah
+
+
+def jumlah_tanda(user_id):
+    with main.get_db_connection() as conn:
+        return conn.execute('SELECT COUNT(*) FROM saldo_berjalan_kotor WHERE user_id = ?', (user_id,)).fetchone()[0]
+
+
+def kas_masuk(user_id, tanggal, nominal):
+    main.insert_transaction(user_id, tanggal, 1, 2024, "Kas", "Aktiva", nominal, "Pendapatan", "Pendapatan", nominal)
+
+
+def test_transaksi_mundur_tanggal_diperbaiki(db):
+    for tanggal in (10, 20, 30):
+        kas_masuk(db, tanggal, 100.0)
+    kas_masuk(db, 5, 7.0)
+    assert saldo_salah(db, "Kas")
+
+    assert main.perbaiki_saldo_berjalan(db) > 0
+    assert saldo_salah(db, "Kas") == []
+    assert jumlah_tanda(db) == 0
+    # Tanpa tanda kotor, perbaikan tidak melakukan apa-apa
+    assert main.perbaiki_saldo_berjalan(db) == 0
+
+
+# Insert mundur tanggal yang terjadi saat perbaikan sedang berjalan tidak boleh kehilangan tanda kotornya
+def test_tanda_kotor_baru_selama_perbaikan_tidak_hilang(db, monkeypatch):
+    for tanggal in (10, 20, 30):
+        kas_masuk(db, tanggal, 100.0)
+    kas_masuk(db, 25, 50.0)
+
+    penulis = threading.Thread(target=kas_masuk, args=(db, 5, 7.0))
+
+    # Insert lain dijalankan tepat setelah perbaikan membaca tanda kotor, lalu ditunggu sebentar
+    class SqlDenganKait(dict):
+        def __getitem__(self, nama):
+            if nama == "saldo_posting_sebelum" and not penulis.is_alive() and penulis.ident is None:
+                penulis.start()
+                penulis.join(timeout=1)
+            return super().__getitem__(nama)
+
+    monkeypatch.setattr(main, "SQL_LAPORAN", SqlDenganKait(main.SQL_LAPORAN))
+    main.perbaiki_saldo_berjalan(db)
+    penulis.join(timeout=10)
+    assert not penulis.is_alive()
+
+    main.perbaiki_saldo_berjalan(db)
+    assert saldo_salah(db, "Kas") == []
+    assert jumlah_tanda(db) == 0
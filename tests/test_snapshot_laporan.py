@@ -0,0 +1,43 @@
+import threading
+import time
+
+import main
+
+
+def hitung_transaksi(conn):
+    return conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+
+# Snapshot laporan yang masih terbuka tidak boleh menahan penulis, dan tetap melihat data lama
+def test_snapshot_laporan_tidak_menahan_insert(db):
+    main.insert_transaction(db, 1, 1, 2024, "Kas", "Aktiva", 1000.0, "Modal Pemilik", "Modal", 1000.0)
+
+    conn = main.get_report_connection()
+    try:
+        sebelum = hitung_transaksi(conn)
+        hasil = {}
+
+        def tulis():
+            mulai = time.perf_counter()
+            try:
+                main.insert_transaction(db, 2, 1, 2024, "Kas", "Aktiva", 500.0, "Pendapatan", "Pendapatan", 500.0)
+            except Exception as e:
+                hasil["galat"] = e
+            hasil["durasi"] = time.perf_counter() - mulai
+
+        penulis = threading.Thread(target=tulis)
+        penulis.start()
+        penulis.join(timeout=5)
+
+        assert not penulis.is_alive(), "insert_transaction tertahan oleh snapshot laporan"
+        assert "galat" not in hasil
+        assert hasil["durasi"] < 1.0
+        assert hitung_transaksi(conn) == sebelum
+    finally:
+        conn.close()
+
+    conn = main.get_report_connection()
+    try:
+        assert hitung_transaksi(conn) == sebelum + 1
+    finally:
+        conn.close()
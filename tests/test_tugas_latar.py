@@ -0,0 +1,36 @@
+import pytest
+
+import main
+
+
+class Berhenti(BaseException):
+    pass
+
+
+def test_penjadwal_berulang_tetap_berjalan_setelah_galat(monkeypatch, capsys):
+    panggilan = []
+
+    def gagal():
+        panggilan.append(1)
+        if len(panggilan) == 1:
+            raise KeyError("template")
+        raise RuntimeError("bukan galat sqlite")
+
+    def tidur(detik):
+        if len(panggilan) >= 3:
+            raise Berhenti
+
+    monkeypatch.setattr(main, "buat_transaksi_berulang", gagal)
+    monkeypatch.setattr(main.time, "sleep", tidur)
+    with pytest.raises(Berhenti):
+        main.siklus_transaksi_berulang()
+    assert len(panggilan) == 3
+    galat = capsys.readouterr().err
+    assert "Pembuatan transaksi berulang gagal: KeyError" in galat
+    assert "RuntimeError: bukan galat sqlite" in galat
+
+
+def test_tugas_latar_berhasil(capsys):
+    assert main.jalankan_tugas_latar("Tugas", lambda x: x, 1)
+    assert not main.jalankan_tugas_latar("Tugas", lambda: 1 / 0)
+    assert "Tugas gagal: ZeroDivisionError" in capsys.readouterr().err
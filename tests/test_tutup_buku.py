@@ -0,0 +1,68 @@
+import threading
+
+import main
+
+
+def isi_januari(user_id):
+    main.insert_transaction(user_id, 1, 1, 2024, "Kas", "Aktiva", 1000.0, "Modal Pemilik", "Modal", 1000.0)
+    main.insert_transaction(user_id, 5, 1, 2024, "Kas", "Aktiva", 300.0, "Pendapatan Panen", "Pendapatan", 300.0)
+    main.insert_transaction(user_id, 6, 1, 2024, "Beban Pupuk", "Beban", 100.0, "Kas", "Aktiva", 100.0)
+    main.insert_transaction(user_id, 7, 1, 2024, "Prive Pemilik", "Prive", 50.0, "Kas", "Aktiva", 50.0)
+
+
+def saldo(user_id, sampai=None):
+    with main.get_db_connection() as conn:
+        return {kunci: round(d - k, 2) for kunci, (d, k) in main.hitung_saldo_akun(conn, user_id, sampai).items()}
+
+
+def test_jurnal_penutup_menolkan_akun_nominal(db):
+    isi_januari(db)
+    sukses, _ = main.tutup_periode(db, 2024, 1)
+    assert sukses
+    hasil = saldo(db, (2024, 1))
+    assert all(hasil[k] == 0 for k in hasil if k[1] in main.JENIS_NOMINAL)
+    # Laba 200 dikurangi prive 50 masuk ke Modal
+    assert hasil[("Modal", "Modal")] == -150.0
+    assert hasil[("Kas", "Aktiva")] == 1150.0
+
+
+def test_laporan_berikutnya_dimulai_dari_snapshot(db):
+    isi_januari(db)
+    main.tutup_periode(db, 2024, 1)
+    # Snapshot diubah langsung: jika laporan dibaca dari snapshot, perubahan ini ikut terlihat
+    with main.get_db_connection() as conn:
+        conn.execute("UPDATE saldo_snapshot SET debit = debit + 1 WHERE user_id = ? AND akun = 'Kas'", (db,))
+    main.insert_transaction(db, 3, 2, 2024, "Kas", "Aktiva", 40.0, "Pendapatan Panen", "Pendapatan", 40.0)
+    hasil = saldo(db)
+    assert hasil[("Kas", "Aktiva")] == 1191.0
+    assert hasil[("Pendapatan Panen", "Pendapatan")] == -40.0
+
+
+def test_periode_yang_sama_tidak_bisa_ditutup_dua_kali(db):
+    isi_januari(db)
+    assert main.tutup_periode(db, 2024, 1)[0]
+    sukses, pesan = main.tutup_periode(db, 2024, 1)
+    assert not sukses
+    assert "sudah ditutup" in pesan
+
+
+# Penutupan kedua yang berjalan bersamaan menunggu kunci tulis, lalu ditolak
+def test_penutupan_bersamaan_hanya_satu_yang_berhasil(db, monkeypatch):
+    isi_januari(db)
+    hasil_kedua = []
+    kedua = threading.Thread(target=lambda: hasil_kedua.append(main.tutup_periode(db, 2024, 1)))
+    hitung_asli = main.hitung_saldo_akun
+
+    def hitung_dengan_kait(conn, user_id, sampai=None):
+        if kedua.ident is None:
+            kedua.start()
+            kedua.join(timeout=1)
+        return hitung_asli(conn, user_id, sampai)
+
+    monkeypatch.setattr(main, "hitung_saldo_akun", hitung_dengan_kait)
+    assert main.tutup_periode(db, 2024, 1)[0]
+    kedua.join(timeout=10)
+    assert not kedua.is_alive()
+    assert hasil_kedua and not hasil_kedua[0][0]
+    with main.get_db_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM transactions WHERE sumber = 'penutup'").fetchone()[0] == 3